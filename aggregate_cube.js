@@ -0,0 +1,98 @@
+// Loader for the aggregate cube exported by generate_charts.py (aggregate_cube.json)
+
+const CUBE_TYPED_ARRAYS = {
+    i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+    i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array
+};
+
+// Decode a base64 typed array ({dtype, bdata}); plain arrays pass through
+function decodeCubeArray(encoded) {
+    if (Array.isArray(encoded)) {
+        return encoded;
+    }
+    const binary = atob(encoded.bdata);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new CUBE_TYPED_ARRAYS[encoded.dtype](bytes.buffer);
+}
+
+// Fetch and decode the cube; returns {datasetName: cube}, where each cube has
+// rows, dimensions {name: {dictionary, codes}} and measures {name: {sum, count, min, max}}
+async function loadAggregateCube(url = 'images/aggregate_cube.json') {
+    const response = await fetch(url);
+    const payload = await response.json();
+
+    const cubes = {};
+    Object.entries(payload.cubes).forEach(([dataset, cube]) => {
+        const dimensions = {};
+        Object.entries(cube.dimensions).forEach(([name, dimension]) => {
+            dimensions[name] = {
+                dictionary: dimension.dictionary,
+                codes: decodeCubeArray(dimension.codes)
+            };
+        });
+
+        const measures = {};
+        Object.entries(cube.measures).forEach(([name, reductions]) => {
+            measures[name] = {};
+            Object.entries(reductions).forEach(([reduction, values]) => {
+                measures[name][reduction] = decodeCubeArray(values);
+            });
+        });
+
+        cubes[dataset] = { rows: cube.rows, dimensions, measures };
+    });
+    return cubes;
+}
+
+// Roll the cube up to the `groupBy` dimensions for the cells matching `filters`
+// ({dimension: value or [values]}). Returns one entry per group with the sum,
+// count, mean, min and max of `measure`.
+function rollupCube(cube, measure, groupBy = [], filters = {}) {
+    const allowed = {};
+    Object.entries(filters).forEach(([name, values]) => {
+        const wanted = new Set(Array.isArray(values) ? values : [values]);
+        const dimension = cube.dimensions[name];
+        allowed[name] = new Set(
+            dimension.dictionary.map((value, code) => (wanted.has(value) ? code : -1)).filter(code => code >= 0)
+        );
+    });
+
+    const stats = cube.measures[measure];
+    const groups = new Map();
+    for (let row = 0; row < cube.rows; row++) {
+        let matches = true;
+        for (const name in allowed) {
+            if (!allowed[name].has(cube.dimensions[name].codes[row])) {
+                matches = false;
+                break;
+            }
+        }
+        if (!matches) {
+            continue;
+        }
+
+        const key = groupBy.map(name => cube.dimensions[name].codes[row]).join('|');
+        let group = groups.get(key);
+        if (!group) {
+            group = { sum: 0, count: 0, min: Infinity, max: -Infinity };
+            groupBy.forEach(name => {
+                group[name] = cube.dimensions[name].dictionary[cube.dimensions[name].codes[row]];
+            });
+            groups.set(key, group);
+        }
+        group.sum += stats.sum[row];
+        group.count += stats.count[row];
+        if (stats.count[row] > 0) {
+            group.min = Math.min(group.min, stats.min[row]);
+            group.max = Math.max(group.max, stats.max[row]);
+        }
+    }
+
+    return Array.from(groups.values()).map(group => ({
+        ...group,
+        mean: group.count ? group.sum / group.count : NaN
+    }));
+}
@@ -0,0 +1,458 @@
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import subprocess
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import chart_backends
+import chart_writer
+import generate_charts as charts
+from chart_tracing import read_spans, summarize_spans
+
+# Benchmark the chart pipeline on synthetic data of increasing size.
+#
+#   python benchmark_charts.py --sizes 1000 100000 --output bench.json
+#   python benchmark_charts.py --baseline bench_baseline.json --threshold 0.2
+#   python benchmark_charts.py --backends pandas polars duckdb
+#   python benchmark_charts.py --cold-start mortality_by_category --sizes 1000
+#
+# For every size the datasets are generated into a scratch directory, then
+# loaded, aggregated and rendered one chart at a time. Timings are recorded
+# per phase, along with peak RSS and artifact sizes. Each size runs in a
+# process of its own, so its peak RSS is not inflated by a larger size run
+# before it. On Linux the peak is also reset before each phase, giving the
+# loads, the aggregation and every chart a peak of their own. With --backends the
+# grouped aggregates are also computed by each listed backend, timed, and
+# checked against the pandas results.
+#
+# With --cold-start, each listed chart is also rendered by a fresh
+# `generate_charts.py --only <chart>` process against the smallest size. The
+# wall time is split into loading the datasets, building and writing the
+# chart, and everything else (interpreter start, imports, planning, metadata),
+# which must stay under --startup-budget seconds.
+
+DEFAULT_SIZES = [1000, 100000]
+
+COUNTRIES = [
+    "Argentina", "Australia", "Brazil", "Canada", "China", "France", "Germany",
+    "India", "Indonesia", "Italy", "Japan", "Mexico", "Nigeria", "Russia",
+    "Saudi Arabia", "South Africa", "South Korea", "Turkey", "UK", "USA"
+]
+
+DISEASES = {
+    "Cardiovascular": ["Hypertension", "Stroke"],
+    "Metabolic": ["Diabetes", "Obesity"],
+    "Respiratory": ["Asthma", "COVID-19", "Influenza"],
+    "Viral": ["Hepatitis", "HIV/AIDS", "Dengue", "Zika"],
+    "Bacterial": ["Cholera", "Tuberculosis", "Leprosy"],
+    "Parasitic": ["Malaria"],
+    "Neurological": ["Alzheimer's Disease", "Parkinson's Disease"],
+    "Autoimmune": ["Rheumatoid Arthritis"],
+    "Chronic": ["Cancer"]
+}
+
+# Timed metrics compared against the baseline, and the floor (seconds) under
+# which differences are treated as noise
+TIMED_METRICS = ["load_cold", "load_warm", "aggregate", "build", "write_html", "write_png", "flush_writes"]
+NOISE_FLOOR = 0.01
+
+# Seconds a single-chart run may spend outside loading and rendering
+STARTUP_BUDGET = 1.0
+
+def synthesize_global_health(rows, rng):
+    names = [(category, name) for category, diseases in DISEASES.items() for name in diseases]
+    picks = rng.integers(0, len(names), rows)
+    return pd.DataFrame({
+        "Country": rng.choice(COUNTRIES, rows),
+        "Year": rng.integers(2000, 2025, rows),
+        "Disease Name": [names[i][1] for i in picks],
+        "Disease Category": [names[i][0] for i in picks],
+        "Prevalence Rate (%)": rng.uniform(0.1, 20, rows).round(2),
+        "Incidence Rate (%)": rng.uniform(0.1, 15, rows).round(2),
+        "Mortality Rate (%)": rng.uniform(0.1, 10, rows).round(2),
+        "Age Group": rng.choice(["0-18", "19-35", "36-60", "61+"], rows),
+        "Gender": rng.choice(["Male", "Female", "Other"], rows),
+        "Population Affected": rng.integers(1000, 1000000, rows),
+        "Education Index": rng.uniform(0.4, 0.9, rows).round(2),
+        "Urbanization Rate (%)": rng.uniform(20, 90, rows).round(2)
+    })
+
+def synthesize_life_expectancy(rows, rng):
+    return pd.DataFrame({
+        "Country": rng.choice(COUNTRIES, rows),
+        "Year": rng.integers(2000, 2016, rows),
+        "Status": rng.choice(["Developed", "Developing"], rows),
+        "Life_expectancy": rng.uniform(45, 85, rows).round(1),
+        "GDP": rng.lognormal(8, 1.5, rows).round(2),
+        "Population": rng.lognormal(15, 2, rows).round(0)
+    })
+
+def synthesize_heart(rows, rng):
+    return pd.DataFrame({
+        "age": rng.integers(29, 78, rows),
+        "sex": rng.integers(0, 2, rows),
+        "chol": rng.integers(126, 565, rows),
+        "trestbps": rng.integers(94, 201, rows),
+        "thalach": rng.integers(71, 203, rows),
+        "oldpeak": rng.uniform(0, 6.2, rows).round(1),
+        "target": rng.integers(0, 2, rows)
+    })
+
+def write_synthetic_datasets(data_dir, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    synthesize_global_health(rows, rng).to_csv(f"{data_dir}/{charts.DATASET_SOURCES['global_health']}", index=False)
+    synthesize_life_expectancy(rows, rng).to_csv(f"{data_dir}/{charts.DATASET_SOURCES['life_expectancy']}", index=False)
+    synthesize_heart(rows, rng).to_csv(f"{data_dir}/{charts.DATASET_SOURCES['heart']}", index=False)
+
+# Linux keeps a resettable RSS high-water mark (VmHWM, reset by writing 5 to
+# /proc/self/clear_refs). reset_peak_rss() returns False where it is missing,
+# and phase peaks are then recorded as None rather than the process peak.
+# The reset also clears ru_maxrss, so the peaks it discards are kept for
+# process_peak_rss_kb().
+_discarded_peak_kb = 0
+
+def reset_peak_rss():
+    global _discarded_peak_kb
+    try:
+        peak = peak_rss_kb()
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    _discarded_peak_kb = max(_discarded_peak_kb, peak or 0)
+    return True
+
+# Peak RSS of the whole process, across resets
+def process_peak_rss_kb():
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, _discarded_peak_kb)
+
+def peak_rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return None
+
+# Temporarily wrap a module function so the time spent in it accumulates
+# into bucket[key]
+@contextmanager
+def timed_calls(module, attr, bucket, key):
+    original = getattr(module, attr)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            bucket[key] = bucket.get(key, 0.0) + time.perf_counter() - start
+
+    setattr(module, attr, wrapper)
+    try:
+        yield
+    finally:
+        setattr(module, attr, original)
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+# Time each backend's aggregation pass and compare its output with pandas
+def benchmark_backends(backends, reference):
+    results = {}
+    for backend in backends:
+        start = time.perf_counter()
+        aggregates = charts.compute_aggregates(backend)
+        elapsed = time.perf_counter() - start
+        results[backend] = {
+            "aggregate": elapsed,
+            "mismatches": chart_backends.compare_aggregates(reference, aggregates)
+        }
+    return results
+
+def benchmark_size(rows, names, workdir, backends=()):
+    data_dir = f"{workdir}/data"
+    out_dir = f"{workdir}/images"
+    write_synthetic_datasets(data_dir, rows)
+    os.makedirs(out_dir, exist_ok=True)
+    charts.configure(data_dir, out_dir)
+
+    result = {"rows": rows, "datasets": {}, "charts": {}, "phase_peak_rss_kb": {}}
+
+    # Cold load parses the CSV (and writes the Arrow cache), warm load reuses it
+    resettable = reset_peak_rss()
+    for dataset, loader in charts._DATASET_LOADERS.items():
+        charts.clear_dataset_cache()
+        start = time.perf_counter()
+        loader()
+        cold = time.perf_counter() - start
+
+        charts.clear_dataset_cache()
+        start = time.perf_counter()
+        loader()
+        warm = time.perf_counter() - start
+        result["datasets"][dataset] = {"load_cold": cold, "load_warm": warm}
+    result["phase_peak_rss_kb"]["load"] = peak_rss_kb() if resettable else None
+
+    resettable = reset_peak_rss()
+    start = time.perf_counter()
+    charts.prepare_aggregates()
+    result["aggregate"] = time.perf_counter() - start
+    result["phase_peak_rss_kb"]["aggregate"] = peak_rss_kb() if resettable else None
+
+    if backends:
+        result["backends"] = benchmark_backends(backends, charts.compute_aggregates("pandas"))
+
+    for name in names:
+        timings = {}
+        resettable = reset_peak_rss()
+        with timed_calls(charts, "write_chart_html", timings, "write_html"), \
+                timed_calls(charts, "write_chart_png", timings, "write_png"):
+            start = time.perf_counter()
+            charts.CHART_GENERATORS[name]()
+            total = time.perf_counter() - start
+
+        # write_html/write_png time serialization; the files reach disk on the
+        # writer pool, so the chart's writes are waited for (and timed) before
+        # the sizes are read
+        start = time.perf_counter()
+        chart_writer.flush_writes()
+        flush = time.perf_counter() - start
+
+        write_html = timings.get("write_html", 0.0)
+        write_png = timings.get("write_png", 0.0)
+        result["charts"][name] = {
+            "build": total - write_html - write_png,
+            "write_html": write_html,
+            "write_png": write_png,
+            "flush_writes": flush,
+            "html_bytes": _file_size(f"{out_dir}/{name}.html"),
+            "png_bytes": _file_size(f"{out_dir}/{name}.png"),
+            "peak_rss_kb": peak_rss_kb() if resettable else None
+        }
+
+    result["peak_rss_kb"] = process_peak_rss_kb()
+    return result
+
+# benchmark_size() in a fresh process, so the size's peak RSS is its own
+def benchmark_size_process(rows, names, workdir, backends=()):
+    output = f"{workdir}/size_result.json"
+    command = [
+        sys.executable, os.path.abspath(__file__), "--size-worker",
+        "--sizes", str(rows), "--keep-dir", workdir, "--output", output, "--only", *names
+    ]
+    if backends:
+        command += ["--backends", *backends]
+    subprocess.run(command, check=True)
+    with open(output) as f:
+        return json.load(f)
+
+# Render one chart in a new process, the way a single-chart CLI run does. The
+# first run writes the Arrow cache, so the second one is timed.
+def benchmark_cold_start(name, rows, workdir):
+    data_dir = f"{workdir}/data"
+    trace_file = f"{workdir}/cold_start.jsonl"
+    if not os.path.exists(data_dir):
+        write_synthetic_datasets(data_dir, rows)
+    command = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_charts.py"),
+        "--data-dir", data_dir, "--out-dir", f"{workdir}/cold", "--only", name,
+        "--force", "--no-cube", "--trace", trace_file
+    ]
+    for _ in range(2):
+        if os.path.exists(trace_file):
+            os.remove(trace_file)
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        wall = time.perf_counter() - start
+
+    records = read_spans(trace_file)
+    chart_totals, _ = summarize_spans(records)
+    load = sum(record["duration_s"] for record in records if record["span"] == "load" and "chart" not in record)
+    chart = chart_totals[name]["total"]
+    return {"rows": rows, "wall": wall, "load": load, "chart": chart, "startup": wall - load - chart}
+
+def run_cold_starts(names, rows, keep_dir=None):
+    workdir = f"{keep_dir}/cold_start" if keep_dir else tempfile.mkdtemp(prefix="chart-bench-cold-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        print(f"Timing cold single-chart runs at {rows} rows...")
+        return {name: benchmark_cold_start(name, rows, workdir) for name in names}
+    finally:
+        if not keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def run_benchmarks(sizes, names, keep_dir=None, backends=()):
+    results = {"python": sys.version.split()[0], "sizes": {}}
+    for rows in sizes:
+        workdir = keep_dir and f"{keep_dir}/{rows}"
+        if workdir:
+            os.makedirs(workdir, exist_ok=True)
+        else:
+            workdir = tempfile.mkdtemp(prefix=f"chart-bench-{rows}-")
+        try:
+            print(f"Benchmarking {rows} rows...")
+            results["sizes"][str(rows)] = benchmark_size_process(rows, names, workdir, backends)
+        finally:
+            if not keep_dir:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def _timed_values(size_result):
+    for dataset, timings in size_result["datasets"].items():
+        for metric, value in timings.items():
+            yield f"datasets.{dataset}.{metric}", value
+    yield "aggregate", size_result["aggregate"]
+    for backend, timings in size_result.get("backends", {}).items():
+        yield f"backends.{backend}.aggregate", timings["aggregate"]
+    for name, chart in size_result["charts"].items():
+        for metric in TIMED_METRICS:
+            if metric in chart:
+                yield f"charts.{name}.{metric}", chart[metric]
+
+# List every timed metric that got slower than baseline * (1 + threshold)
+def compare_to_baseline(results, baseline, threshold):
+    regressions = []
+    for name, timings in results.get("cold_start", {}).items():
+        previous = baseline.get("cold_start", {}).get(name, {})
+        for metric in ("startup", "wall"):
+            before = previous.get(metric)
+            if before is None or max(before, timings[metric]) < NOISE_FLOOR:
+                continue
+            if timings[metric] > before * (1 + threshold):
+                regressions.append({
+                    "rows": timings["rows"],
+                    "metric": f"cold_start.{name}.{metric}",
+                    "baseline": before,
+                    "current": timings[metric],
+                    "change": timings[metric] / before - 1 if before else float("inf")
+                })
+    for rows, size_result in results["sizes"].items():
+        if rows not in baseline.get("sizes", {}):
+            continue
+        previous = dict(_timed_values(baseline["sizes"][rows]))
+        for metric, value in _timed_values(size_result):
+            before = previous.get(metric)
+            if before is None or max(before, value) < NOISE_FLOOR:
+                continue
+            if value > before * (1 + threshold):
+                regressions.append({
+                    "rows": int(rows),
+                    "metric": metric,
+                    "baseline": before,
+                    "current": value,
+                    "change": value / before - 1 if before else float("inf")
+                })
+    return regressions
+
+def _megabytes(kb):
+    return "n/a" if kb is None else f"{kb / 1024:.0f}"
+
+def print_summary(results):
+    for rows, size_result in results["sizes"].items():
+        phases = size_result.get("phase_peak_rss_kb", {})
+        print(f"\n{rows} rows (aggregate {size_result['aggregate']:.3f}s, peak RSS {_megabytes(size_result['peak_rss_kb'])} MB: "
+              f"load {_megabytes(phases.get('load'))} MB, aggregate {_megabytes(phases.get('aggregate'))} MB)")
+        print(f"  {'chart':<32}{'build':>9}{'html':>9}{'png':>9}{'flush':>9}{'html KB':>10}{'png KB':>10}{'peak MB':>9}")
+        for name, chart in size_result["charts"].items():
+            html_kb = (chart["html_bytes"] or 0) / 1024
+            png_kb = (chart["png_bytes"] or 0) / 1024
+            print(f"  {name:<32}{chart['build']:>9.3f}{chart['write_html']:>9.3f}{chart['write_png']:>9.3f}{chart['flush_writes']:>9.3f}"
+                  f"{html_kb:>10.1f}{png_kb:>10.1f}{_megabytes(chart.get('peak_rss_kb')):>9}")
+        for backend, timings in size_result.get("backends", {}).items():
+            parity = "matches pandas" if not timings["mismatches"] else f"{len(timings['mismatches'])} mismatch(es)"
+            print(f"  backend {backend:<24}{timings['aggregate']:>9.3f}s  {parity}")
+    if results.get("cold_start"):
+        print(f"\nCold single-chart runs")
+        print(f"  {'chart':<32}{'wall':>9}{'load':>9}{'chart':>9}{'startup':>9}")
+        for name, timings in results["cold_start"].items():
+            print(f"  {name:<32}{timings['wall']:>9.3f}{timings['load']:>9.3f}{timings['chart']:>9.3f}{timings['startup']:>9.3f}")
+
+def backend_mismatches(results):
+    return [
+        (rows, backend, mismatch)
+        for rows, size_result in results["sizes"].items()
+        for backend, timings in size_result.get("backends", {}).items()
+        for mismatch in timings["mismatches"]
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chart generation on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="row counts to benchmark")
+    parser.add_argument("--only", nargs="+", metavar="CHART", help="benchmark only these charts")
+    parser.add_argument("--skip", nargs="+", metavar="CHART", default=[], help="do not benchmark these charts")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--baseline", help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--keep-dir", help="keep the synthetic data and artifacts under this directory")
+    parser.add_argument("--backends", nargs="+", choices=chart_backends.BACKENDS, default=[],
+                        help="also time these aggregation backends and check them against pandas")
+    parser.add_argument("--cold-start", nargs="+", metavar="CHART", default=[],
+                        help="also time a fresh single-chart generate_charts.py run for each of these charts")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET,
+                        help="seconds a cold single-chart run may spend outside loading and rendering")
+    # Internal: benchmark the one size given into --keep-dir and write its result to --output
+    parser.add_argument("--size-worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in (args.only or []) + args.skip + args.cold_start if name not in charts.CHART_GENERATORS]
+    if unknown:
+        parser.error(f"unknown chart(s): {', '.join(unknown)}")
+    names = [name for name in (args.only or charts.DEFAULT_CHARTS) if name not in args.skip]
+    for backend in args.backends:
+        chart_backends.check_backend(backend)
+
+    if args.size_worker:
+        result = benchmark_size(args.sizes[0], names, args.keep_dir, args.backends)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    results = run_benchmarks(args.sizes, names, args.keep_dir, args.backends)
+    if args.cold_start:
+        results["cold_start"] = run_cold_starts(args.cold_start, min(args.sizes), args.keep_dir)
+    print_summary(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+    # Backends must agree with pandas before their timings mean anything
+    mismatches = backend_mismatches(results)
+    for rows, backend, mismatch in mismatches:
+        print(f"MISMATCH {rows} rows {backend}: {mismatch}")
+    if mismatches:
+        return 1
+
+    # A single chart must not pay for the whole catalogue
+    over_budget = {
+        name: timings["startup"]
+        for name, timings in results.get("cold_start", {}).items()
+        if timings["startup"] > args.startup_budget
+    }
+    for name, startup in over_budget.items():
+        print(f"SLOW START {name}: {startup:.3f}s outside loading and rendering (budget {args.startup_budget:.3f}s)")
+    if over_budget:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['rows']} rows {regression['metric']}: "
+                  f"{regression['baseline']:.3f}s -> {regression['current']:.3f}s (+{regression['change']:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
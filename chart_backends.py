@@ -0,0 +1,182 @@
+import importlib.util
+
+import pandas as pd
+
+# Engines that can run the fused aggregation plan of generate_charts.
+#   pandas: groupby over the loaded (typed, Arrow-cached) frames
+#   polars: lazy, multithreaded query over the source file
+#   duckdb: embedded SQL over the source file
+# polars and duckdb read the CSV/Parquet sources in place and never build a
+# pandas copy of the rows; only the small grouped result is converted.
+BACKENDS = ("pandas", "polars", "duckdb")
+
+# Reductions each file engine can run, by the name the plan uses
+POLARS_REDUCTIONS = {
+    "mean": lambda column: column.mean(),
+    "sum": lambda column: column.sum(),
+    "count": lambda column: column.count(),
+    "min": lambda column: column.min(),
+    "max": lambda column: column.max()
+}
+
+SQL_REDUCTIONS = {
+    "mean": "avg({})",
+    "sum": "coalesce(sum({}), 0)",
+    "count": "count({})",
+    "min": "min({})",
+    "max": "max({})"
+}
+
+def backend_available(name):
+    return name == "pandas" or importlib.util.find_spec(name) is not None
+
+def check_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    if not backend_available(name):
+        raise ImportError(f"the {name} backend needs the {name!r} package")
+
+def _check_reductions(backend, reductions, supported):
+    for column, func in reductions.values():
+        if func not in supported:
+            raise ValueError(f"reduction {func!r} on {column!r} is not supported by the {backend} backend")
+
+def _is_parquet(path):
+    return path.endswith((".parquet", ".pq"))
+
+def _polars_aggregate(path, groupings, rename, filters):
+    import polars as pl
+
+    scan = pl.scan_parquet(path) if _is_parquet(path) else pl.scan_csv(path)
+    scan = scan.rename({column: rename(column) for column in scan.collect_schema().names()})
+    columns = scan.collect_schema().names()
+
+    # Same row filters as apply_filters()
+    conditions = []
+    for column, values in filters.items():
+        if column not in columns:
+            continue
+        if column == "Year":
+            start, end = values
+            if start is not None:
+                conditions.append(pl.col(column) >= start)
+            if end is not None:
+                conditions.append(pl.col(column) <= end)
+        else:
+            conditions.append(pl.col(column).is_in(list(values)))
+    if conditions:
+        scan = scan.filter(*conditions)
+
+    # All groupings are collected together, so the file is scanned once.
+    # Missing group keys are dropped, as pandas does.
+    queries = [
+        scan.filter(*[pl.col(key).is_not_null() for key in keys])
+        .group_by(list(keys))
+        .agg([
+            POLARS_REDUCTIONS[func](pl.col(column)).alias(name)
+            for name, (column, func) in reductions.items()
+        ])
+        .sort(list(keys))
+        for keys, reductions in groupings.items()
+    ]
+    results = pl.collect_all(queries)
+    return {
+        keys: result.to_pandas().set_index(list(keys))
+        for keys, result in zip(groupings, results)
+    }
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+def _duckdb_aggregate(path, groupings, rename, filters):
+    import duckdb
+
+    reader = "read_parquet" if _is_parquet(path) else "read_csv_auto"
+    source = f"{reader}({_sql_string(path)})"
+    connection = duckdb.connect()
+    try:
+        raw = [row[0] for row in connection.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        columns = [rename(column) for column in raw]
+        select = ", ".join(f"{_quote(column)} AS {_quote(rename(column))}" for column in raw)
+
+        # Same row filters as apply_filters()
+        conditions = ["true"]
+        parameters = []
+        for column, values in filters.items():
+            if column not in columns:
+                continue
+            if column == "Year":
+                for bound, operator in zip(values, (">=", "<=")):
+                    if bound is not None:
+                        conditions.append(f"{_quote(column)} {operator} ?")
+                        parameters.append(bound)
+            else:
+                conditions.append(f"{_quote(column)} IN ({', '.join('?' for _ in values)})")
+                parameters.extend(values)
+
+        # Parse the file once into a temporary table that every grouping reads
+        connection.execute(
+            f"CREATE TEMP TABLE source AS SELECT * FROM (SELECT {select} FROM {source}) "
+            f"WHERE {' AND '.join(conditions)}",
+            parameters
+        )
+
+        results = {}
+        for keys, reductions in groupings.items():
+            group = ", ".join(_quote(key) for key in keys)
+            aggregates = ", ".join(
+                f"{SQL_REDUCTIONS[func].format(_quote(column))} AS {_quote(name)}"
+                for name, (column, func) in reductions.items()
+            )
+            present = " AND ".join(f"{_quote(key)} IS NOT NULL" for key in keys)
+            query = f"SELECT {group}, {aggregates} FROM source WHERE {present} GROUP BY {group} ORDER BY {group}"
+            results[keys] = connection.execute(query).df().set_index(list(keys))
+        return results
+    finally:
+        connection.close()
+
+FILE_BACKENDS = {
+    "polars": (_polars_aggregate, POLARS_REDUCTIONS),
+    "duckdb": (_duckdb_aggregate, SQL_REDUCTIONS)
+}
+
+# Run every grouping ({keys: {output name: (column, reduction)}}) of the
+# source at `path` and return {keys: frame}, each shaped like
+# groupby(keys).agg(**reductions). `rename` maps raw column names to the
+# dataset's cleaned names; `filters` follows generate_charts.apply_filters().
+def aggregate_file(backend, path, groupings, rename=None, filters=None):
+    check_backend(backend)
+    aggregate, supported = FILE_BACKENDS[backend]
+    for reductions in groupings.values():
+        _check_reductions(backend, reductions, supported)
+    return aggregate(path, groupings, rename or (lambda column: column), filters or {})
+
+# Plain-typed, key-sorted copy of a fused frame, so engines that differ only
+# in dtypes (categorical vs string keys, float32 vs float64) compare equal
+def _normalized(frame):
+    keys = list(frame.index.names)
+    frame = frame.reset_index()
+    for column in frame.select_dtypes(include="category").columns:
+        frame[column] = frame[column].astype(object)
+    return frame.sort_values(keys, ignore_index=True)
+
+# Compare two {(dataset, keys): fused frame} results; returns one message per
+# grouping that differs beyond `rtol`
+def compare_aggregates(expected, actual, rtol=1e-5):
+    mismatches = []
+    for (dataset, keys), frame in expected.items():
+        label = f"{dataset} by {', '.join(keys)}"
+        if (dataset, keys) not in actual:
+            mismatches.append(f"{label}: missing")
+            continue
+        try:
+            pd.testing.assert_frame_equal(
+                _normalized(frame), _normalized(actual[(dataset, keys)]),
+                check_dtype=False, check_exact=False, rtol=rtol
+            )
+        except AssertionError as error:
+            mismatches.append(f"{label}: {error}")
+    return mismatches
@@ -0,0 +1,197 @@
+import copy
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import plotly.colors as colors
+import plotly.graph_objects as go
+
+# Fast figure construction for the charts plotly.express is slowest on.
+# px splits the frame per color value, validates every property of every
+# trace and merges the template, which for a few hundred country traces costs
+# seconds before any data is written. These builders emit the same trace and
+# layout dicts px would, with the arrays sliced straight out of NumPy, and
+# wrap them in a Figure without re-validating.
+
+# Template layouts and colorscales, resolved once per process
+@lru_cache(maxsize=None)
+def _template(name):
+    return pio.templates[name].to_plotly_json()
+
+@lru_cache(maxsize=None)
+def _colorscale(name):
+    scale = getattr(colors.sequential, name)
+    return tuple((i / (len(scale) - 1), color) for i, color in enumerate(scale))
+
+def colorscale(name):
+    return [list(stop) for stop in _colorscale(name)]
+
+# Discrete colors px cycles through for a template
+def colorway(template):
+    return _template(template)["layout"].get("colorway") or colors.qualitative.Plotly
+
+# Axis layout px gives a single-panel chart
+def _axes(x_title, y_title):
+    return {
+        "xaxis": {"anchor": "y", "domain": [0.0, 1.0], "title": {"text": x_title}},
+        "yaxis": {"anchor": "x", "domain": [0.0, 1.0], "title": {"text": y_title}}
+    }
+
+# Title and height as px sets them; untitled charts get px's tighter top margin
+def _titled(layout, title, height):
+    if title:
+        layout["title"] = {"text": title}
+    else:
+        layout["margin"] = {"t": 60}
+    if height:
+        layout["height"] = height
+    return layout
+
+# Figure from prebuilt trace and layout dicts, skipping property validation.
+# Validation is switched back on afterwards so the generators' own
+# update_layout()/update_traces() calls still resolve template names etc.
+def figure_from_spec(data, layout, template="plotly_white", frames=None):
+    layout = {"template": copy.deepcopy(_template(template)), **layout}
+    fig = go.Figure({"data": data, "layout": layout, "frames": frames or []}, _validate=False)
+    for obj in (fig, fig.layout, *fig.data, *fig.frames):
+        obj._validate = True
+    return fig
+
+# Row positions of each value of `column`, in order of first appearance (px's
+# trace order), from one stable sort instead of a boolean mask per group.
+# Rows with a missing value (code -1) belong to no group and are left out.
+def _group_rows(column):
+    codes, uniques = pd.factorize(column)
+    present = np.flatnonzero(codes >= 0)
+    order = present[np.argsort(codes[present], kind="stable")]
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    return list(zip(uniques, np.split(order, bounds)))
+
+# Equivalent of px.scatter(df, x, y, color=group, size=size, hover_name=group):
+# one marker trace per group, sized by area against a shared sizeref
+def grouped_scatter(df, x, y, group, size=None, size_max=20, labels=None,
+                    render_mode="auto", title=None, template="plotly_white", height=None):
+    labels = labels or {}
+    label = lambda column: labels.get(column, column)
+    colors = colorway(template)
+
+    xs = df[x].to_numpy()
+    ys = df[y].to_numpy()
+    names = df[group].astype(str).to_numpy()
+    sizes = df[size].to_numpy(dtype=float) if size else None
+
+    hover_tail = f"<br>{label(x)}=%{{x}}<br>{label(y)}=%{{y}}"
+    if size:
+        hover_tail += f"<br>{label(size)}=%{{marker.size}}"
+    hover_tail += "<extra></extra>"
+
+    marker = {"symbol": "circle"}
+    if size:
+        marker.update(sizemode="area", sizeref=np.nanmax(sizes) / size_max ** 2)
+
+    data = []
+    for i, (value, rows) in enumerate(_group_rows(df[group])):
+        trace_marker = dict(marker, color=colors[i % len(colors)])
+        if size:
+            trace_marker["size"] = sizes[rows]
+        data.append({
+            "type": "scattergl" if render_mode == "webgl" else "scatter",
+            "mode": "markers",
+            "name": str(value),
+            "legendgroup": str(value),
+            "showlegend": True,
+            "x": xs[rows],
+            "y": ys[rows],
+            "hovertext": names[rows],
+            "hovertemplate": f"<b>%{{hovertext}}</b><br><br>{label(group)}={value}" + hover_tail,
+            "marker": trace_marker,
+            "xaxis": "x",
+            "yaxis": "y"
+        })
+        if render_mode != "webgl":
+            data[-1]["orientation"] = "v"
+
+    layout = {
+        **_axes(label(x), label(y)),
+        "legend": {"title": {"text": label(group)}, "tracegroupgap": 0, "itemsizing": "constant"}
+    }
+    return figure_from_spec(data, _titled(layout, title, height), template)
+
+# Equivalent of px.bar(df, x, y, color=y, color_continuous_scale=scale): one
+# bar trace colored through a shared coloraxis
+def continuous_bar(df, x, y, scale="Viridis", text_format=None, labels=None,
+                   title=None, template="plotly_white", height=None):
+    labels = labels or {}
+    label = lambda column: labels.get(column, column)
+    values = df[y].to_numpy()
+
+    trace = {
+        "type": "bar",
+        "x": df[x].to_numpy(),
+        "y": values,
+        "marker": {"color": values, "coloraxis": "coloraxis", "pattern": {"shape": ""}},
+        "hovertemplate": f"{label(x)}=%{{x}}<br>{label(y)}=%{{marker.color}}<extra></extra>",
+        "orientation": "v",
+        "showlegend": False,
+        "name": "",
+        "textposition": "auto",
+        "xaxis": "x",
+        "yaxis": "y"
+    }
+    if text_format:
+        trace["texttemplate"] = f"%{{y:{text_format}}}"
+
+    layout = {
+        **_axes(label(x), label(y)),
+        "coloraxis": {"colorbar": {"title": {"text": label(y)}}, "colorscale": colorscale(scale)},
+        "legend": {"tracegroupgap": 0},
+        "barmode": "relative"
+    }
+    return figure_from_spec([trace], _titled(layout, title, height), template)
+
+# Animation frames over `labels` for a single-trace figure. `columns` maps a
+# trace attribute path ("x", "marker.size", ...) to a (frames, points) array
+# whose rows are aligned to the same points in every frame, so identifiers,
+# colors and hover text stay in the base trace. Every frame carries every
+# animated attribute, and no layout: the slider jumps to frames out of order
+# and plotly.js merges a frame into whatever is shown, so a frame that left
+# out an unchanged attribute would keep the previously shown frame's values.
+def animation_frames(trace_type, labels, columns):
+    frames = []
+    for i, label in enumerate(labels):
+        data = {"type": trace_type}
+        for path, values in columns.items():
+            *parents, leaf = path.split(".")
+            target = data
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = values[i]
+        frames.append({"name": str(label), "data": [data], "traces": [0]})
+    return frames
+
+# Play/pause buttons and a frame slider, as px adds for animation_frame.
+# Geo subplots have to be redrawn on every frame; cartesian ones don't.
+def animation_controls(labels, prefix, redraw=False, duration=600):
+    play = {"frame": {"duration": duration, "redraw": redraw}, "mode": "immediate",
+            "fromcurrent": True, "transition": {"duration": duration // 2, "easing": "linear"}}
+    pause = {"frame": {"duration": 0, "redraw": redraw}, "mode": "immediate",
+             "fromcurrent": True, "transition": {"duration": 0, "easing": "linear"}}
+    return {
+        "updatemenus": [{
+            "type": "buttons", "direction": "left", "showactive": False,
+            "x": 0.1, "xanchor": "right", "y": 0, "yanchor": "top", "pad": {"r": 10, "t": 70},
+            "buttons": [
+                {"label": "&#9654;", "method": "animate", "args": [None, play]},
+                {"label": "&#9724;", "method": "animate", "args": [[None], pause]}
+            ]
+        }],
+        "sliders": [{
+            "active": 0, "x": 0.1, "xanchor": "left", "y": 0, "yanchor": "top", "len": 0.9,
+            "pad": {"b": 10, "t": 60}, "currentvalue": {"prefix": f"{prefix}="},
+            "steps": [
+                {"label": str(label), "method": "animate", "args": [[str(label)], pause]}
+                for label in labels
+            ]
+        }]
+    }
@@ -0,0 +1,350 @@
+import os
+import re
+import sys
+import json
+import argparse
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+# Offline map assets for the choropleth.
+#
+# plotly.js resolves "country names" with regexes at render time, silently
+# drops names it does not recognise, and fetches its world topology from the
+# CDN. Instead, country names are resolved to ISO-3 codes at build time
+# through a bundled lookup index, and the map draws from a bundled, simplified
+# topology in plotly's own layout (objects land/countries/coastlines/..., with
+# countries keyed by ISO-3 id), so plotly.js and Kaleido never touch the
+# network.
+#
+# The assets live in geo/ and are rebuilt with
+#
+#   python chart_geo.py --source ne_110m_admin_0_countries.geojson --resolution 110 --tolerance 0.1
+#
+# from a Natural Earth admin-0 countries GeoJSON (any scale). pycountry, when
+# installed, adds the ISO 3166 names and official names to the index.
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo")
+INDEX_FILE = "country_iso3.json"
+
+# Map resolutions (plotly's geo.resolution) with bundled geometry, and the
+# default simplification tolerance, in degrees, used to build each. plotly.js
+# also knows 50 (1:50m); add it here once geo/world_50m.json is built.
+RESOLUTIONS = {110: 0.1}
+
+# Decimal places kept in the bundled coordinates
+COORDINATE_DIGITS = 2
+
+# Spellings used by the datasets (WHO, World Bank, shorthand) that neither
+# Natural Earth nor ISO 3166 use
+ALIASES = {
+    "Bolivia (Plurinational State of)": "BOL",
+    "Cabo Verde": "CPV",
+    "Congo": "COG",
+    "Czechia": "CZE",
+    "Democratic People's Republic of Korea": "PRK",
+    "Democratic Republic of the Congo": "COD",
+    "Eswatini": "SWZ",
+    "Iran (Islamic Republic of)": "IRN",
+    "Ivory Coast": "CIV",
+    "Kosovo": "XKX",
+    "Lao People's Democratic Republic": "LAO",
+    "Micronesia (Federated States of)": "FSM",
+    "Republic of Korea": "KOR",
+    "Republic of Moldova": "MDA",
+    "Russia": "RUS",
+    "South Korea": "KOR",
+    "North Korea": "PRK",
+    "Swaziland": "SWZ",
+    "Syria": "SYR",
+    "The former Yugoslav republic of Macedonia": "MKD",
+    "Turkey": "TUR",
+    "UK": "GBR",
+    "United Kingdom of Great Britain and Northern Ireland": "GBR",
+    "United Republic of Tanzania": "TZA",
+    "USA": "USA",
+    "United States": "USA",
+    "United States of America": "USA",
+    "Venezuela (Bolivarian Republic of)": "VEN",
+    "Viet Nam": "VNM",
+    "Vietnam": "VNM"
+}
+
+# Case-, accent- and punctuation-insensitive form of a country name
+def normalize_name(name):
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    name = name.casefold().replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+@lru_cache(maxsize=None)
+def country_index():
+    with open(os.path.join(GEO_DIR, INDEX_FILE)) as f:
+        return json.load(f)
+
+# ISO-3 code for each name, None where the name is not in the index
+def iso3_codes(names):
+    index = country_index()
+    codes = []
+    for name in names:
+        key = normalize_name(name)
+        codes.append(index.get(key) or index.get(normalize_name(re.sub(r"\(.*?\)", "", str(name)))))
+    return codes
+
+def topology_name(resolution):
+    return f"world_{resolution}m"
+
+def topology_path(resolution):
+    return os.path.join(GEO_DIR, f"{topology_name(resolution)}.json")
+
+def topology_url():
+    return "file://" + GEO_DIR.replace(os.sep, "/") + "/"
+
+# Script that registers the topology with plotly.js before any plot is drawn,
+# so map pages work offline (including from file://)
+def topology_script(resolution):
+    with open(topology_path(resolution)) as f:
+        topology = f.read()
+    name = topology_name(resolution)
+    return (
+        "window.PlotlyGeoAssets = window.PlotlyGeoAssets || {topojson: {}};\n"
+        f"window.PlotlyGeoAssets.topojson[{json.dumps(name)}] = {topology};\n"
+    )
+
+# Douglas-Peucker simplification of one ring or line, keeping both ends
+def simplify_line(points, tolerance):
+    points = np.asarray(points, dtype=float)
+    if len(points) <= 2 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.extend([(start, split), (split, end)])
+    return points[keep]
+
+# Shoelace area; positive for counterclockwise rings
+def _signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def _feature_iso3(properties):
+    for key in ("iso_a3", "ISO_A3", "adm0_a3", "ADM0_A3"):
+        code = properties.get(key)
+        if code and code != "-99":
+            return code
+    return ALIASES.get(properties.get("name") or properties.get("NAME"))
+
+# Rings as open lists of (x, y) points, without the closing point or
+# repeated consecutive points
+def _open_ring(ring):
+    points = [tuple(point[:2]) for point in ring]
+    points = [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+# Split every ring into arcs at the points where the set of rings sharing
+# its edges changes, so a border between two countries is one arc used by
+# both and each stretch of coastline is an arc of its own. Returns the
+# distinct arcs (as point lists) and, per ring, its arcs as topojson
+# references (~index for an arc walked backwards).
+def _shared_arcs(rings):
+    owners = {}
+    for ring_id, points in enumerate(rings):
+        for edge in zip(points, points[1:] + points[:1]):
+            owners.setdefault(frozenset(edge), set()).add(ring_id)
+
+    arcs, index, references = [], {}, []
+    for points in rings:
+        sharing = [frozenset(owners[frozenset(edge)]) for edge in zip(points, points[1:] + points[:1])]
+        cuts = [i for i in range(len(points)) if sharing[i] != sharing[i - 1]]
+        if cuts:
+            points = points[cuts[0]:] + points[:cuts[0]]
+            cuts = [cut - cuts[0] for cut in cuts] + [len(points)]
+            pieces = [(points + points[:1])[start:end + 1] for start, end in zip(cuts, cuts[1:])]
+        else:
+            # One arc round the whole ring, started at its smallest point so
+            # every ring that walks it finds the same arc
+            first = points.index(min(points))
+            pieces = [points[first:] + points[:first + 1]]
+
+        ring_references = []
+        for piece in pieces:
+            key = tuple(piece)
+            if key not in index:
+                if key[::-1] in index:
+                    ring_references.append(~index[key[::-1]])
+                    continue
+                index[key] = len(arcs)
+                arcs.append(piece)
+            ring_references.append(index[key])
+        references.append(ring_references)
+    return arcs, references
+
+def _arc_points(arcs, reference):
+    return arcs[reference] if reference >= 0 else arcs[~reference][::-1]
+
+# Convert a countries GeoJSON into a plotly-style topology. Rings are split
+# into arcs shared between neighbours (see _shared_arcs) and each arc is
+# simplified once, so neighbouring countries keep a common border. Only arcs
+# that bound a single ring, the coasts, form the coastlines layer; land
+# borders are left to the countries layer. Rings that simplify below a
+# triangle (tiny islands) are dropped. d3-geo reads rings spherically, so
+# exteriors are wound clockwise and holes counterclockwise whatever the
+# source used.
+def build_topology(geojson, tolerance):
+    features = []
+    rings = []
+    for feature in geojson["features"]:
+        geometry = feature["geometry"]
+        iso3 = _feature_iso3(feature["properties"])
+        if geometry is None or iso3 is None:
+            continue
+
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        polygon_rings = []
+        for polygon in polygons:
+            polygon_rings.append([])
+            for ring in polygon:
+                polygon_rings[-1].append(len(rings))
+                rings.append(_open_ring(ring))
+        features.append((feature, iso3, polygon_rings))
+
+    source_arcs, references = _shared_arcs(rings)
+    simplified = [np.round(simplify_line(arc, tolerance), COORDINATE_DIGITS).tolist() for arc in source_arcs]
+
+    geometries = []
+    used = {}
+    for feature, iso3, polygon_rings in features:
+        polygon_arcs = []
+        for ring_ids in polygon_rings:
+            kept = []
+            for position, ring_id in enumerate(ring_ids):
+                ring_references = references[ring_id]
+                points = np.array([
+                    point
+                    for i, reference in enumerate(ring_references)
+                    for point in _arc_points(simplified, reference)[i > 0:]
+                ])
+                area = _signed_area(points) if len(points) >= 4 else 0
+                if area == 0:
+                    # A polygon whose exterior vanished takes its holes with it
+                    if position == 0:
+                        break
+                    continue
+                if (area > 0) == (position == 0):
+                    ring_references = [~reference for reference in reversed(ring_references)]
+                kept.append(ring_references)
+                for reference in ring_references:
+                    arc = reference if reference >= 0 else ~reference
+                    used[arc] = used.get(arc, 0) + 1
+            if kept:
+                polygon_arcs.append(kept)
+        if polygon_arcs:
+            geometries.append({
+                "type": "MultiPolygon",
+                "id": iso3,
+                "properties": {"name": feature["properties"].get("name", iso3)},
+                "arcs": polygon_arcs
+            })
+
+    # Keep only the arcs the remaining rings use, renumbered in order
+    renumber = {arc: i for i, arc in enumerate(sorted(used))}
+    for geometry in geometries:
+        geometry["arcs"] = [
+            [[renumber[reference] if reference >= 0 else ~renumber[~reference] for reference in ring] for ring in polygon]
+            for polygon in geometry["arcs"]
+        ]
+    coastlines = [[renumber[arc]] for arc in sorted(used) if used[arc] == 1]
+
+    empty = {"type": "GeometryCollection", "geometries": []}
+    return {
+        "type": "Topology",
+        "objects": {
+            "countries": {"type": "GeometryCollection", "geometries": geometries},
+            "land": {"type": "GeometryCollection", "geometries": [
+                {"type": "MultiPolygon", "arcs": [polygon for geometry in geometries for polygon in geometry["arcs"]]}
+            ]},
+            "coastlines": {"type": "GeometryCollection", "geometries": [
+                {"type": "MultiLineString", "arcs": coastlines}
+            ]},
+            "ocean": empty,
+            "lakes": empty,
+            "rivers": empty,
+            "subunits": empty
+        },
+        "arcs": [simplified[arc] for arc in sorted(used)]
+    }
+
+# Country ids drawn by a bundled topology
+@lru_cache(maxsize=None)
+def topology_ids(resolution):
+    with open(topology_path(resolution)) as f:
+        topology = json.load(f)
+    return frozenset(geometry["id"] for geometry in topology["objects"]["countries"]["geometries"])
+
+# Normalized name -> ISO-3 from the topology's names, pycountry (if
+# installed) and the aliases
+def build_index(geojson):
+    index = {}
+    for feature in geojson["features"]:
+        iso3 = _feature_iso3(feature["properties"])
+        for key in ("name", "name_long", "formal_en", "admin", "NAME", "NAME_LONG", "ADMIN"):
+            if iso3 and feature["properties"].get(key):
+                index[normalize_name(feature["properties"][key])] = iso3
+
+    try:
+        import pycountry
+    except ImportError:
+        pycountry = None
+    if pycountry is not None:
+        for country in pycountry.countries:
+            for attribute in ("name", "official_name", "common_name"):
+                if hasattr(country, attribute):
+                    index[normalize_name(getattr(country, attribute))] = country.alpha_3
+
+    for name, iso3 in ALIASES.items():
+        index[normalize_name(name)] = iso3
+    return dict(sorted(index.items()))
+
+def build_assets(source, resolution=110, tolerance=None):
+    with open(source) as f:
+        geojson = json.load(f)
+    tolerance = RESOLUTIONS[resolution] if tolerance is None else tolerance
+
+    os.makedirs(GEO_DIR, exist_ok=True)
+    with open(topology_path(resolution), "w") as f:
+        json.dump(build_topology(geojson, tolerance), f, separators=(",", ":"))
+    with open(os.path.join(GEO_DIR, INDEX_FILE), "w") as f:
+        json.dump(build_index(geojson), f, indent=0, sort_keys=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the bundled map topology and country index.")
+    parser.add_argument("--source", required=True, help="Natural Earth admin-0 countries GeoJSON")
+    parser.add_argument("--resolution", type=int, choices=sorted(RESOLUTIONS), default=110, help="plotly geo.resolution slot to fill")
+    parser.add_argument("--tolerance", type=float, default=None, help="simplification tolerance in degrees")
+    args = parser.parse_args(argv)
+
+    build_assets(args.source, args.resolution, args.tolerance)
+    print(f"Topology saved to: {topology_path(args.resolution)} ({os.path.getsize(topology_path(args.resolution)) / 1024:.0f} KB)")
+    print(f"Country index saved to: {os.path.join(GEO_DIR, INDEX_FILE)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
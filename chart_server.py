@@ -0,0 +1,189 @@
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import generate_charts as charts
+
+# Local chart-serving API on top of the generate_* functions.
+#
+#   python chart_server.py --data-dir data --port 8050
+#
+#   GET /charts                                   list of chart ids
+#   GET /charts/<chart>.json?country=India&country=Japan&year_start=2005&year_end=2010&category=Viral
+#   GET /charts/<chart>.png?...                   same filters, rendered with Kaleido
+#   GET /charts/<chart>.html?...                  the page generate_charts.py writes, with
+#                                                 the same --plotlyjs and typed-array options
+#   GET /charts/<asset>.js                        the local plotly.js bundle and map topology
+#                                                 script those pages load
+#
+# Datasets stay loaded between requests, and rendered responses are kept in a
+# size-bounded LRU keyed on chart, format and filters. Filters a dataset has
+# no column for are ignored (the heart-disease charts ignore all of them).
+
+FORMATS = {
+    "json": "application/json",
+    "png": "image/png",
+    "html": "text/html; charset=utf-8"
+}
+
+# Rendered responses, least recently used first, bounded by total bytes
+class ResponseCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+# Query string -> filters for charts.dataset_filters()
+def parse_filters(query):
+    def values(name):
+        return [value for item in query.get(name, []) for value in item.split(",") if value] or None
+
+    def year(name):
+        raw = query.get(name, [None])[-1]
+        return int(raw) if raw not in (None, "") else None
+
+    filters = {
+        "Country": values("country"),
+        "Disease Category": values("category")
+    }
+    start, end = year("year_start"), year("year_end")
+    if start is not None or end is not None:
+        filters["Year"] = (start, end)
+    return {column: value for column, value in filters.items() if value is not None}
+
+# PNG and HTML go through the same serializers as the files written by
+# generate_charts.py
+def render(name, fmt, filters):
+    fig = charts.build_figure(name, filters)
+    if fmt == "json":
+        return fig.to_json().encode()
+    if fmt == "png":
+        return charts.chart_png(fig)
+    return charts.chart_html(fig).encode()
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    cache = None
+
+    # Rendering swaps module-level dataset state, so only one render runs at a time
+    render_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+
+        if path == "/charts":
+            return self._send(200, "application/json", json.dumps(list(charts.CHART_GENERATORS)).encode())
+
+        if not path.startswith("/charts/") or "." not in path:
+            return self.send_error(404, "Not found")
+
+        name, fmt = path[len("/charts/"):].rsplit(".", 1)
+        if fmt == "js":
+            asset = charts.chart_asset(f"{name}.js")
+            if asset is None:
+                return self.send_error(404, f"Unknown asset: {name}.js")
+            return self._send(200, "text/javascript; charset=utf-8", asset.encode())
+        if name not in charts.CHART_GENERATORS or fmt not in FORMATS:
+            return self.send_error(404, f"Unknown chart or format: {name}.{fmt}")
+
+        try:
+            filters = parse_filters(parse_qs(url.query))
+        except ValueError as error:
+            return self.send_error(400, f"Bad filter: {error}")
+
+        key = (name, fmt, charts._filter_key(filters))
+        body = self.cache.get(key)
+        status = "hit"
+        if body is None:
+            status = "miss"
+            try:
+                with self.render_lock:
+                    body = render(name, fmt, filters)
+            except (ValueError, KeyError, IndexError) as error:
+                return self.send_error(422, f"Cannot render {name} for these filters: {error}")
+            except Exception as error:
+                # Any other failure still gets a response instead of a dropped connection
+                self.log_error("Rendering %s failed: %r", name, error)
+                return self.send_error(500, f"Failed to render {name}: {type(error).__name__}: {error}")
+            self.cache.put(key, body)
+
+        self._send(200, FORMATS[fmt], body, {"X-Cache": status})
+
+    def _send(self, code, content_type, body, headers=None):
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_server(host, port, cache_bytes):
+    handler = type("Handler", (ChartRequestHandler,), {"cache": ResponseCache(cache_bytes)})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve dashboard charts with filters over HTTP.")
+    parser.add_argument("--data-dir", default=charts.DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind")
+    parser.add_argument("--port", type=int, default=8050, help="port to listen on")
+    parser.add_argument("--cache-mb", type=float, default=64, help="size of the rendered-chart cache")
+    parser.add_argument("--plotlyjs", choices=["cdn", "local"], default=None, help="load plotly.js from the CDN or from the server")
+    parser.add_argument("--json-arrays", action="store_true", help="send trace arrays as plain JSON instead of base64 typed arrays")
+    args = parser.parse_args(argv)
+
+    charts.configure(args.data_dir, plotlyjs=args.plotlyjs, binary_arrays=False if args.json_arrays else None)
+
+    # Keep the datasets and unfiltered aggregates resident
+    start = time.perf_counter()
+    for loader in charts._DATASET_LOADERS.values():
+        loader()
+    charts.prepare_aggregates()
+    print(f"Datasets loaded in {time.perf_counter() - start:.2f}s")
+
+    server = make_server(args.host, args.port, int(args.cache_mb * 1024 * 1024))
+    print(f"Serving charts on http://{args.host}:{args.port}/charts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import warnings
+
+import numpy as np
+
+# Vectorized summary statistics computed on the server so distribution charts
+# ship a fixed-size payload instead of every observation.
+
+# Most outlier markers drawn per box; extra distinct values are thinned evenly
+MAX_OUTLIERS = 200
+
+# Tukey box statistics with plotly's default (linear) quartile method; None
+# for a group with no values
+def box_stats(values, max_outliers=MAX_OUTLIERS):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+
+    outliers = np.unique(values[~inside])
+    if len(outliers) > max_outliers:
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int)]
+
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": values[inside].min(),
+        "upperfence": values[inside].max(),
+        "mean": values.mean(),
+        "outliers": outliers
+    }
+
+# Silverman's rule of thumb, the same default bandwidth plotly.js violins use
+def silverman_bandwidth(values):
+    values = np.asarray(values, dtype=float)
+    q1, q3 = np.percentile(values, [25, 75])
+    std = values.std(ddof=1) if len(values) > 1 else 0.0
+    spread = min(std, (q3 - q1) / 1.349) or std or 1.0
+    return 1.059 * spread * len(values) ** -0.2
+
+# Gaussian KDE evaluated on a regular grid. The values are histogrammed onto
+# the grid first and the histogram is convolved with the kernel, so the cost
+# is O(n + grid_size^2) instead of O(n * grid_size). The grid spans the data
+# plus two bandwidths on each side, like plotly's "soft" span mode. None for
+# a group with no values.
+def binned_kde(values, grid_size=256, bandwidth=None):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    bandwidth = bandwidth or silverman_bandwidth(values)
+
+    low = values.min() - 2 * bandwidth
+    high = values.max() + 2 * bandwidth
+    counts, edges = np.histogram(values, bins=grid_size, range=(low, high))
+    grid = (edges[:-1] + edges[1:]) / 2
+    step = edges[1] - edges[0]
+
+    offsets = np.arange(-(grid_size - 1), grid_size) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(counts, kernel, mode="valid") / len(values)
+    return grid, density
+
+# Seeded sample of about `size` rows that keeps each stratum's share of the frame
+def stratified_sample(df, column, size, seed=0):
+    if len(df) <= size:
+        return df
+    return df.groupby(column, observed=True).sample(frac=size / len(df), random_state=seed).sort_index()
+
+# Grouped regression and correlation. Every (x, y) relationship a chart asks
+# about, pooled or split by a column, is one group of one flat batch: rows are
+# tagged with an integer group code and each statistic is reduced with
+# np.bincount over the codes, so any number of groups costs a handful of
+# vectorized passes rather than a Python loop per group.
+
+# Per-group n, means, and centred sums of squares and cross products
+def _grouped_moments(x, y, codes, n_groups):
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.bincount(codes, x, n_groups) / n
+        mean_y = np.bincount(codes, y, n_groups) / n
+        dx = x - mean_x[codes]
+        dy = y - mean_y[codes]
+    sxx = np.bincount(codes, dx * dx, n_groups)
+    syy = np.bincount(codes, dy * dy, n_groups)
+    sxy = np.bincount(codes, dx * dy, n_groups)
+    return n, mean_x, mean_y, sxx, syy, sxy
+
+# OLS slope and intercept plus Pearson's r of each group; NaN where a group
+# has fewer than two points or no spread
+def grouped_ols(x, y, codes, n_groups):
+    n, mean_x, mean_y, sxx, syy, sxy = _grouped_moments(
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float), codes, n_groups
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+        pearson = np.where((sxx > 0) & (syy > 0), sxy / np.sqrt(sxx * syy), np.nan)
+    return {"n": n.astype(int), "slope": slope, "intercept": mean_y - slope * mean_x, "pearson": pearson}
+
+# Ranks of `values` within each group, ties sharing their average rank, from
+# one lexsort over (group, value)
+def grouped_ranks(values, codes):
+    values = np.asarray(values, dtype=float)
+    order = np.lexsort((values, codes))
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+
+    # Runs of equal (group, value) share a rank; ranks restart per group
+    new_run = np.r_[True, (sorted_codes[1:] != sorted_codes[:-1]) | (sorted_values[1:] != sorted_values[:-1])]
+    run_ids = np.cumsum(new_run) - 1
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.r_[run_starts[1:], len(order)]
+    group_starts = np.r_[0, np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1]
+    offsets = np.repeat(group_starts, np.diff(np.r_[group_starts, len(order)]))
+
+    ranks = np.empty(len(order))
+    ranks[order] = (run_starts + run_ends - 1)[run_ids] / 2 - offsets + 1
+    return ranks
+
+# Spearman's rho of each group: Pearson's r of the within-group ranks
+def grouped_spearman(x, y, codes, n_groups):
+    return grouped_ols(grouped_ranks(x, codes), grouped_ranks(y, codes), codes, n_groups)["pearson"]
+
+# Most cells (replicates x rows, grid points x rows) the bootstrap and LOWESS
+# hold in memory at once
+BATCH_CELLS = 2_000_000
+
+# Percentile bootstrap intervals for each group's OLS slope and Pearson's r.
+# Rows are resampled within their own group; every replicate of every group
+# is one code of a single bincount reduction, in batches of replicates that
+# keep at most BATCH_CELLS rows in memory.
+#
+# With max_rows, a group larger than that is resampled max_rows rows at a
+# time (the m-out-of-n bootstrap) and each replicate's deviation from the
+# full-sample estimate is scaled by sqrt(m / n) to the width at n rows, so
+# the cost stops growing with the data. Groups within the cap get the plain
+# percentile interval.
+def grouped_bootstrap(x, y, codes, n_groups, n_boot=1000, level=0.95, seed=0, max_rows=None):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    order = np.argsort(codes, kind="stable")
+    x, y, codes = x[order], y[order], codes[order]
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    draws = sizes if max_rows is None else np.minimum(sizes, max_rows)
+    draw_codes = np.repeat(np.arange(n_groups), draws)
+
+    slopes = np.empty((n_boot, n_groups))
+    pearsons = np.empty((n_boot, n_groups))
+    batch = max(1, BATCH_CELLS // max(len(draw_codes), 1))
+    for first in range(0, n_boot, batch):
+        count = min(batch, n_boot - first)
+        picks = starts[draw_codes] + (rng.random((count, len(draw_codes))) * sizes[draw_codes]).astype(int)
+        labels = (np.arange(count)[:, None] * n_groups + draw_codes).ravel()
+        fit = grouped_ols(x[picks].ravel(), y[picks].ravel(), labels, count * n_groups)
+        slopes[first:first + count] = fit["slope"].reshape(count, n_groups)
+        pearsons[first:first + count] = fit["pearson"].reshape(count, n_groups)
+
+    if max_rows is not None and (draws < sizes).any():
+        full = grouped_ols(x, y, codes, n_groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = np.sqrt(draws / sizes)
+        slopes = full["slope"] + (slopes - full["slope"]) * scale
+        pearsons = np.clip(full["pearson"] + (pearsons - full["pearson"]) * scale, -1, 1)
+
+    # Groups too small to fit have all-NaN replicates and NaN intervals
+    tails = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {
+            "slope_ci": np.nanpercentile(slopes, tails, axis=0).T,
+            "pearson_ci": np.nanpercentile(pearsons, tails, axis=0).T
+        }
+
+# LOWESS curve (local linear fit with tricube weights over the nearest
+# `frac` of the points) evaluated on a grid of x quantiles. All grid points
+# are fitted together as one weights matrix, in chunks of at most
+# BATCH_CELLS cells. No robustness iterations are run.
+def lowess_curve(x, y, frac=0.3, grid_size=100):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    grid = np.unique(np.quantile(x, np.linspace(0, 1, grid_size)))
+    k = min(len(x), max(2, int(np.ceil(frac * len(x)))))
+
+    fitted = np.empty(len(grid))
+    step = max(1, BATCH_CELLS // max(len(x), 1))
+    for first in range(0, len(grid), step):
+        points = grid[first:first + step, None]
+        distance = np.abs(x - points)
+        radius = np.partition(distance, k - 1, axis=1)[:, k - 1:k]
+        radius = np.where(radius > 0, radius, 1.0)
+        weights = np.clip(1 - (distance / radius) ** 3, 0, None) ** 3
+
+        # A grid point whose neighbours all sit on the radius has no weight; it stays NaN
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x = (weights * x).sum(axis=1) / total
+            mean_y = (weights * y).sum(axis=1) / total
+        dx = x - mean_x[:, None]
+        sxx = (weights * dx * dx).sum(axis=1)
+        sxy = (weights * dx * (y - mean_y[:, None])).sum(axis=1)
+        slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+        fitted[first:first + step] = mean_y + slope * (points[:, 0] - mean_x)
+    return grid, fitted
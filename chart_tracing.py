@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import uuid
+import cProfile
+import importlib.util
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; spans are then recorded without peak RSS
+    resource = None
+
+# Opt-in instrumentation for chart builds. When a trace file is configured,
+# every span() appends one JSON line with its duration and the process' peak
+# RSS so far. Render workers append to the same file; run_id tells runs apart.
+# With a profile directory, each profiled() block also dumps a cProfile
+# (.prof) or pyinstrument (.html) report.
+TRACE_OPTIONS = {
+    "trace_file": None,
+    "profile_dir": None,
+    "profiler": "cprofile",
+    "run_id": None
+}
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# Attributes of the enclosing spans, so nested spans inherit e.g. the chart
+_span_stack = []
+
+def configure_tracing(trace_file=None, profile_dir=None, profiler="cprofile", run_id=None):
+    if profiler not in PROFILERS:
+        raise ValueError(f"unknown profiler: {profiler!r} (choose from {', '.join(PROFILERS)})")
+    if profile_dir and profiler == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+        raise ImportError("the pyinstrument profiler needs the 'pyinstrument' package")
+
+    TRACE_OPTIONS.update(
+        trace_file=trace_file,
+        profile_dir=profile_dir,
+        profiler=profiler,
+        run_id=run_id or uuid.uuid4().hex[:12]
+    )
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+def tracing_enabled():
+    return bool(TRACE_OPTIONS["trace_file"])
+
+def _peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+def _emit(record):
+    # One write per line keeps concurrent appends from workers intact
+    with open(TRACE_OPTIONS["trace_file"], "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+@contextmanager
+def span(name, **attrs):
+    if not tracing_enabled():
+        yield
+        return
+
+    inherited = dict(_span_stack[-1]) if _span_stack else {}
+    inherited.update(attrs)
+    _span_stack.append(inherited)
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _span_stack.pop()
+        _emit({
+            "run_id": TRACE_OPTIONS["run_id"],
+            "pid": os.getpid(),
+            "span": name,
+            **inherited,
+            "start": started,
+            "duration_s": duration,
+            "peak_rss_kb": _peak_rss_kb()
+        })
+
+@contextmanager
+def profiled(label):
+    profile_dir = TRACE_OPTIONS["profile_dir"]
+    if not profile_dir:
+        yield
+        return
+
+    if TRACE_OPTIONS["profiler"] == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(f"{profile_dir}/{label}.html", "w") as f:
+                f.write(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{profile_dir}/{label}.prof")
+
+def read_spans(trace_file=None, run_id=None):
+    trace_file = trace_file or TRACE_OPTIONS["trace_file"]
+    run_id = run_id or TRACE_OPTIONS["run_id"]
+    with open(trace_file) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if run_id is None or record.get("run_id") == run_id]
+
+# Spans recorded while rendering a chart. Other spans may carry a chart (or,
+# like metadata, name one with metadata_for), but only a chart with at least
+# one of these was rendered and gets a row of its own.
+CHART_SPANS = ("chart", "write_html", "write_png")
+
+# Per-chart totals: build time is the chart span minus its writes
+def summarize_spans(records):
+    charts = {}
+    other = {}
+    rendered = set()
+    for record in records:
+        chart = record.get("chart")
+        if chart is None:
+            label = " ".join([record["span"], record.get("dataset", "")]).strip()
+            if "keys" in record:
+                label += f" by {', '.join(record['keys'])}"
+            entry = other.setdefault(label, {"duration_s": 0.0, "peak_rss_kb": 0})
+            entry["duration_s"] += record["duration_s"]
+            entry["peak_rss_kb"] = max(entry["peak_rss_kb"], record["peak_rss_kb"] or 0)
+            continue
+
+        entry = charts.setdefault(chart, {"total": 0.0, "write_html": 0.0, "write_png": 0.0, "peak_rss_kb": 0})
+        if record["span"] in CHART_SPANS:
+            rendered.add(chart)
+        if record["span"] == "chart":
+            entry["total"] += record["duration_s"]
+        elif record["span"] in ("write_html", "write_png"):
+            entry[record["span"]] += record["duration_s"]
+        entry["peak_rss_kb"] = max(entry["peak_rss_kb"], record["peak_rss_kb"] or 0)
+
+    charts = {chart: entry for chart, entry in charts.items() if chart in rendered}
+    for entry in charts.values():
+        entry["build"] = entry["total"] - entry["write_html"] - entry["write_png"]
+    return charts, other
+
+def print_span_summary(records):
+    charts, other = summarize_spans(records)
+
+    print(f"\n{'phase':<56}{'seconds':>9}{'peak MB':>9}")
+    for label, entry in other.items():
+        print(f"{label:<56}{entry['duration_s']:>9.3f}{entry['peak_rss_kb'] / 1024:>9.0f}")
+
+    print(f"\n{'chart':<32}{'total':>9}{'build':>9}{'html':>9}{'png':>9}{'peak MB':>9}")
+    for chart, entry in sorted(charts.items(), key=lambda item: -item[1]["total"]):
+        print(f"{chart:<32}{entry['total']:>9.3f}{entry['build']:>9.3f}"
+              f"{entry['write_html']:>9.3f}{entry['write_png']:>9.3f}{entry['peak_rss_kb'] / 1024:>9.0f}")
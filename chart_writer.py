@@ -0,0 +1,142 @@
+import os
+import gzip
+import shutil
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+# Output stage for chart artifacts. Renderers hand serialized bytes to
+# submit_write() and carry on building the next chart while a small thread
+# pool writes them. Every file is written under a temporary name and renamed
+# into place, so a reader (the chart server, a static host) sees either the
+# previous complete file or the new one, never a partial write. Text
+# artifacts also get .gz and, when the optional brotli package is installed,
+# .br siblings for static hosting. The file and its siblings are all written
+# to temporary names before any is renamed, and the file is renamed first:
+# a failed write leaves the previous set untouched, and a sibling is never
+# newer than the file it was compressed from.
+#
+# flush_writes() waits for everything submitted by this process and re-raises
+# the first write error; call it before relying on the files being on disk.
+WRITER_OPTIONS = {
+    "compress": True,
+    "threads": 4
+}
+
+# Artifacts worth pre-compressing; PNGs are already compressed
+COMPRESSED_EXTENSIONS = (".html", ".json", ".js", ".css", ".svg")
+
+GZIP_LEVEL = 9
+
+# Quality 11 is ~20x slower than 9 on the plotly.js bundle for ~10% smaller output
+BROTLI_QUALITY = 9
+
+def configure_writer(compress=None, threads=None):
+    if threads is not None and threads < 1:
+        raise ValueError(f"writer threads must be at least 1, not {threads!r}")
+    flush_writes()
+    for option, value in (("compress", compress), ("threads", threads)):
+        if value is not None:
+            WRITER_OPTIONS[option] = value
+    _shutdown_pool()
+
+def brotli_available():
+    return importlib.util.find_spec("brotli") is not None
+
+def _encodings():
+    encodings = {".gz": lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli_available():
+        import brotli
+        encodings[".br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    return encodings
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+# Write each (path, write) pair to a temporary name with write(tmp_path),
+# then rename them into place in the order given, the main file first.
+# Siblings not in `staged` are removed after the renames.
+def _commit(staged, stale):
+    renames = []
+    try:
+        for path, write in staged:
+            renames.append((_tmp_path(path), path))
+            write(renames[-1][0])
+    except BaseException:
+        for tmp_path, _ in renames:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+
+    for tmp_path, path in renames:
+        os.replace(tmp_path, path)
+    for path in stale:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _write_bytes(data):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    return write
+
+# Atomically write `data` (bytes or str) to `path`, with compressed siblings
+# for text artifacts unless compress=False. Siblings left from an earlier
+# compressed write are removed when the file is written without them.
+def write_artifact(path, data, compress=None):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if compress is None:
+        compress = WRITER_OPTIONS["compress"] and path.endswith(COMPRESSED_EXTENSIONS)
+
+    encodings = _encodings() if compress else {}
+    staged = [(path, _write_bytes(data))]
+    staged.extend((path + suffix, _write_bytes(encode(data))) for suffix, encode in encodings.items())
+    _commit(staged, [path + suffix for suffix in (".gz", ".br") if suffix not in encodings])
+    return path
+
+# Atomically copy a written artifact, with its compressed siblings, to
+# another path; siblings the source lacks are removed from the target
+def copy_artifact(source, target):
+    staged = [
+        (target + suffix, lambda tmp_path, suffix=suffix: shutil.copyfile(source + suffix, tmp_path))
+        for suffix in ("", ".gz", ".br")
+        if os.path.exists(source + suffix)
+    ]
+    _commit(staged, [target + suffix for suffix in (".gz", ".br") if not os.path.exists(source + suffix)])
+    return target
+
+# Pool and pending writes of this process. A forked render worker inherits
+# the parent's pool object but not its threads, so the pool is keyed by pid.
+_pool = None
+_pool_pid = None
+_pending = []
+_pending_lock = threading.Lock()
+
+def _shutdown_pool():
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=True)
+    _pool = _pool_pid = None
+
+def submit_write(path, data, compress=None):
+    global _pool, _pool_pid, _pending
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ThreadPoolExecutor(max_workers=WRITER_OPTIONS["threads"], thread_name_prefix="chart-writer")
+        _pool_pid = os.getpid()
+        _pending = []
+    future = _pool.submit(write_artifact, path, data, compress)
+    with _pending_lock:
+        _pending.append(future)
+    return future
+
+def flush_writes():
+    global _pending
+    if _pool_pid != os.getpid():
+        return
+    with _pending_lock:
+        pending, _pending = _pending, []
+    errors = [future.exception() for future in pending]
+    for error in errors:
+        if error is not None:
+            raise error
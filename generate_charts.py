@@ -1,43 +1,1257 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import seaborn as sns
-import altair as alt
 import os
-from IPython.display import display
-import plotly.io as pio
+import sys
+import json
+import base64
+import hashlib
+import inspect
+import argparse
+import re
+import types
+import importlib.util
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from chart_tracing import TRACE_OPTIONS, configure_tracing, tracing_enabled, span, profiled, read_spans, print_span_summary
+
+# Defer heavy imports until a chart actually touches them, so importing this
+# module (or running the CLI for a single chart) stays cheap
+def _lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+pd = _lazy_import("pandas")
+px = _lazy_import("plotly.express")
+go = _lazy_import("plotly.graph_objects")
+pio = _lazy_import("plotly.io")
+np = _lazy_import("numpy")
+chart_stats = _lazy_import("chart_stats")
+chart_figures = _lazy_import("chart_figures")
+chart_backends = _lazy_import("chart_backends")
+sample_data = _lazy_import("sample_data")
+chart_geo = _lazy_import("chart_geo")
+chart_writer = _lazy_import("chart_writer")
 
 # Set paths
 DATA_DIR = 'data'
 IMAGE_DIR = 'images'
 
-# Create images directory if it doesn't exist
-os.makedirs(IMAGE_DIR, exist_ok=True)
+# Options that change chart output. They are part of every chart's build key.
+#   point_budget: most markers a row-level scatter chart ships to the browser
+#   webgl_threshold: marker count above which scatter charts render with WebGL
+#   heatmap_top_n: keep only the N densest rows and columns of a heatmap (None = all)
+#   plotlyjs: "cdn" loads plotly.js from the CDN, "local" makes every page share
+#     one versioned plotly-<version>.min.js written next to the charts
+#   binary_arrays: serialize numeric trace arrays as base64 typed arrays
+#   summary_threshold: rows above which distribution charts ship precomputed
+#     statistics (box/violin) or a stratified sample (parallel coordinates)
+#   summary_sample: rows kept by the parallel-coordinates stratified sample
+#   map_resolution: bundled world geometry maps draw from; only 110 (1:110m)
+#     ships, see chart_geo.py
+#   frame_bytes: approximate payload budget of one animation frame; animated
+#     charts keep only as many countries as fit in it
+RENDER_OPTIONS = {
+    "point_budget": 2000,
+    "webgl_threshold": 1000,
+    "heatmap_top_n": None,
+    "plotlyjs": "cdn",
+    "binary_arrays": True,
+    "summary_threshold": 5000,
+    "summary_sample": 2000,
+    "map_resolution": 110,
+    "frame_bytes": 16384
+}
+
+# Engine that runs the grouped aggregations: "pandas", "polars" or "duckdb"
+# (see chart_backends.py). Every engine produces the same aggregates, so the
+# choice is not part of the build keys.
+AGGREGATION_BACKEND = "pandas"
+
+# Point the loaders and writers at different directories, pick the
+# aggregation backend and override render options
+def configure(data_dir=None, image_dir=None, backend=None, **options):
+    global DATA_DIR, IMAGE_DIR, AGGREGATION_BACKEND
+    if data_dir is not None and data_dir != DATA_DIR:
+        DATA_DIR = data_dir
+        clear_dataset_cache()
+    if image_dir is not None:
+        IMAGE_DIR = image_dir
+    if backend is not None and backend != AGGREGATION_BACKEND:
+        chart_backends.check_backend(backend)
+        AGGREGATION_BACKEND = backend
+        _aggregate_cache.clear()
+    for option, value in options.items():
+        if option not in RENDER_OPTIONS:
+            raise ValueError(f"unknown render option: {option!r}")
+        if option == "plotlyjs" and value not in (None, "cdn", "local"):
+            raise ValueError(f"plotlyjs must be 'cdn' or 'local', not {value!r}")
+        if option == "map_resolution" and value is not None:
+            if value not in chart_geo.RESOLUTIONS:
+                raise ValueError(f"map_resolution must be one of {sorted(chart_geo.RESOLUTIONS)}, not {value!r}")
+            if not os.path.exists(chart_geo.topology_path(value)):
+                raise ValueError(f"no bundled map geometry at 1:{value}m; build it with chart_geo.py")
+        if value is not None:
+            RENDER_OPTIONS[option] = value
+
+# Source file and string columns of each dataset. String columns are loaded
+# as categoricals and numeric columns are downcast to the narrowest type that
+# holds them.
+DATASET_SOURCES = {
+    "global_health": "sampled_global_health.csv",
+    "life_expectancy": "life_expectancy_cleaned.csv",
+    "heart": "heart_cleaned.csv"
+}
+
+CATEGORICAL_COLUMNS = {
+    "global_health": ["Country", "Disease Category", "Disease Name", "Age Group", "Gender",
+                      "Treatment Type", "Availability of Vaccines/Treatment"],
+    "life_expectancy": ["Country", "Status"],
+    "heart": []
+}
+
+# Per-(Country, Disease Category) weights written by sample_data.py next to
+# the global health sample: rows in the full source / rows kept in the sample
+SAMPLE_WEIGHTS_FILE = "sampled_global_health_weights.csv"
+SAMPLE_STRATA = ["Country", "Disease Category"]
+
+# Charts whose figures are reweighted with the sample weights
+WEIGHTED_CHARTS = {"disease_population_treemap"}
+
+# Charts drawn from the bundled map geometry and country index
+MAP_CHARTS = {"mortality_choropleth", "mortality_choropleth_animated"}
+
+# Typed copies of each source are cached as uncompressed Arrow IPC files next
+# to the CSVs and memory-mapped on later runs. Bump SCHEMA_VERSION whenever
+# the typing rules change so old cache files are ignored.
+CACHE_DIR = ".cache"
+SCHEMA_VERSION = 1
+
+def _has_pyarrow():
+    return importlib.util.find_spec("pyarrow") is not None
+
+# Convert a freshly parsed frame to the dataset's schema
+def apply_schema(name, df):
+    for column in CATEGORICAL_COLUMNS[name]:
+        if column in df.columns and df[column].dtype != "category":
+            df[column] = df[column].astype("category")
+    for column in df.select_dtypes(include="integer").columns:
+        df[column] = pd.to_numeric(df[column], downcast="integer")
+    for column in df.select_dtypes(include="floating").columns:
+        df[column] = pd.to_numeric(df[column], downcast="float")
+    return df
+
+def _parse_dataset(name, path):
+    header = pd.read_csv(path, nrows=0).columns
+    categorical = {column: "category" for column in CATEGORICAL_COLUMNS[name] if column in header}
+    return apply_schema(name, pd.read_csv(path, dtype=categorical))
+
+def _cache_path(name, path):
+    stat = os.stat(path)
+    key = hashlib.sha256(f"{SCHEMA_VERSION}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return os.path.join(os.path.dirname(path), CACHE_DIR, f"{name}-{key}.arrow")
+
+def _write_cache(df, cache_path):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Drop cache files left behind by older versions of the source
+    prefix = os.path.basename(cache_path).rsplit("-", 1)[0] + "-"
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and entry.endswith(".arrow"):
+            os.remove(os.path.join(cache_dir, entry))
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+
+# Read a dataset once per source version: parse and type the CSV on the first
+# run, then reload the memory-mapped Arrow copy until the CSV changes. Without
+# pyarrow the typed CSV parse is used every time.
+def read_dataset(name):
+    with span("load", dataset=name):
+        return _read_dataset(name)
+
+def _read_dataset(name):
+    path = f"{DATA_DIR}/{DATASET_SOURCES[name]}"
+    if not _has_pyarrow():
+        return _parse_dataset(name, path)
+
+    import pyarrow.feather as feather
+
+    cache_path = _cache_path(name, path)
+    if os.path.exists(cache_path):
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = _parse_dataset(name, path)
+    _write_cache(df, cache_path)
+    return df
+
+def _clean_column(name, column):
+    if name == "life_expectancy":
+        return column.strip().replace(" ", "_")
+    return column
+
+# Loaded datasets, kept for the rest of the run
+_sources = {}
+
+# Load datasets on first use
+def _load_source(name):
+    if name not in _sources:
+        df = read_dataset(name)
+
+        # Clean column names for life expectancy dataset
+        df.columns = [_clean_column(name, column) for column in df.columns]
+        _sources[name] = df
+    return _sources[name]
+
+# Append newly arrived rows (already in the dataset's schema) to a loaded
+# dataset, widening categoricals so both sides keep the category dtype
+def append_source_rows(name, delta):
+    df = _load_source(name)
+    for column in df.select_dtypes(include="category").columns:
+        if column in delta.columns:
+            categories = df[column].cat.categories.union(pd.Index(delta[column].dropna().unique()))
+            df[column] = df[column].cat.set_categories(categories)
+            delta[column] = pd.Categorical(delta[column], categories=categories)
+    _sources[name] = pd.concat([df, delta], ignore_index=True)
+    return _sources[name]
+
+# Row filters active for the current dataset_filters() block:
+# {column: [values]} or, for Year, {"Year": (start, end)} with either end None
+_active_filters = {}
+
+# Filtered frames for the active filters, built on first use
+_filtered_frames = {}
+
+def _filter_key(filters):
+    return tuple(sorted((column, tuple(values)) for column, values in filters.items()))
+
+def apply_filters(df, filters):
+    applicable = {column: values for column, values in filters.items() if column in df.columns}
+    if not applicable:
+        return df
+
+    mask = pd.Series(True, index=df.index)
+    for column, values in applicable.items():
+        if column == "Year":
+            start, end = values
+            if start is not None:
+                mask &= df[column] >= start
+            if end is not None:
+                mask &= df[column] <= end
+        else:
+            mask &= df[column].isin(values)
+    return df[mask]
+
+# Row positions of each value of a column of a loaded dataset, built once so
+# a filter selects its partition with dict lookups instead of scanning the
+# column. An index is rebuilt if the loaded frame has been replaced since.
+_partition_indexes = {}
+
+def partition_index(name, column):
+    df = _load_source(name)
+    cached = _partition_indexes.get((name, column))
+    if cached is None or cached[0] is not df:
+        cached = (df, df.groupby(column, observed=True, sort=False).indices)
+        _partition_indexes[(name, column)] = cached
+    return cached[1]
+
+# apply_filters() on a loaded dataset, serving value filters from the
+# partition indexes; only a Year range still scans its column
+def _select_rows(name, df, filters):
+    positions = None
+    for column, values in filters.items():
+        if column == "Year" or column not in df.columns:
+            continue
+        index = partition_index(name, column)
+        rows = np.unique(np.concatenate([np.empty(0, dtype=np.intp)] + [index.get(value, []) for value in values]))
+        positions = rows if positions is None else np.intersect1d(positions, rows)
+    if positions is not None:
+        df = df.take(positions)
+    return apply_filters(df, {column: values for column, values in filters.items() if column == "Year"})
+
+# Filtered frames, aggregates and fits kept across dataset_filters() blocks
+# by render_variants(), keyed by the filters
+_batch_cache = {}
+
+# Render against filtered copies of the datasets. Datasets that lack a
+# filtered column ignore that filter. Aggregates computed inside the block
+# are kept apart from the unfiltered ones, and are discarded at the end of
+# the block unless a `cache` dict is passed to keep them per filter set.
+@contextmanager
+def dataset_filters(filters, cache=None):
+    global _active_filters, _filtered_frames, _aggregate_cache, _relationship_cache
+    saved = (_active_filters, _filtered_frames, _aggregate_cache, _relationship_cache)
+    _active_filters = {column: values for column, values in (filters or {}).items() if values is not None}
+    state = ({}, {}, {}) if cache is None else cache.setdefault(_filter_key(_active_filters), ({}, {}, {}))
+    _filtered_frames, _aggregate_cache, _relationship_cache = state
+    try:
+        yield
+    finally:
+        _active_filters, _filtered_frames, _aggregate_cache, _relationship_cache = saved
+
+def load_dataset(name):
+    df = _load_source(name)
+    if not _active_filters:
+        return df
+    if name not in _filtered_frames:
+        _filtered_frames[name] = _select_rows(name, df, _active_filters)
+    return _filtered_frames[name]
+
+def load_global_health():
+    return load_dataset("global_health")
+
+def load_life_expectancy():
+    return load_dataset("life_expectancy")
+
+def load_heart():
+    return load_dataset("heart")
+
+def clear_dataset_cache():
+    _sources.clear()
+    _aggregate_cache.clear()
+    _relationship_cache.clear()
+    _partition_indexes.clear()
+    _batch_cache.clear()
+    _streamed_column_hashes.clear()
+
+# Grouped aggregates each chart consumes: (dataset, group keys, {output column:
+# (input column, reduction)}). The planner fuses every chart that groups the
+# same dataset by the same keys into a single groupby pass.
+CHART_AGGREGATIONS = {
+    "mortality_by_category": ("global_health", ("Disease Category",), {
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean")
+    }),
+    "mortality_over_years": ("global_health", ("Year",), {
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean")
+    }),
+    "urbanization_vs_mortality": ("global_health", ("Country",), {
+        "Urbanization Rate (%)": ("Urbanization Rate (%)", "mean"),
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean"),
+        "Population Affected": ("Population Affected", "sum")
+    }),
+    "education_vs_prevalence": ("global_health", ("Country",), {
+        "Education Index": ("Education Index", "mean"),
+        "Prevalence Rate (%)": ("Prevalence Rate (%)", "mean"),
+        "Disease Count": ("Disease Name", "count")
+    }),
+    "mortality_heatmap": ("global_health", ("Country", "Disease Name"), {
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean")
+    }),
+    "life_expectancy_over_time": ("life_expectancy", ("Year",), {
+        "Life_expectancy": ("Life_expectancy", "mean")
+    }),
+    "disease_population_treemap": ("global_health", ("Country", "Disease Category"), {
+        "Population Affected": ("Population Affected", "sum")
+    }),
+    "mortality_choropleth": ("global_health", ("Country",), {
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean")
+    }),
+    "top_countries_life_expectancy": ("life_expectancy", ("Country",), {
+        "Life_expectancy": ("Life_expectancy", "mean")
+    }),
+    # Animated charts share one Year x Country grouping per dataset
+    "mortality_choropleth_animated": ("global_health", ("Year", "Country"), {
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean")
+    }),
+    "urbanization_vs_mortality_animated": ("global_health", ("Year", "Country"), {
+        "Urbanization Rate (%)": ("Urbanization Rate (%)", "mean"),
+        "Mortality Rate (%)": ("Mortality Rate (%)", "mean"),
+        "Population Affected": ("Population Affected", "sum")
+    }),
+    "gdp_vs_life_expectancy_animated": ("life_expectancy", ("Year", "Country"), {
+        "GDP": ("GDP", "mean"),
+        "Life_expectancy": ("Life_expectancy", "mean"),
+        "Population": ("Population", "mean")
+    })
+}
+
+# Relationships the statistics stage fits (see chart_stats.py), overlaid on
+# their charts and written into chart_metadata.json: x, y, a column whose
+# groups are also fitted separately (or None), and the trend curve drawn,
+# "ols" for a straight line or "lowess" for a local fit. Charts built from
+# CHART_AGGREGATIONS are fitted on their per-country aggregates.
+CHART_RELATIONSHIPS = {
+    "urbanization_vs_mortality": ("Urbanization Rate (%)", "Mortality Rate (%)", None, "ols"),
+    "education_vs_prevalence": ("Education Index", "Prevalence Rate (%)", None, "ols"),
+    "gdp_vs_life_expectancy": ("GDP", "Life_expectancy", "Status", "lowess")
+}
+
+# Bootstrap replicates and confidence level of the fitted statistics, and
+# the most rows of one group each replicate resamples
+BOOTSTRAP_REPLICATES = 1000
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_MAX_ROWS = 2000
+
+# Fraction of the points each LOWESS local fit uses, and the most rows the
+# curve is fitted on (a seeded sample beyond that; the curve is drawn on a
+# 100-point grid, so more rows do not change it visibly)
+LOWESS_FRAC = 0.3
+LOWESS_MAX_ROWS = 20000
+
+# Headline statistics of each chart for chart_metadata.json: the column(s)
+# labelling each plotted value and the measure plotted. Aggregated charts are
+# read from the aggregates computed for the render; row-level charts are
+# summarised by the median of each group.
+CHART_HEADLINES = {
+    "mortality_by_category": ("Disease Category", "Mortality Rate (%)"),
+    "mortality_over_years": ("Year", "Mortality Rate (%)"),
+    "urbanization_vs_mortality": ("Country", "Mortality Rate (%)"),
+    "education_vs_prevalence": ("Country", "Prevalence Rate (%)"),
+    "mortality_heatmap": (("Country", "Disease Name"), "Mortality Rate (%)"),
+    "life_expectancy_over_time": ("Year", "Life_expectancy"),
+    "disease_population_treemap": ("Disease Category", "Population Affected"),
+    "mortality_choropleth": ("Country", "Mortality Rate (%)"),
+    "cholesterol_by_gender": ("sex", "chol"),
+    "age_by_heart_disease": ("target", "age"),
+    "top_countries_life_expectancy": ("Country", "Life_expectancy"),
+    "gdp_vs_life_expectancy": ("Country", "Life_expectancy"),
+    "heart_disease_parallel": ("target", "thalach"),
+    "mortality_choropleth_animated": (("Year", "Country"), "Mortality Rate (%)"),
+    "urbanization_vs_mortality_animated": (("Year", "Country"), "Mortality Rate (%)"),
+    "gdp_vs_life_expectancy_animated": (("Year", "Country"), "Life_expectancy")
+}
+
+# Readable labels for coded headline columns
+HEADLINE_LABELS = {
+    "sex": {0: "Female", 1: "Male"},
+    "target": {0: "without heart disease", 1: "with heart disease"}
+}
+
+_DATASET_LOADERS = {
+    "global_health": load_global_health,
+    "life_expectancy": load_life_expectancy,
+    "heart": load_heart
+}
+
+# Fused per-(dataset, keys) frames, filled by prepare_aggregates()
+_aggregate_cache = {}
+
+def _fused_name(column, func):
+    return f"{column}::{func}"
+
+# Collect the distinct reductions every chart needs, grouped by dataset and keys
+def plan_aggregations(names=None):
+    names = CHART_AGGREGATIONS if names is None else [name for name in names if name in CHART_AGGREGATIONS]
+    plan = {}
+    for name in names:
+        dataset, keys, outputs = CHART_AGGREGATIONS[name]
+        reductions = plan.setdefault((dataset, keys), {})
+        for column, func in outputs.values():
+            reductions[_fused_name(column, func)] = (column, func)
+    return plan
+
+# Group one dataset by every key set in `groupings` ({keys: reductions}).
+# pandas groups the loaded frame; the other backends query the source file in
+# place with the active filters, once for all of the dataset's groupings.
+def _aggregate(dataset, groupings, backend):
+    if backend == "pandas":
+        df = _DATASET_LOADERS[dataset]()
+        fused = {}
+        for keys, reductions in groupings.items():
+            with span("aggregate", dataset=dataset, keys=list(keys)):
+                fused[keys] = df.groupby(list(keys), observed=True).agg(**reductions)
+        return fused
+
+    with span("aggregate", dataset=dataset, backend=backend):
+        return chart_backends.aggregate_file(
+            backend,
+            f"{DATA_DIR}/{DATASET_SOURCES[dataset]}",
+            groupings,
+            rename=lambda column: _clean_column(dataset, column),
+            filters=_active_filters
+        )
+
+# Groupings by dataset. With `names`, only the groupings those charts read
+# are planned, each still with the reductions of every chart sharing it, so a
+# cached grouping always serves all of its charts.
+def _plan_by_dataset(names=None):
+    wanted = None if names is None else {CHART_AGGREGATIONS[name][:2] for name in names if name in CHART_AGGREGATIONS}
+    by_dataset = {}
+    for (dataset, keys), reductions in plan_aggregations().items():
+        if wanted is None or (dataset, keys) in wanted:
+            by_dataset.setdefault(dataset, {})[keys] = reductions
+    return by_dataset
+
+# Run one groupby per (dataset, keys) for the given charts (default: all
+# registered charts), skipping groupings already cached
+def prepare_aggregates(names=None):
+    for dataset, groupings in _plan_by_dataset(names).items():
+        missing = {keys: reductions for keys, reductions in groupings.items() if (dataset, keys) not in _aggregate_cache}
+        if missing:
+            for keys, fused in _aggregate(dataset, missing, AGGREGATION_BACKEND).items():
+                _aggregate_cache[(dataset, keys)] = fused
+
+# Every fused aggregate computed by one backend, bypassing the cache; used to
+# check that the backends agree
+def compute_aggregates(backend):
+    chart_backends.check_backend(backend)
+    return {
+        (dataset, keys): fused
+        for dataset, groupings in _plan_by_dataset().items()
+        for keys, fused in _aggregate(dataset, groupings, backend).items()
+    }
+
+# Partial states each reduction keeps while streaming. They merge across
+# chunks by summing, and are finished into the final value at the end.
+MERGEABLE_REDUCTIONS = {
+    "sum": ("sum",),
+    "count": ("count",),
+    "mean": ("sum", "count")
+}
+
+# Column hashes computed chunk by chunk during stream_aggregates()
+_streamed_column_hashes = {}
+
+# Bytes a column contributes to its hash. apply_schema() downcasts loaded
+# float columns to float32, so floats are hashed at that precision and a
+# streamed float64 chunk hashes the same as the loaded column.
+def _hash_values(values):
+    if pd.api.types.is_float_dtype(values):
+        values = values.astype("float32")
+    return pd.util.hash_pandas_object(values, index=False).values.tobytes()
+
+# Per-chunk partial reductions for a set of fused reductions
+def partial_specs(reductions):
+    return {
+        _fused_name(column, part): (column, part)
+        for column, func in reductions.values()
+        for part in MERGEABLE_REDUCTIONS[func]
+    }
+
+# Fold a chunk's partials into the running state
+def merge_partials(state, partial):
+    if state is None:
+        return partial
+    return pd.concat([state, partial]).groupby(level=list(range(partial.index.nlevels))).sum()
+
+def finish_reductions(state, reductions):
+    fused = pd.DataFrame(index=state.index)
+    for fused_name, (column, func) in reductions.items():
+        if func == "mean":
+            fused[fused_name] = state[_fused_name(column, "sum")] / state[_fused_name(column, "count")]
+        else:
+            fused[fused_name] = state[_fused_name(column, func)]
+    return fused
+
+# Out-of-core variant of prepare_aggregates(): read each source in chunks of
+# `chunksize` rows and keep only mergeable per-group partials, so peak memory
+# depends on the chunk size and the number of groups, not the file size. The
+# input columns of every chart are hashed in the same pass for the build keys.
+def stream_aggregates(chunksize):
+    by_dataset = _plan_by_dataset()
+    for groupings in by_dataset.values():
+        for reductions in groupings.values():
+            for column, func in reductions.values():
+                if func not in MERGEABLE_REDUCTIONS:
+                    raise ValueError(f"reduction {func!r} on {column!r} cannot be streamed")
+
+    for dataset, groupings in by_dataset.items():
+        hashed = {
+            column
+            for inputs in CHART_INPUTS.values()
+            for column in inputs.get(dataset, [])
+        }
+        needed = hashed.union(*groupings).union(
+            column for reductions in groupings.values() for column, _ in reductions.values()
+        )
+        specs = {keys: partial_specs(reductions) for keys, reductions in groupings.items()}
+        states = dict.fromkeys(groupings)
+        digests = {column: hashlib.sha256() for column in hashed}
+
+        with span("stream_aggregate", dataset=dataset):
+            chunks = pd.read_csv(
+                f"{DATA_DIR}/{DATASET_SOURCES[dataset]}",
+                chunksize=chunksize,
+                usecols=lambda column: _clean_column(dataset, column) in needed
+            )
+            for chunk in chunks:
+                chunk.columns = [_clean_column(dataset, column) for column in chunk.columns]
+                for column, digest in digests.items():
+                    digest.update(_hash_values(chunk[column]))
+                for keys, spec in specs.items():
+                    states[keys] = merge_partials(states[keys], chunk.groupby(list(keys)).agg(**spec))
+
+        for keys, reductions in groupings.items():
+            _aggregate_cache[(dataset, keys)] = finish_reductions(states[keys], reductions)
+        for column, digest in digests.items():
+            _streamed_column_hashes[(dataset, column)] = digest.hexdigest()
+
+# Bin a row-level scatter frame on a grid in plot space until at most `budget`
+# markers remain. Each occupied (group, x bin, y bin) cell becomes one marker
+# at the mean position of its rows, with the mean `size`. The grid is halved
+# until the budget holds; at one bin per axis every group is a single marker.
+def downsample_scatter(df, x, y, budget, group=None, size=None):
+    if len(df) <= budget:
+        return df
+
+    keys = [group] if group else []
+    reductions = {x: "mean", y: "mean"}
+    if size:
+        reductions[size] = "mean"
+
+    bins = max(1, int(budget ** 0.5))
+    while True:
+        cells = df.assign(
+            _x_bin=pd.cut(df[x], bins, labels=False),
+            _y_bin=pd.cut(df[y], bins, labels=False)
+        ).groupby(keys + ["_x_bin", "_y_bin"], observed=True).agg(reductions)
+        if len(cells) <= budget or bins == 1:
+            return cells.reset_index(level=keys).reset_index(drop=True)
+        bins = max(1, bins // 2)
+
+# Scatter a long (row, column, value) frame straight into a dense matrix with
+# NaN for combinations that have no data. With top_n, only the N rows and N
+# columns with the most observed cells are kept.
+def long_to_matrix(df, row, column, value, top_n=None):
+    if top_n is not None:
+        for key in (row, column):
+            keep = df[key].value_counts().nlargest(top_n).index
+            df = df[df[key].isin(keep)]
+
+    row_codes, row_labels = pd.factorize(df[row], sort=True)
+    column_codes, column_labels = pd.factorize(df[column], sort=True)
+
+    matrix = np.full((len(row_labels), len(column_labels)), np.nan)
+    matrix[row_codes, column_codes] = df[value].to_numpy(dtype=float)
+    return matrix, list(row_labels), list(column_labels)
+
+# Scatter charts switch to WebGL (Scattergl) once they carry many markers
+def scatter_render_mode(rows):
+    return "webgl" if rows > RENDER_OPTIONS["webgl_threshold"] else "auto"
+
+def use_summary(rows):
+    return rows > RENDER_OPTIONS["summary_threshold"]
+
+def _summary_box_traces(name, position, stats, color, width=None):
+    box = go.Box(
+        x=[position],
+        q1=[stats["q1"]],
+        median=[stats["median"]],
+        q3=[stats["q3"]],
+        lowerfence=[stats["lowerfence"]],
+        upperfence=[stats["upperfence"]],
+        mean=[stats["mean"]],
+        name=name,
+        legendgroup=name,
+        marker_color=color,
+        width=width
+    )
+    outliers = go.Scatter(
+        x=[position] * len(stats["outliers"]),
+        y=stats["outliers"],
+        mode="markers",
+        name=name,
+        legendgroup=name,
+        showlegend=False,
+        marker=dict(color=color, size=4),
+        hovertemplate="%{y}<extra>outlier</extra>"
+    )
+    return [box, outliers]
+
+# Box plot from precomputed quartiles, fences and (thinned) outliers, one box
+# per value of `x` in `order`. Groups without values keep their tick but get
+# no box.
+def summary_box_figure(df, x, y, order=None):
+    order = list(pd.unique(df[x])) if order is None else order
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, group in enumerate(order):
+        stats = chart_stats.box_stats(df.loc[df[x] == group, y])
+        if stats is None:
+            continue
+        fig.add_traces(_summary_box_traces(str(group), group, stats, colors[i % len(colors)]))
+    fig.update_layout(boxmode="overlay")
+    fig.update_xaxes(tickvals=order)
+    return fig
+
+# Violin plot drawn from a server-side binned KDE: each group is a filled
+# mirrored density curve around its position, with a precomputed inner box.
+# Groups without values keep their tick but get no violin.
+def summary_violin_figure(df, x, y, order=None):
+    order = list(pd.unique(df[x])) if order is None else order
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, group in enumerate(order):
+        values = df.loc[df[x] == group, y]
+        color = colors[i % len(colors)]
+        stats = chart_stats.box_stats(values)
+        if stats is None:
+            continue
+        grid, density = chart_stats.binned_kde(values)
+        half_width = 0.4 * density / density.max()
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([i - half_width, (i + half_width)[::-1]]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill="toself",
+            mode="lines",
+            line=dict(color=color, width=1),
+            name=str(group),
+            legendgroup=str(group),
+            hoverinfo="skip"
+        ))
+        fig.add_traces(_summary_box_traces(str(group), i, stats, color, width=0.08))
+        fig.data[-2].showlegend = False
+    fig.update_xaxes(tickvals=list(range(len(order))), ticktext=[str(group) for group in order])
+    return fig
+
+def load_sample_weights():
+    path = f"{DATA_DIR}/{SAMPLE_WEIGHTS_FILE}"
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, usecols=SAMPLE_STRATA + ["Weight"])
+
+# Scale per-stratum sums over the sample up to the full source using the
+# stratum weights. Without a weights file the sample is the population.
+def reweight_strata(df, column):
+    weights = load_sample_weights()
+    if weights is None:
+        return df
+    strata = df[SAMPLE_STRATA].astype(str).merge(
+        weights.astype({key: str for key in SAMPLE_STRATA}), how="left", on=SAMPLE_STRATA
+    )
+    return df.assign(**{column: df[column].to_numpy() * strata["Weight"].fillna(1.0).to_numpy()})
+
+# ISO-3 code of every country name seen so far, resolved through the bundled
+# index (chart_geo.py) once per process and shared by every chart keyed on
+# Country. Names the index doesn't know map to None and are reported once.
+_iso3_cache = {}
+
+def country_iso3(names):
+    names = pd.Series(names, dtype=object).astype(str)
+    unseen = [name for name in names.unique() if name not in _iso3_cache]
+    if unseen:
+        codes = chart_geo.iso3_codes(unseen)
+        _iso3_cache.update(zip(unseen, codes))
+        unmatched = [name for name, code in zip(unseen, codes) if code is None]
+        if unmatched:
+            print(f"No ISO-3 code for {len(unmatched)} country name(s): {', '.join(sorted(unmatched))}")
+    return np.array([_iso3_cache[name] for name in names], dtype=object)
+
+# ISO-3 codes of the countries a map chart draws: names without a code, and
+# codes the bundled topology has no geometry for (small states such as
+# Singapore or Malta at 1:110m), map to None. Both are reported once.
+_unmapped_reported = set()
+
+def map_locations(names):
+    names = pd.Series(names, dtype=object).astype(str)
+    codes = country_iso3(names)
+    resolution = RENDER_OPTIONS["map_resolution"]
+    drawn = chart_geo.topology_ids(resolution)
+    missing = {code: name for name, code in zip(names, codes) if code is not None and code not in drawn}
+    unreported = sorted(set(missing) - _unmapped_reported)
+    if unreported:
+        listed = ", ".join(f"{missing[code]} ({code})" for code in unreported)
+        print(f"No 1:{resolution}m map geometry for {len(unreported)} country(ies): {listed}")
+        _unmapped_reported.update(unreported)
+    return np.array([None if code in missing else code for code in codes], dtype=object)
+
+# Slice a chart's pre-aggregated frame out of the fused result, shaped like
+# groupby(..., as_index=False).agg(...) with the chart's own column names
+def get_aggregate(name):
+    dataset, keys, outputs = CHART_AGGREGATIONS[name]
+    if (dataset, keys) not in _aggregate_cache:
+        prepare_aggregates([name])
+    fused = _aggregate_cache[(dataset, keys)]
+    columns = {_fused_name(column, func): output for output, (column, func) in outputs.items()}
+    return fused[list(columns)].rename(columns=columns).reset_index()
+
+# Total Population Affected per Disease Category, with each (Country,
+# Disease Category) stratum scaled up by its sample weight
+def treemap_totals():
+    treemap_data = reweight_strata(get_aggregate("disease_population_treemap"), "Population Affected")
+    return treemap_data.groupby("Disease Category", observed=True, as_index=False)["Population Affected"].sum()
+
+# Countries with the highest average life expectancy
+def top_life_expectancy(count):
+    top_countries = get_aggregate("top_countries_life_expectancy")
+    return top_countries.sort_values(by="Life_expectancy", ascending=False).head(count)
+
+# Life expectancy rows the GDP scatter plots: positive GDP and life expectancy
+def positive_gdp_rows():
+    life_expectancy_df = load_life_expectancy()
+    return life_expectancy_df[(life_expectancy_df["GDP"] > 0) & (life_expectancy_df["Life_expectancy"] > 0)]
+
+def relationship_rows(name):
+    if name in CHART_AGGREGATIONS:
+        return get_aggregate(name)
+    if name == "gdp_vs_life_expectancy":
+        return positive_gdp_rows()
+    raise KeyError(f"no rows defined for relationship {name!r}")
+
+# Fitted relationships by chart: {"statistics": ..., "curve": (x, y),
+# "points": (x, y, codes)}, the points kept for the bootstrap intervals
+_relationship_cache = {}
+
+def _statistic(value):
+    value = float(value)
+    return None if np.isnan(value) else float(f"{value:.6g}")
+
+# Fit the relationships of the given charts (default: all) in one batch.
+# Every chart's pooled points and each of its groups become one group code of
+# a single flat array, so the OLS fits and correlations of all of them come
+# out of the same vectorized passes. This is all a chart render needs; the
+# bootstrap intervals are only computed for chart_metadata.json, by
+# relationship_intervals().
+def compute_relationships(names=None):
+    names = [
+        name for name in (CHART_RELATIONSHIPS if names is None else names)
+        if name in CHART_RELATIONSHIPS and name not in _relationship_cache
+    ]
+    if not names:
+        return _relationship_cache
+
+    with span("relationships", charts=len(names)):
+        xs, ys, codes, labels, frames = [], [], [], [], {}
+        for name in names:
+            x, y, by, fit = CHART_RELATIONSHIPS[name]
+            df = relationship_rows(name).dropna(subset=[x, y])
+            frames[name] = df
+            xs.append(df[x].to_numpy(dtype=float))
+            ys.append(df[y].to_numpy(dtype=float))
+            codes.append(np.full(len(df), len(labels)))
+            labels.append((name, None))
+            if by is not None:
+                group_codes, groups = pd.factorize(df[by])
+                present = group_codes >= 0
+                xs.append(xs[-1][present])
+                ys.append(ys[-1][present])
+                codes.append(group_codes[present] + len(labels))
+                labels.extend((name, str(group)) for group in groups)
+
+        x, y, codes = np.concatenate(xs), np.concatenate(ys), np.concatenate(codes)
+        fits = chart_stats.grouped_ols(x, y, codes, len(labels))
+        spearman = chart_stats.grouped_spearman(x, y, codes, len(labels))
+
+        results, firsts = {}, {}
+        for i, (name, group) in enumerate(labels):
+            statistics = {
+                "n": int(fits["n"][i]),
+                "slope": _statistic(fits["slope"][i]),
+                "intercept": _statistic(fits["intercept"][i]),
+                "pearson": _statistic(fits["pearson"][i]),
+                "spearman": _statistic(spearman[i])
+            }
+            if group is None:
+                x_column, y_column, by, fit = CHART_RELATIONSHIPS[name]
+                firsts[name] = i
+                results[name] = {
+                    "x": x_column, "y": y_column, "fit": fit,
+                    "confidence_level": CONFIDENCE_LEVEL, **statistics
+                }
+                if by is not None:
+                    results[name]["by"] = by
+                    results[name]["groups"] = {}
+            else:
+                results[name]["groups"][group] = statistics
+
+        for name in names:
+            x_column, y_column, _, fit = CHART_RELATIONSHIPS[name]
+            df = frames[name]
+            # Too few rows (or no x spread) to fit leaves the chart without a curve
+            if fit == "lowess":
+                rows = df if len(df) <= LOWESS_MAX_ROWS else df.sample(LOWESS_MAX_ROWS, random_state=0)
+                curve = None if len(rows) < 2 else chart_stats.lowess_curve(rows[x_column].to_numpy(dtype=float), rows[y_column].to_numpy(dtype=float), LOWESS_FRAC)
+            elif results[name]["slope"] is None:
+                curve = None
+            else:
+                ends = np.array([df[x_column].min(), df[x_column].max()], dtype=float)
+                curve = (ends, results[name]["intercept"] + results[name]["slope"] * ends)
+
+            # The chart's rows, with codes counted from its pooled group
+            mine = (codes >= firsts[name]) & (codes < firsts[name] + 1 + len(results[name].get("groups", {})))
+            points = (x[mine], y[mine], codes[mine] - firsts[name])
+            _relationship_cache[name] = {"statistics": results[name], "curve": curve, "points": points}
+    return _relationship_cache
+
+# Add bootstrap intervals for the slope and Pearson's r to the statistics of
+# the given charts (default: all), again in one batch. Each group is
+# resampled at most BOOTSTRAP_MAX_ROWS rows at a time (see
+# chart_stats.grouped_bootstrap), so the cost does not grow with the data.
+def relationship_intervals(names=None):
+    compute_relationships(names)
+    names = [
+        name for name in (CHART_RELATIONSHIPS if names is None else names)
+        if name in CHART_RELATIONSHIPS and "slope_ci" not in _relationship_cache[name]["statistics"]
+    ]
+    if not names:
+        return _relationship_cache
+
+    with span("relationship_intervals", charts=len(names)):
+        xs, ys, codes, offsets = [], [], [], {}
+        for name in names:
+            x, y, chart_codes = _relationship_cache[name]["points"]
+            offsets[name] = sum(1 + len(_relationship_cache[other]["statistics"].get("groups", {})) for other in offsets)
+            xs.append(x)
+            ys.append(y)
+            codes.append(chart_codes + offsets[name])
+        n_groups = sum(1 + len(_relationship_cache[name]["statistics"].get("groups", {})) for name in names)
+        intervals = chart_stats.grouped_bootstrap(
+            np.concatenate(xs), np.concatenate(ys), np.concatenate(codes).astype(int), n_groups,
+            BOOTSTRAP_REPLICATES, CONFIDENCE_LEVEL, max_rows=BOOTSTRAP_MAX_ROWS
+        )
+
+        for name in names:
+            statistics = _relationship_cache[name]["statistics"]
+            targets = [statistics] + list(statistics.get("groups", {}).values())
+            for i, target in enumerate(targets, offsets[name]):
+                target["slope_ci"] = [_statistic(bound) for bound in intervals["slope_ci"][i]]
+                target["pearson_ci"] = [_statistic(bound) for bound in intervals["pearson_ci"][i]]
+    return _relationship_cache
+
+def relationship_statistics(name):
+    return relationship_intervals([name])[name]["statistics"]
+
+# Overlay a chart's fitted trend, labelled with its correlation
+def add_trendline(fig, name):
+    relationship = compute_relationships([name])[name]
+    statistics = relationship["statistics"]
+    if relationship["curve"] is None:
+        return fig
+
+    grid, fitted = relationship["curve"]
+    label = "OLS" if statistics["fit"] == "ols" else "LOWESS"
+    if statistics["pearson"] is not None and statistics["spearman"] is not None:
+        label += f" trend (r = {statistics['pearson']:.2f}, \u03c1 = {statistics['spearman']:.2f})"
+    else:
+        label += " trend"
+    fig.add_trace(go.Scatter(
+        x=grid,
+        y=fitted,
+        mode="lines",
+        name=label,
+        line=dict(color="#444444", width=2, dash="dash"),
+        hoverinfo="skip"
+    ))
+    return fig
+
+# Frame a chart's headline statistics are read from, and the statistic its
+# values are
+def headline_frame(name):
+    keys, measure = CHART_HEADLINES[name]
+    if name == "disease_population_treemap":
+        return treemap_totals(), "sum"
+    if name == "top_countries_life_expectancy":
+        return top_life_expectancy(10), "mean"
+    if name in CHART_AGGREGATIONS:
+        return get_aggregate(name), CHART_AGGREGATIONS[name][2][measure][1]
+
+    rows = positive_gdp_rows() if name == "gdp_vs_life_expectancy" else load_heart()
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    return rows.groupby(keys, observed=True, as_index=False)[measure].median(), "median"
+
+def _headline_label(column, value):
+    if column in HEADLINE_LABELS:
+        return HEADLINE_LABELS[column].get(value, str(value))
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+# Mean, extremes, and first and last values (in key order) of the values a
+# chart plots
+def chart_headline(name):
+    keys, measure = CHART_HEADLINES[name]
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    frame, statistic = headline_frame(name)
+    frame = frame.dropna(subset=[measure]).sort_values(keys)
+
+    values = frame[measure].to_numpy(dtype=float)
+    labels = [
+        " / ".join(_headline_label(key, value) for key, value in zip(keys, row))
+        for row in frame[keys].itertuples(index=False)
+    ]
+    if not len(values):
+        # A filter (batch variant) can leave a chart with nothing plotted
+        empty = {"label": "n/a", "value": None}
+        return {"measure": measure, "statistic": statistic, "count": 0, "mean": None,
+                "min": empty, "max": empty, "first": empty, "last": empty}
+
+    point = lambda i: {"label": labels[i], "value": _statistic(values[i])}
+    return {
+        "measure": measure,
+        "statistic": statistic,
+        "count": len(values),
+        "mean": _statistic(values.mean()),
+        "min": point(int(np.argmin(values))),
+        "max": point(int(np.argmax(values))),
+        "first": point(0),
+        "last": point(-1)
+    }
+
+def _correlation_phrase(r):
+    if r is None:
+        return "no measurable"
+    if abs(r) < 0.1:
+        return "no meaningful"
+    strength = "a weak" if abs(r) < 0.3 else "a moderate" if abs(r) < 0.5 else "a strong"
+    return f"{strength} {'positive' if r > 0 else 'negative'}"
+
+# Values the description and insight templates of CHART_METADATA can use
+def _metadata_fields(headline, statistics):
+    number = lambda value: float("nan") if value is None else value
+    fields = {"count": headline["count"], "mean": number(headline["mean"])}
+    for point in ("min", "max", "first", "last"):
+        fields[f"{point}_label"] = headline[point]["label"]
+        fields[f"{point}_value"] = number(headline[point]["value"])
+    fields["direction"] = "rose" if fields["last_value"] > fields["first_value"] else "fell"
+    if statistics is not None:
+        fields.update(
+            n=statistics["n"],
+            level=statistics["confidence_level"],
+            correlation=_correlation_phrase(statistics["pearson"]),
+            pearson=number(statistics["pearson"]),
+            pearson_low=number(statistics["pearson_ci"][0]),
+            pearson_high=number(statistics["pearson_ci"][1]),
+            spearman=number(statistics["spearman"])
+        )
+    return fields
+
+# Size and content hash of a written artifact; the ETag lets the front end
+# make conditional requests and skip charts that have not changed
+def artifact_info(file_name):
+    path = f"{IMAGE_DIR}/{file_name}"
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {
+        "bytes": os.path.getsize(path),
+        "sha256": digest.hexdigest(),
+        "etag": f'"{digest.hexdigest()[:32]}"'
+    }
+
+# Approximate bytes one value adds to an animation frame: a base64 float32
+# with binary_arrays, a short JSON number without
+def _frame_value_bytes():
+    return 16 / 3 if RENDER_OPTIONS["binary_arrays"] and _supports_typed_arrays() else 10
+
+# Year x Country panel of an animated chart, read from its Year x Country
+# aggregate: the years, the countries kept, and a (years, countries) array
+# per measure. Every year holds the same countries in the same order (NaN
+# where a country has no data that year), so frames carry values only. The
+# countries kept are those with the largest `rank_by` total that fit the
+# frame_bytes budget at one value per measure.
+def year_country_panel(name, measures, rank_by):
+    data = get_aggregate(name)
+    panel = data.set_index(["Year", "Country"])[measures].unstack("Country")
+
+    budget = max(1, int(RENDER_OPTIONS["frame_bytes"] // (len(measures) * _frame_value_bytes())))
+    totals = panel[rank_by].sum(min_count=1).dropna()
+    countries = totals.nlargest(budget).index.sort_values()
+
+    years = panel.index.to_numpy()
+    arrays = {
+        measure: panel[measure].reindex(columns=countries).to_numpy(dtype=float, copy=True)
+        for measure in measures
+    }
+    return years, np.asarray(countries.astype(str)), arrays
+
+def _padded_range(values, share=0.05):
+    low, high = np.nanmin(values), np.nanmax(values)
+    pad = (high - low) * share or 1.0
+    return [float(low - pad), float(high + pad)]
+
+# Typed-array dtype codes understood by plotly.js (2.28+)
+TYPED_ARRAY_DTYPES = {
+    "int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+    "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8"
+}
+
+# Arrays shorter than this stay plain JSON; the encoding overhead isn't worth it
+BINARY_MIN_LENGTH = 8
+
+def plotlyjs_bundle_name():
+    from plotly.offline import get_plotlyjs_version
+    return f"plotly-{get_plotlyjs_version()}.min.js"
+
+def _supports_typed_arrays():
+    from plotly.offline import get_plotlyjs_version
+    return tuple(int(part) for part in get_plotlyjs_version().split(".")[:2]) >= (2, 28)
+
+# Write the shared plotly.js bundle once per version into IMAGE_DIR
+def ensure_plotlyjs_bundle():
+    path = f"{IMAGE_DIR}/{plotlyjs_bundle_name()}"
+    if os.path.exists(path):
+        return path
+
+    from plotly.offline import get_plotlyjs
+
+    return chart_writer.write_artifact(path, get_plotlyjs())
+
+def _typed_array(values, min_length=BINARY_MIN_LENGTH):
+    array = np.asarray(values)
+    if array.dtype.kind not in "iuf" or array.size < min_length:
+        return None
+
+    # Narrow to the smallest type that holds the values exactly; 64-bit
+    # integers have no typed-array equivalent in plotly.js at all
+    if array.dtype.kind in "iu":
+        for dtype in (np.int8, np.int16, np.int32):
+            if not array.size or (array.min() >= np.iinfo(dtype).min and array.max() <= np.iinfo(dtype).max):
+                array = array.astype(dtype)
+                break
+        else:
+            if array.dtype.itemsize == 8:
+                array = array.astype(np.float64)
+    elif array.dtype == np.float64:
+        narrowed = array.astype(np.float32)
+        if np.array_equal(narrowed, array, equal_nan=True):
+            array = narrowed
+    if array.dtype.name not in TYPED_ARRAY_DTYPES:
+        return None
+
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    encoded = {
+        "dtype": TYPED_ARRAY_DTYPES[array.dtype.name],
+        "bdata": base64.b64encode(array.tobytes()).decode("ascii")
+    }
+    if array.ndim > 1:
+        encoded["shape"] = ",".join(str(dim) for dim in array.shape)
+    return encoded
+
+def _encode_arrays(value):
+    if isinstance(value, dict):
+        return {key: _encode_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        encoded = _typed_array(value) if len(value) else None
+        if encoded is not None:
+            return encoded
+        if isinstance(value, np.ndarray):
+            return value
+        return [_encode_arrays(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+# Figure as handed to the HTML writer: with binary_arrays on, numeric arrays
+# in the traces (and animation frames) become base64 typed arrays
+def _html_figure(fig):
+    if not (RENDER_OPTIONS["binary_arrays"] and _supports_typed_arrays()):
+        return fig
+
+    fig_dict = fig.to_dict()
+    fig_dict["data"] = [_encode_arrays(trace) for trace in fig_dict.get("data", [])]
+    if "frames" in fig_dict:
+        fig_dict["frames"] = [
+            {**frame, "data": [_encode_arrays(trace) for trace in frame.get("data", [])]}
+            for frame in fig_dict["frames"]
+        ]
+    return fig_dict
+
+# Trace types drawn on a geo subplot
+MAP_TRACES = {"choropleth", "scattergeo"}
+
+def is_map_figure(fig):
+    return any(trace.type in MAP_TRACES for trace in fig.data)
+
+def _map_assets_name(resolution):
+    return f"{chart_geo.topology_name(resolution)}.js"
+
+# Write the bundled world topology once per resolution into IMAGE_DIR as a
+# script that preloads it into plotly.js, so map pages never fetch it
+def ensure_map_assets(resolution):
+    path = f"{IMAGE_DIR}/{_map_assets_name(resolution)}"
+    if os.path.exists(path):
+        return path
+
+    return chart_writer.write_artifact(path, chart_geo.topology_script(resolution))
+
+# Point Kaleido at the bundled topology instead of the CDN
+def use_local_topojson():
+    url = chart_geo.topology_url()
+    if hasattr(pio, "defaults") and hasattr(pio.defaults, "topojson"):
+        pio.defaults.topojson = url
+    elif pio.kaleido.scope.topojson != url:
+        pio.kaleido.scope.topojson = url
 
-# Load datasets
-global_health_df = pd.read_csv(f"{DATA_DIR}/sampled_global_health.csv")
-life_expectancy_df = pd.read_csv(f"{DATA_DIR}/life_expectancy_cleaned.csv")
-heart_df = pd.read_csv(f"{DATA_DIR}/heart_cleaned.csv")
+# A chart's interactive HTML page, with the render options applied: plotly.js
+# from the CDN or the shared local bundle, typed arrays, and for maps the
+# topology script loaded ahead of plotly.js. Both assets are referenced by
+# file name next to the page; chart_asset() returns their contents.
+def chart_html(fig):
+    include_plotlyjs = plotlyjs_bundle_name() if RENDER_OPTIONS["plotlyjs"] == "local" else 'cdn'
+    html = pio.to_html(_html_figure(fig), include_plotlyjs=include_plotlyjs, validate=False, full_html=True)
+    if is_map_figure(fig):
+        assets = _map_assets_name(RENDER_OPTIONS["map_resolution"])
+        html = html.replace("</head>", f'<script src="{assets}"></script>\n</head>', 1)
+    return html
 
-# Clean column names for life expectancy dataset
-life_expectancy_df.columns = life_expectancy_df.columns.str.strip().str.replace(" ", "_")
+# Contents of an asset file chart_html() pages refer to, None for any other name
+def chart_asset(file_name):
+    if RENDER_OPTIONS["plotlyjs"] == "local" and file_name == plotlyjs_bundle_name():
+        from plotly.offline import get_plotlyjs
+
+        return get_plotlyjs()
+    if file_name == _map_assets_name(RENDER_OPTIONS["map_resolution"]):
+        return chart_geo.topology_script(RENDER_OPTIONS["map_resolution"])
+    return None
+
+def chart_png(fig):
+    if is_map_figure(fig):
+        use_local_topojson()
+    return pio.to_image(fig, format="png")
+
+# Serialize a chart's interactive HTML and static PNG and queue them for the
+# background writer (chart_writer.py), which writes them atomically into
+# IMAGE_DIR with compressed siblings
+def write_chart_html(fig, name):
+    with span("write_html", chart=name):
+        html = chart_html(fig)
+        if is_map_figure(fig):
+            ensure_map_assets(RENDER_OPTIONS["map_resolution"])
+        chart_writer.submit_write(f"{IMAGE_DIR}/{name}.html", html)
+
+def write_chart_png(fig, name):
+    with span("write_png", chart=name):
+        chart_writer.submit_write(f"{IMAGE_DIR}/{name}.png", chart_png(fig))
+
+# Figures collected by capture_figures() instead of being written
+_figure_sink = None
+
+# Collect the figures generators produce inside the block, keyed by chart,
+# without writing any files
+@contextmanager
+def capture_figures():
+    global _figure_sink
+    saved = _figure_sink
+    _figure_sink = {}
+    try:
+        yield _figure_sink
+    finally:
+        _figure_sink = saved
+
+def save_figure(fig, name):
+    if _figure_sink is not None:
+        _figure_sink[name] = fig
+        return f"{name}.html"
+
+    write_chart_html(fig, name)
+    write_chart_png(fig, name)
+    return f"{name}.html"
 
 # 1. Bar Chart - Average Mortality Rate by Disease Category
 def generate_mortality_by_category():
-    # Group by Disease Category and calculate average mortality rate
-    avg_mortality_by_category = global_health_df.groupby("Disease Category", as_index=False)["Mortality Rate (%)"].mean()
+    # Average mortality rate per Disease Category
+    avg_mortality_by_category = get_aggregate("mortality_by_category")
     
     # Create Plotly bar chart
-    fig = px.bar(
+    fig = chart_figures.continuous_bar(
         avg_mortality_by_category,
         x="Disease Category",
         y="Mortality Rate (%)",
         title="Average Mortality Rate by Disease Category",
         labels={"Mortality Rate (%)": "Avg. Mortality Rate (%)"},
-        text_auto=".2f",
-        color="Mortality Rate (%)",
-        color_continuous_scale="Viridis"
+        text_format=".2f",
+        scale="Viridis"
     )
     
     # Update layout for better readability
@@ -50,16 +1264,12 @@ def generate_mortality_by_category():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/mortality_by_category.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/mortality_by_category.png")
-    
-    return "mortality_by_category.html"
+    return save_figure(fig, "mortality_by_category")
 
 # 2. Line Chart - Mortality Rate Over Years
 def generate_mortality_over_years():
-    # Group and compute average mortality rate per year
-    df_line = global_health_df[["Year", "Mortality Rate (%)"]].dropna()
-    avg_by_year = df_line.groupby("Year").mean().reset_index()
+    # Average mortality rate per year
+    avg_by_year = get_aggregate("mortality_over_years")
     
     # Create figure
     fig = go.Figure()
@@ -100,104 +1310,90 @@ def generate_mortality_over_years():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/mortality_over_years.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/mortality_over_years.png")
-    
-    return "mortality_over_years.html"
+    return save_figure(fig, "mortality_over_years")
 
 # 3. Bubble Chart - Urbanization Rate vs Mortality Rate by Country
 def generate_urbanization_vs_mortality():
-    # Group by Country to reduce chart density
-    bubble_data = global_health_df.groupby("Country", as_index=False).agg({
-        "Urbanization Rate (%)": "mean",
-        "Mortality Rate (%)": "mean",
-        "Population Affected": "sum"
-    })
+    # Per-Country aggregates to reduce chart density
+    bubble_data = get_aggregate("urbanization_vs_mortality")
     
-    # Create the bubble chart
-    fig = px.scatter(
+    # Create the bubble chart, one trace per Country
+    fig = chart_figures.grouped_scatter(
         bubble_data,
         x="Urbanization Rate (%)",
         y="Mortality Rate (%)",
         size="Population Affected",
-        color="Country",
+        group="Country",
         title="Urbanization Rate vs Mortality Rate by Country",
         labels={
             "Urbanization Rate (%)": "Urbanization Rate (%)",
             "Mortality Rate (%)": "Mortality Rate (%)",
             "Population Affected": "Population Affected"
         },
-        hover_name="Country",
         size_max=60,
+        render_mode=scatter_render_mode(len(bubble_data)),
         template="plotly_white",
         height=600
     )
     
-    # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/urbanization_vs_mortality.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/urbanization_vs_mortality.png")
+    # Add trendline
+    add_trendline(fig, "urbanization_vs_mortality")
     
-    return "urbanization_vs_mortality.html"
+    # Save the figure
+    return save_figure(fig, "urbanization_vs_mortality")
 
 # 4. Scatter Plot - Education Index vs Prevalence Rate
 def generate_education_vs_prevalence():
-    # Group by Country to reduce point density
-    scatter_data = global_health_df.groupby("Country", as_index=False).agg({
-        "Education Index": "mean",
-        "Prevalence Rate (%)": "mean",
-        "Disease Name": "count"
-    }).rename(columns={"Disease Name": "Disease Count"})
-    
-    # Create Plotly scatter plot
-    fig = px.scatter(
+    # Per-Country aggregates to reduce point density
+    scatter_data = get_aggregate("education_vs_prevalence")
+    
+    # Create Plotly scatter plot, one trace per Country
+    fig = chart_figures.grouped_scatter(
         scatter_data,
         x="Education Index",
         y="Prevalence Rate (%)",
         size="Disease Count",
-        color="Country",
+        group="Country",
         title="Education Index vs Prevalence Rate by Country",
-        hover_name="Country",
         size_max=50,
+        render_mode=scatter_render_mode(len(scatter_data)),
         template="plotly_white",
         height=600
     )
     
     # Add trendline
+    add_trendline(fig, "education_vs_prevalence")
     fig.update_layout(
         xaxis_title="Education Index",
         yaxis_title="Prevalence Rate (%)"
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/education_vs_prevalence.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/education_vs_prevalence.png")
-    
-    return "education_vs_prevalence.html"
+    return save_figure(fig, "education_vs_prevalence")
 
 # 5. Heatmap - Mortality Rate by Country and Disease
 def generate_mortality_heatmap():
-    # Create pivot table: rows = Country, columns = Disease Name, values = avg Mortality Rate
-    heatmap_data = global_health_df.pivot_table(
-        index="Country",
-        columns="Disease Name",
-        values="Mortality Rate (%)",
-        aggfunc="mean"
-    ).fillna(0)
-    
-    # Convert to long format for Plotly
-    heatmap_long = heatmap_data.reset_index().melt(id_vars="Country", var_name="Disease Name", value_name="Mortality Rate (%)")
+    # Dense matrix of the per-(Country, Disease Name) averages: rows = Country,
+    # columns = Disease Name, missing combinations left as NaN
+    z, countries, diseases = long_to_matrix(
+        get_aggregate("mortality_heatmap"),
+        "Country", "Disease Name", "Mortality Rate (%)",
+        top_n=RENDER_OPTIONS["heatmap_top_n"]
+    )
     
     # Create heatmap
-    fig = px.density_heatmap(
-        heatmap_long,
-        x="Disease Name",
-        y="Country",
-        z="Mortality Rate (%)",
-        color_continuous_scale="Reds",
-        title="Heatmap of Mortality Rate by Country and Disease"
-    )
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=diseases,
+        y=countries,
+        colorscale="Reds",
+        colorbar=dict(title="Mortality Rate (%)"),
+        hoverongaps=False,
+        hovertemplate="Disease Name: %{x}<br>Country: %{y}<br>Mortality Rate: %{z:.2f}%<extra></extra>"
+    ))
     
     fig.update_layout(
+        title="Heatmap of Mortality Rate by Country and Disease",
         xaxis_title="Disease Name",
         yaxis_title="Country",
         xaxis_tickangle=-45,
@@ -205,15 +1401,12 @@ def generate_mortality_heatmap():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/mortality_heatmap.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/mortality_heatmap.png")
-    
-    return "mortality_heatmap.html"
+    return save_figure(fig, "mortality_heatmap")
 
 # 6. Area Chart - Life Expectancy Over Time
 def generate_life_expectancy_over_time():
-    # Group by Year
-    area_data = life_expectancy_df.groupby("Year", as_index=False)["Life_expectancy"].mean()
+    # Average life expectancy per Year
+    area_data = get_aggregate("life_expectancy_over_time")
     
     # Area chart
     fig = px.area(
@@ -233,15 +1426,12 @@ def generate_life_expectancy_over_time():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/life_expectancy_over_time.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/life_expectancy_over_time.png")
-    
-    return "life_expectancy_over_time.html"
+    return save_figure(fig, "life_expectancy_over_time")
 
 # 7. Treemap - Disease Category vs Population Affected
 def generate_disease_population_treemap():
-    # Group by Disease Category and sum Population Affected
-    treemap_data = global_health_df.groupby("Disease Category", as_index=False)["Population Affected"].sum()
+    # Total Population Affected per Disease Category
+    treemap_data = treemap_totals()
     
     # Plotly Treemap
     fig = px.treemap(
@@ -255,21 +1445,24 @@ def generate_disease_population_treemap():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/disease_population_treemap.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/disease_population_treemap.png")
-    
-    return "disease_population_treemap.html"
+    return save_figure(fig, "disease_population_treemap")
 
 # 8. Choropleth Map - Mortality Rate by Country
 def generate_mortality_choropleth():
-    # Group by country and compute average mortality rate
-    choropleth_data = global_health_df.groupby("Country", as_index=False)["Mortality Rate (%)"].mean()
+    # Average mortality rate per Country
+    choropleth_data = get_aggregate("mortality_choropleth")
+    
+    # Resolve names to ISO-3 codes up front; names without a code or map
+    # geometry were reported
+    choropleth_data["ISO3"] = map_locations(choropleth_data["Country"])
+    choropleth_data = choropleth_data.dropna(subset=["ISO3"])
     
     # Create the choropleth map
     fig = px.choropleth(
         choropleth_data,
-        locations="Country",
-        locationmode="country names",
+        locations="ISO3",
+        locationmode="ISO-3",
+        hover_name="Country",
         color="Mortality Rate (%)",
         color_continuous_scale="Reds",
         title="Average Mortality Rate by Country",
@@ -280,34 +1473,43 @@ def generate_mortality_choropleth():
         geo=dict(
             showframe=False,
             showcoastlines=True,
-            projection_type='equirectangular'
+            projection_type='equirectangular',
+            resolution=RENDER_OPTIONS["map_resolution"]
         )
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/mortality_choropleth.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/mortality_choropleth.png")
-    
-    return "mortality_choropleth.html"
+    return save_figure(fig, "mortality_choropleth")
 
 # 9. Violin Plot - Cholesterol by Gender
 def generate_cholesterol_by_gender():
+    heart_df = load_heart()
+
     # Map sex to gender labels
     heart_df["Gender"] = heart_df["sex"].map({1: "Male", 0: "Female"})
     
-    # Create Violin Plot
-    fig = px.violin(
-        heart_df,
-        x="Gender",
-        y="chol",
-        color="Gender",
-        box=True,
-        points="all",
-        title="Cholesterol Distribution by Gender",
-        labels={"chol": "Cholesterol", "Gender": "Gender"},
-        template="plotly_white",
-        height=500
-    )
+    # Create Violin Plot; large inputs get server-side KDE and box statistics
+    if use_summary(len(heart_df)):
+        fig = summary_violin_figure(heart_df, "Gender", "chol")
+        fig.update_layout(
+            title="Cholesterol Distribution by Gender",
+            legend_title_text="Gender",
+            template="plotly_white",
+            height=500
+        )
+    else:
+        fig = px.violin(
+            heart_df,
+            x="Gender",
+            y="chol",
+            color="Gender",
+            box=True,
+            points="all",
+            title="Cholesterol Distribution by Gender",
+            labels={"chol": "Cholesterol", "Gender": "Gender"},
+            template="plotly_white",
+            height=500
+        )
     
     fig.update_layout(
         xaxis_title="Gender",
@@ -315,25 +1517,33 @@ def generate_cholesterol_by_gender():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/cholesterol_by_gender.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/cholesterol_by_gender.png")
-    
-    return "cholesterol_by_gender.html"
+    return save_figure(fig, "cholesterol_by_gender")
 
 # 10. Box Plot - Age Distribution by Heart Disease Presence
 def generate_age_by_heart_disease():
-    # Create box plot
-    fig = px.box(
-        heart_df,
-        x="target",
-        y="age",
-        color="target",
-        title="Age Distribution by Heart Disease Presence",
-        labels={"target": "Heart Disease (0 = No, 1 = Yes)", "age": "Age"},
-        category_orders={"target": [0, 1]},
-        template="plotly_white",
-        height=500
-    )
+    heart_df = load_heart()
+
+    # Create box plot; large inputs get precomputed quartiles and outliers
+    if use_summary(len(heart_df)):
+        fig = summary_box_figure(heart_df, "target", "age", order=[0, 1])
+        fig.update_layout(
+            title="Age Distribution by Heart Disease Presence",
+            legend_title_text="Heart Disease (0 = No, 1 = Yes)",
+            template="plotly_white",
+            height=500
+        )
+    else:
+        fig = px.box(
+            heart_df,
+            x="target",
+            y="age",
+            color="target",
+            title="Age Distribution by Heart Disease Presence",
+            labels={"target": "Heart Disease (0 = No, 1 = Yes)", "age": "Age"},
+            category_orders={"target": [0, 1]},
+            template="plotly_white",
+            height=500
+        )
     
     fig.update_layout(
         xaxis_title="Heart Disease Presence",
@@ -341,34 +1551,27 @@ def generate_age_by_heart_disease():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/age_by_heart_disease.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/age_by_heart_disease.png")
-    
-    return "age_by_heart_disease.html"
+    return save_figure(fig, "age_by_heart_disease")
 
 # 11. Bar Chart - Life Expectancy of Top 10 Countries
 def generate_top_countries_life_expectancy():
-    # Calculate average life expectancy per country
-    top_countries = life_expectancy_df.groupby("Country", as_index=False)["Life_expectancy"].mean()
-    
-    # Select top 10
-    top10 = top_countries.sort_values(by="Life_expectancy", ascending=False).head(10)
+    # Top 10 countries by average life expectancy
+    top10 = top_life_expectancy(10)
     
     # Plotly bar chart
-    fig = px.bar(
+    fig = chart_figures.continuous_bar(
         top10,
         x="Country",
         y="Life_expectancy",
         title="Top 10 Countries by Average Life Expectancy",
         labels={"Life_expectancy": "Average Life Expectancy (years)"},
-        text="Life_expectancy",
-        color="Life_expectancy",
-        color_continuous_scale="Viridis",
+        text_format=".2f",
+        scale="Viridis",
         template="plotly_white",
         height=500
     )
     
-    fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+    fig.update_traces(textposition='outside')
     fig.update_layout(
         xaxis_title="Country",
         yaxis_title="Average Life Expectancy (years)",
@@ -376,46 +1579,54 @@ def generate_top_countries_life_expectancy():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/top_countries_life_expectancy.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/top_countries_life_expectancy.png")
-    
-    return "top_countries_life_expectancy.html"
+    return save_figure(fig, "top_countries_life_expectancy")
 
 # 12. Scatter Plot - GDP vs Life Expectancy
 def generate_gdp_vs_life_expectancy():
     # Filter out rows with missing or zero GDP or Life Expectancy
-    df_filtered = life_expectancy_df[(life_expectancy_df["GDP"] > 0) & (life_expectancy_df["Life_expectancy"] > 0)]
+    df_filtered = positive_gdp_rows()
+
+    # Keep the marker count within the point budget
+    df_filtered = downsample_scatter(
+        df_filtered, "GDP", "Life_expectancy", RENDER_OPTIONS["point_budget"],
+        group="Country", size="Population"
+    )
     
-    # Plotly scatter plot
-    fig = px.scatter(
+    # Plotly scatter plot, one trace per Country
+    fig = chart_figures.grouped_scatter(
         df_filtered,
         x="GDP",
         y="Life_expectancy",
-        color="Country",
+        group="Country",
         size="Population",
-        hover_name="Country",
         title="GDP vs Life Expectancy",
         labels={"GDP": "GDP (USD)", "Life_expectancy": "Life Expectancy (years)"},
         size_max=40,
+        render_mode=scatter_render_mode(len(df_filtered)),
         template="plotly_white",
         height=600
     )
     
+    # Add the LOWESS trend, fitted on every row rather than the downsample
+    add_trendline(fig, "gdp_vs_life_expectancy")
     fig.update_layout(
         xaxis_title="GDP (USD)",
         yaxis_title="Life Expectancy (years)"
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/gdp_vs_life_expectancy.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/gdp_vs_life_expectancy.png")
-    
-    return "gdp_vs_life_expectancy.html"
+    return save_figure(fig, "gdp_vs_life_expectancy")
 
 # 13. Parallel Coordinates Plot - Heart Disease Features
 def generate_heart_disease_parallel():
+    heart_df = load_heart()
+
     # Select relevant features for comparison
     parallel_data = heart_df[["age", "chol", "trestbps", "thalach", "oldpeak", "target"]].copy()
+
+    # Large inputs are reduced to a seeded sample stratified by target
+    if use_summary(len(parallel_data)):
+        parallel_data = chart_stats.stratified_sample(parallel_data, "target", RENDER_OPTIONS["summary_sample"])
     
     # Create Parallel Coordinates Plot
     fig = px.parallel_coordinates(
@@ -435,42 +1646,541 @@ def generate_heart_disease_parallel():
     )
     
     # Save the figure
-    pio.write_html(fig, file=f"{IMAGE_DIR}/heart_disease_parallel.html", include_plotlyjs='cdn')
-    pio.write_image(fig, file=f"{IMAGE_DIR}/heart_disease_parallel.png")
-    
-    return "heart_disease_parallel.html"
-
-# Generate all charts and collect their filenames
-chart_files = {
-    "mortality_by_category": generate_mortality_by_category(),
-    "mortality_over_years": generate_mortality_over_years(),
-    "urbanization_vs_mortality": generate_urbanization_vs_mortality(),
-    "education_vs_prevalence": generate_education_vs_prevalence(),
-    "mortality_heatmap": generate_mortality_heatmap(),
-    "life_expectancy_over_time": generate_life_expectancy_over_time(),
-    "disease_population_treemap": generate_disease_population_treemap(),
-    "mortality_choropleth": generate_mortality_choropleth(),
-    "cholesterol_by_gender": generate_cholesterol_by_gender(),
-    "age_by_heart_disease": generate_age_by_heart_disease(),
-    "top_countries_life_expectancy": generate_top_countries_life_expectancy(),
-    "gdp_vs_life_expectancy": generate_gdp_vs_life_expectancy(),
-    "heart_disease_parallel": generate_heart_disease_parallel()
+    return save_figure(fig, "heart_disease_parallel")
+
+# 14. Animated Choropleth - Mortality Rate by Country per Year
+def generate_mortality_choropleth_animated():
+    # Average mortality rate per Year and Country, from one grouped pass
+    years, countries, values = year_country_panel(
+        "mortality_choropleth_animated", ["Mortality Rate (%)"], "Mortality Rate (%)"
+    )
+    mortality = values["Mortality Rate (%)"]
+
+    # Countries without an ISO-3 code or map geometry are reported and left off the map
+    codes = map_locations(countries)
+    matched = np.array([code is not None for code in codes])
+    countries, codes, mortality = countries[matched], codes[matched], mortality[:, matched]
+
+    trace = {
+        "type": "choropleth",
+        "locations": codes,
+        "locationmode": "ISO-3",
+        "z": mortality[0],
+        "zmin": float(np.nanmin(mortality)),
+        "zmax": float(np.nanmax(mortality)),
+        "colorscale": chart_figures.colorscale("Reds"),
+        "colorbar": {"title": {"text": "Mortality Rate (%)"}},
+        "hovertext": countries,
+        "hovertemplate": "<b>%{hovertext}</b><br>Mortality Rate (%)=%{z:.2f}<extra></extra>"
+    }
+    layout = {
+        "title": {"text": "Average Mortality Rate by Country and Year"},
+        "height": 600,
+        "geo": {
+            "showframe": False,
+            "showcoastlines": True,
+            "projection": {"type": "equirectangular"},
+            "resolution": RENDER_OPTIONS["map_resolution"]
+        },
+        **chart_figures.animation_controls(years, "Year", redraw=True)
+    }
+    frames = chart_figures.animation_frames("choropleth", years, {"z": mortality})
+    fig = chart_figures.figure_from_spec([trace], layout, "plotly", frames)
+    
+    # Save the figure
+    return save_figure(fig, "mortality_choropleth_animated")
+
+# 15. Animated Bubble Chart - Urbanization Rate vs Mortality Rate per Year
+def generate_urbanization_vs_mortality_animated():
+    # Per-Year and per-Country aggregates, from one grouped pass
+    measures = ["Urbanization Rate (%)", "Mortality Rate (%)", "Population Affected"]
+    years, countries, values = year_country_panel("urbanization_vs_mortality_animated", measures, "Population Affected")
+    urbanization, mortality, population = (values[measure] for measure in measures)
+    population = np.nan_to_num(population)  # marker sizes must be numbers
+
+    colors = chart_figures.colorway("plotly_white")
+    trace = {
+        "type": "scatter",
+        "mode": "markers",
+        "x": urbanization[0],
+        "y": mortality[0],
+        "ids": countries,
+        "hovertext": countries,
+        "hovertemplate": "<b>%{hovertext}</b><br>Urbanization Rate (%)=%{x:.2f}<br>"
+                         "Mortality Rate (%)=%{y:.2f}<br>Population Affected=%{marker.size:,.0f}<extra></extra>",
+        "marker": {
+            "size": population[0],
+            "sizemode": "area",
+            "sizeref": float(np.nanmax(population)) / 60 ** 2,
+            "color": [colors[i % len(colors)] for i in range(len(countries))]
+        }
+    }
+    layout = {
+        "title": {"text": "Urbanization Rate vs Mortality Rate by Country and Year"},
+        "height": 600,
+        "xaxis": {"title": {"text": "Urbanization Rate (%)"}, "range": _padded_range(urbanization)},
+        "yaxis": {"title": {"text": "Mortality Rate (%)"}, "range": _padded_range(mortality)},
+        **chart_figures.animation_controls(years, "Year")
+    }
+    frames = chart_figures.animation_frames("scatter", years, {
+        "x": urbanization, "y": mortality, "marker.size": population
+    })
+    fig = chart_figures.figure_from_spec([trace], layout, "plotly_white", frames)
+    
+    # Save the figure
+    return save_figure(fig, "urbanization_vs_mortality_animated")
+
+# 16. Animated Scatter Plot - GDP vs Life Expectancy per Year
+def generate_gdp_vs_life_expectancy_animated():
+    # Per-Year and per-Country values, from one grouped pass
+    measures = ["GDP", "Life_expectancy", "Population"]
+    years, countries, values = year_country_panel("gdp_vs_life_expectancy_animated", measures, "Population")
+    gdp, life_expectancy, population = (values[measure] for measure in measures)
+
+    # Leave out missing or zero GDP or Life Expectancy, as the static chart
+    # does; marker sizes must be numbers, so hidden points get size 0
+    missing = ~((gdp > 0) & (life_expectancy > 0))
+    gdp[missing] = life_expectancy[missing] = np.nan
+    population[missing] = 0
+
+    colors = chart_figures.colorway("plotly_white")
+    trace = {
+        "type": "scatter",
+        "mode": "markers",
+        "x": gdp[0],
+        "y": life_expectancy[0],
+        "ids": countries,
+        "hovertext": countries,
+        "hovertemplate": "<b>%{hovertext}</b><br>GDP (USD)=%{x:,.0f}<br>"
+                         "Life Expectancy (years)=%{y:.1f}<br>Population=%{marker.size:,.0f}<extra></extra>",
+        "marker": {
+            "size": population[0],
+            "sizemode": "area",
+            "sizeref": float(np.nanmax(population)) / 40 ** 2,
+            "color": [colors[i % len(colors)] for i in range(len(countries))]
+        }
+    }
+    layout = {
+        "title": {"text": "GDP vs Life Expectancy by Year"},
+        "height": 600,
+        "xaxis": {"title": {"text": "GDP (USD)"}, "range": _padded_range(gdp)},
+        "yaxis": {"title": {"text": "Life Expectancy (years)"}, "range": _padded_range(life_expectancy)},
+        **chart_figures.animation_controls(years, "Year")
+    }
+    frames = chart_figures.animation_frames("scatter", years, {
+        "x": gdp, "y": life_expectancy, "marker.size": population
+    })
+    fig = chart_figures.figure_from_spec([trace], layout, "plotly_white", frames)
+    
+    # Save the figure
+    return save_figure(fig, "gdp_vs_life_expectancy_animated")
+
+# Registry of chart generators, in dashboard order
+CHART_GENERATORS = {
+    "mortality_by_category": generate_mortality_by_category,
+    "mortality_over_years": generate_mortality_over_years,
+    "urbanization_vs_mortality": generate_urbanization_vs_mortality,
+    "education_vs_prevalence": generate_education_vs_prevalence,
+    "mortality_heatmap": generate_mortality_heatmap,
+    "life_expectancy_over_time": generate_life_expectancy_over_time,
+    "disease_population_treemap": generate_disease_population_treemap,
+    "mortality_choropleth": generate_mortality_choropleth,
+    "cholesterol_by_gender": generate_cholesterol_by_gender,
+    "age_by_heart_disease": generate_age_by_heart_disease,
+    "top_countries_life_expectancy": generate_top_countries_life_expectancy,
+    "gdp_vs_life_expectancy": generate_gdp_vs_life_expectancy,
+    "heart_disease_parallel": generate_heart_disease_parallel,
+    "mortality_choropleth_animated": generate_mortality_choropleth_animated,
+    "urbanization_vs_mortality_animated": generate_urbanization_vs_mortality_animated,
+    "gdp_vs_life_expectancy_animated": generate_gdp_vs_life_expectancy_animated
 }
 
-# Print success message
-print("All charts generated successfully!")
-print(f"HTML files saved in: {IMAGE_DIR}/")
-print(f"PNG files saved in: {IMAGE_DIR}/")
+# Time-slider variants; rendered only when asked for (--animate or by name)
+ANIMATED_CHARTS = {
+    "mortality_choropleth_animated",
+    "urbanization_vs_mortality_animated",
+    "gdp_vs_life_expectancy_animated"
+}
 
-# Create a JSON file with chart metadata for the webpage
-import json
+# Charts rendered when no selection is given
+DEFAULT_CHARTS = [name for name in CHART_GENERATORS if name not in ANIMATED_CHARTS]
+
+# Input columns each chart reads, per dataset. Together with the generator's
+# own source (aggregation parameters and layout options) these form the
+# chart's build key.
+CHART_INPUTS = {
+    "mortality_by_category": {"global_health": ["Disease Category", "Mortality Rate (%)"]},
+    "mortality_over_years": {"global_health": ["Year", "Mortality Rate (%)"]},
+    "urbanization_vs_mortality": {"global_health": ["Country", "Urbanization Rate (%)", "Mortality Rate (%)", "Population Affected"]},
+    "education_vs_prevalence": {"global_health": ["Country", "Education Index", "Prevalence Rate (%)", "Disease Name"]},
+    "mortality_heatmap": {"global_health": ["Country", "Disease Name", "Mortality Rate (%)"]},
+    "life_expectancy_over_time": {"life_expectancy": ["Year", "Life_expectancy"]},
+    "disease_population_treemap": {"global_health": ["Country", "Disease Category", "Population Affected"]},
+    "mortality_choropleth": {"global_health": ["Country", "Mortality Rate (%)"]},
+    "cholesterol_by_gender": {"heart": ["sex", "chol"]},
+    "age_by_heart_disease": {"heart": ["target", "age"]},
+    "top_countries_life_expectancy": {"life_expectancy": ["Country", "Life_expectancy"]},
+    "gdp_vs_life_expectancy": {"life_expectancy": ["Country", "GDP", "Life_expectancy", "Population", "Status"]},
+    "heart_disease_parallel": {"heart": ["age", "chol", "trestbps", "thalach", "oldpeak", "target"]},
+    "mortality_choropleth_animated": {"global_health": ["Year", "Country", "Mortality Rate (%)"]},
+    "urbanization_vs_mortality_animated": {"global_health": ["Year", "Country", "Urbanization Rate (%)", "Mortality Rate (%)", "Population Affected"]},
+    "gdp_vs_life_expectancy_animated": {"life_expectancy": ["Year", "Country", "GDP", "Life_expectancy", "Population"]}
+}
+
+MANIFEST_FILE = "build_manifest.json"
 
-chart_metadata = [
+# Columns hashed during a streaming pass are used as-is so the build key
+# never forces a full load of a streamed dataset
+def _column_hash(dataset, column, cache):
+    key = (dataset, column)
+    if key in _streamed_column_hashes:
+        return _streamed_column_hashes[key]
+    if key not in cache:
+        df = _DATASET_LOADERS[dataset]()
+        cache[key] = hashlib.sha256(_hash_values(df[column])).hexdigest()
+    return cache[key]
+
+# Modules whose figure and statistics builders the generators share; their
+# source is part of every build key
+CHART_HELPER_MODULES = ("chart_figures", "chart_stats")
+
+_code_hashes = {}
+
+def _hash_code(code, digest):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _hash_code(const, digest)
+        else:
+            digest.update(repr(sorted(const, key=repr) if isinstance(const, frozenset) else const).encode())
+
+# Hash of the bytecode of a chart's generator and of every function of this
+# module it reaches (long_to_matrix, summary_*_figure, save_figure, ...),
+# followed through the global names each body refers to, plus the source of
+# the helper modules. Bytecode leaves out comments and line numbers, so only
+# changes to what the code does invalidate a chart.
+def _code_hash(name):
+    if name in _code_hashes:
+        return _code_hashes[name]
+
+    digest = hashlib.sha256()
+    seen, pending = set(), [CHART_GENERATORS[name]]
+    while pending:
+        function = pending.pop()
+        if function in seen:
+            continue
+        seen.add(function)
+        codes = [function.__code__]
+        while codes:
+            code = codes.pop()
+            codes.extend(const for const in code.co_consts if inspect.iscode(const))
+            for global_name in code.co_names:
+                # type() rather than isinstance(), which would load the lazy modules
+                value = globals().get(global_name)
+                if type(value) is types.FunctionType and value.__module__ == __name__:
+                    pending.append(value)
+    for function in sorted(seen, key=lambda function: function.__name__):
+        digest.update(function.__name__.encode())
+        digest.update(repr(function.__defaults__).encode())
+        _hash_code(function.__code__, digest)
+
+    for module in CHART_HELPER_MODULES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module}.py"), "rb") as f:
+            digest.update(f.read())
+    _code_hashes[name] = digest.hexdigest()
+    return _code_hashes[name]
+
+# Hash of everything a chart depends on: its input columns, its spec and the
+# code that builds it
+def chart_build_key(name, cache=None):
+    cache = {} if cache is None else cache
+    digest = hashlib.sha256()
+    digest.update(_code_hash(name).encode())
+    digest.update(repr(CHART_AGGREGATIONS.get(name)).encode())
+    if name in CHART_RELATIONSHIPS:
+        digest.update(repr((CHART_RELATIONSHIPS[name], LOWESS_FRAC, LOWESS_MAX_ROWS)).encode())
+    digest.update(repr(sorted(RENDER_OPTIONS.items())).encode())
+    for dataset, columns in sorted(CHART_INPUTS[name].items()):
+        for column in columns:
+            digest.update(f"{dataset}:{column}:".encode())
+            digest.update(_column_hash(dataset, column, cache).encode())
+    if name in WEIGHTED_CHARTS and os.path.exists(f"{DATA_DIR}/{SAMPLE_WEIGHTS_FILE}"):
+        with open(f"{DATA_DIR}/{SAMPLE_WEIGHTS_FILE}", "rb") as f:
+            digest.update(hashlib.sha256(f.read()).hexdigest().encode())
+    if name in MAP_CHARTS:
+        geo_files = (chart_geo.topology_path(RENDER_OPTIONS["map_resolution"]), os.path.join(chart_geo.GEO_DIR, chart_geo.INDEX_FILE))
+        for path in geo_files:
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).hexdigest().encode())
+    return digest.hexdigest()
+
+def load_manifest():
+    path = f"{IMAGE_DIR}/{MANIFEST_FILE}"
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    chart_writer.write_artifact(f"{IMAGE_DIR}/{MANIFEST_FILE}", json.dumps(manifest, indent=2, sort_keys=True), compress=False)
+
+def _artifacts_exist(name):
+    return all(os.path.exists(f"{IMAGE_DIR}/{name}.{ext}") for ext in ("html", "png"))
+
+# Build one chart's figure in memory, optionally against filtered datasets
+def build_figure(name, filters=None):
+    with dataset_filters(filters), capture_figures() as figures:
+        CHART_GENERATORS[name]()
+    return figures[name]
+
+# Start the Kaleido renderer once per worker so every chart the worker builds
+# reuses the same warm process instead of paying the startup cost again
+def _init_render_worker(data_dir, image_dir, backend, options, trace_options, writer_options):
+    configure(data_dir, image_dir, backend, **options)
+    configure_tracing(**trace_options)
+    chart_writer.configure_writer(**writer_options)
+    use_local_topojson()
+    pio.to_image(go.Figure(), format="png", width=10, height=10)
+
+# Write into another output directory for the duration of the block
+@contextmanager
+def output_dir(path):
+    global IMAGE_DIR
+    saved = IMAGE_DIR
+    IMAGE_DIR = path
+    try:
+        yield
+    finally:
+        IMAGE_DIR = saved
+
+# Filters and output directory of one batch variant (see render_variants)
+@contextmanager
+def variant_context(filters, image_dir):
+    with output_dir(image_dir), dataset_filters(filters, _batch_cache):
+        yield
+
+# Build one chart, optionally as a (filters, image_dir) variant. A variant
+# whose filters leave a chart nothing to plot skips it (returning None)
+# instead of failing the whole batch, as the chart server answers 422.
+def _render_chart(name, variant=None):
+    with variant_context(*variant) if variant else nullcontext(), span("chart", chart=name), profiled(name):
+        if variant is None:
+            return CHART_GENERATORS[name]()
+        try:
+            return CHART_GENERATORS[name]()
+        except (ValueError, KeyError, IndexError) as error:
+            print(f"Skipped {name} in {variant[1]}: {error or type(error).__name__}")
+            return None
+
+# A worker process may exit as soon as its task returns, so its queued writes
+# are flushed before the result is handed back
+def _render_chart_flushed(name, variant=None):
+    result = _render_chart(name, variant)
+    with span("flush_writes", chart=name):
+        chart_writer.flush_writes()
+    return result
+
+# Render (chart, variant) tasks across one pool of worker processes
+def _render_tasks(tasks, workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+
+    if workers == 1:
+        rendered = [_render_chart(*task) for task in tasks]
+        with span("flush_writes"):
+            chart_writer.flush_writes()
+        return rendered
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_render_worker,
+        initargs=(DATA_DIR, IMAGE_DIR, AGGREGATION_BACKEND, RENDER_OPTIONS, TRACE_OPTIONS, chart_writer.WRITER_OPTIONS)
+    ) as pool:
+        futures = [pool.submit(_render_chart_flushed, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+def _render_all(names, workers):
+    return dict(zip(names, _render_tasks([(name, None) for name in names], workers)))
+
+# Render the requested charts across a pool of worker processes and return
+# the same {chart id: html file} mapping as a serial run, in registry order.
+# Charts whose build key matches the manifest and whose artifacts are on disk
+# are skipped unless force=True. With a chunksize the grouped aggregates are
+# streamed from the sources instead of computed from fully loaded frames;
+# charts that plot individual rows still load their dataset.
+def render_charts(names=None, workers=None, force=False, chunksize=None):
+    names = list(DEFAULT_CHARTS) if names is None else list(names)
+
+    # Create images directory if it doesn't exist
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+
+    # Streaming mode: build the aggregates (and input hashes) chunk by chunk
+    if chunksize:
+        stream_aggregates(chunksize)
+
+    manifest = load_manifest()
+    cache = {}
+    keys = {name: chart_build_key(name, cache) for name in names}
+    stale = [
+        name for name in names
+        if force or manifest.get(name) != keys[name] or not _artifacts_exist(name)
+    ]
+
+    # Pages in local mode all reference one shared plotly.js bundle
+    if stale and RENDER_OPTIONS["plotlyjs"] == "local":
+        ensure_plotlyjs_bundle()
+
+    # Compute the shared aggregates once so forked workers inherit them
+    if any(name in CHART_AGGREGATIONS for name in stale):
+        prepare_aggregates(stale)
+
+    rendered = _render_all(stale, workers) if stale else {}
+
+    for name in stale:
+        manifest[name] = keys[name]
+    save_manifest(manifest)
+
+    return {name: rendered.get(name, f"{name}.html") for name in names}
+
+# Batch mode: the chart suite rendered once per filter variant, each into
+# its own subdirectory of IMAGE_DIR. A variant is {"name": ..., "filters":
+# {column: [values], "Year": [start, end]}}, filtered as by dataset_filters().
+VARIANT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+def _variant_slug(value):
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-")
+
+def load_variants(path):
+    with open(path) as f:
+        variants = json.load(f)
+    for variant in variants:
+        filters = variant.get("filters", {})
+        if "Year" in filters:
+            filters["Year"] = tuple(filters["Year"])
+        variant["filters"] = filters
+    return variants
+
+# One variant per value of `column` across the datasets that have it
+def variants_by(column):
+    values = set()
+    for name in DATASET_SOURCES:
+        df = _load_source(name)
+        if column in df.columns:
+            values.update(df[column].dropna().unique().tolist())
+    if not values:
+        raise ValueError(f"no dataset has a {column!r} column")
+    return [
+        {"name": f"{_variant_slug(column)}-{_variant_slug(value)}", "filters": {column: [value]}}
+        for value in sorted(values, key=str)
+    ]
+
+def _check_variants(variants):
+    columns = set().union(*(_load_source(name).columns for name in DATASET_SOURCES))
+    seen = set()
+    for variant in variants:
+        name = variant.get("name")
+        if not isinstance(name, str) or not VARIANT_NAME.match(name):
+            raise ValueError(f"variant name must be a plain directory name, not {name!r}")
+        if name in seen:
+            raise ValueError(f"duplicate variant name: {name!r}")
+        seen.add(name)
+        unknown = set(variant["filters"]) - columns
+        if unknown:
+            raise ValueError(f"variant {name!r} filters on unknown column(s): {', '.join(sorted(unknown))}")
+
+# Render every variant's suite. The datasets are loaded (and indexed by
+# partition) once, before any worker starts. A chart whose inputs hash the
+# same in two variants produces the same artifacts, so each distinct
+# (chart, build key) is rendered at most once, all variants' tasks sharing one
+# render pool, and copied into the other variants. Variants then get their
+# own manifest, metadata and, with cube=True, aggregate cube.
+def render_variants(variants, names=None, workers=None, force=False, cube=True):
+    names = list(DEFAULT_CHARTS) if names is None else list(names)
+    _check_variants(variants)
+    directories = {variant["name"]: f"{IMAGE_DIR}/{variant['name']}" for variant in variants}
+
+    # Build keys and up-to-date charts of every variant; the filtered frames
+    # and aggregates stay in _batch_cache for the render workers to inherit
+    plans = {}
+    for variant in variants:
+        with variant_context(variant["filters"], directories[variant["name"]]):
+            os.makedirs(IMAGE_DIR, exist_ok=True)
+            manifest = load_manifest()
+            cache = {}
+            keys = {name: chart_build_key(name, cache) for name in names}
+            current = {
+                name for name in names
+                if not force and manifest.get(name) == keys[name] and _artifacts_exist(name)
+            }
+            if len(current) < len(names) and RENDER_OPTIONS["plotlyjs"] == "local":
+                ensure_plotlyjs_bundle()
+            if any(name in CHART_AGGREGATIONS for name in set(names) - current):
+                prepare_aggregates(set(names) - current)
+            plans[variant["name"]] = (manifest, keys, current)
+
+    groups = {}
+    for variant in variants:
+        _, keys, _ = plans[variant["name"]]
+        for name in names:
+            groups.setdefault((name, keys[name]), []).append(variant)
+
+    tasks, task_groups, copies = [], [], []
+    for group, members in groups.items():
+        name = group[0]
+        stale = [variant for variant in members if name not in plans[variant["name"]][2]]
+        if not stale:
+            continue
+        current = [variant for variant in members if name in plans[variant["name"]][2]]
+        source = current[0] if current else stale.pop(0)
+        if not current:
+            tasks.append((name, (source["filters"], directories[source["name"]])))
+            task_groups.append(group)
+        copies.extend((group, directories[source["name"]], directories[target["name"]]) for target in stale)
+
+    # Groups whose render was skipped have nothing to copy
+    failed = set()
+    if tasks:
+        failed = {group for group, result in zip(task_groups, _render_tasks(tasks, workers)) if result is None}
+    copies = [(group[0], source, target) for group, source, target in copies if group not in failed]
+    for name, source, target in copies:
+        if name in MAP_CHARTS:
+            with output_dir(target):
+                ensure_map_assets(RENDER_OPTIONS["map_resolution"])
+        for ext in ("html", "png"):
+            chart_writer.copy_artifact(f"{source}/{name}.{ext}", f"{target}/{name}.{ext}")
+
+    for variant in variants:
+        manifest, keys, _ = plans[variant["name"]]
+        with variant_context(variant["filters"], directories[variant["name"]]):
+            # Charts the variant could not render stay stale and are retried
+            rendered = [name for name in names if (name, keys[name]) not in failed]
+            manifest.update({name: keys[name] for name in rendered})
+            save_manifest(manifest)
+            write_chart_metadata(rendered, force=force)
+            if cube:
+                write_aggregate_cube()
+
+    print(f"Rendered {len(tasks) - len(failed)} and copied {len(copies)} chart(s) across {len(variants)} variant(s)")
+    return {
+        variant["name"]: {
+            name: f"{variant['name']}/{name}.html"
+            for name, key in plans[variant["name"]][1].items() if (name, key) not in failed
+        }
+        for variant in variants
+    }
+
+# Chart metadata for the webpage
+# Static metadata of each chart. Descriptions and insights are templates
+# filled from the chart's headline statistics (and fitted relationship) each
+# time chart_metadata.json is written; see _metadata_fields().
+CHART_METADATA = [
     {
         "id": "mortality_by_category",
         "title": "Average Mortality Rate by Disease Category",
-        "description": "This bar chart shows the average mortality rate for different disease categories. Autoimmune diseases have the highest mortality rate at around 5.12%, followed by Bacterial and Cardiovascular diseases.",
-        "insight": "Autoimmune diseases show the highest mortality rates, suggesting a need for improved treatments and earlier diagnosis in this category.",
+        "description": "This bar chart shows the average mortality rate for different disease categories. {max_label} diseases have the highest mortality rate at {max_value:.2f}%, and {min_label} diseases the lowest at {min_value:.2f}%.",
+        "insight": "{max_label} diseases show the highest mortality rates, suggesting a need for improved treatments and earlier diagnosis in this category.",
         "file_html": "mortality_by_category.html",
         "file_png": "mortality_by_category.png",
         "chart_type": "Bar Chart",
@@ -479,8 +2189,8 @@ chart_metadata = [
     {
         "id": "mortality_over_years",
         "title": "Mortality Rate Over Years",
-        "description": "This line chart tracks the average mortality rate across all diseases over time. There are notable fluctuations, with a significant dip around 2015.",
-        "insight": "The mortality rate shows cyclical patterns with a major decrease around 2015, possibly indicating the impact of global health initiatives or improved treatment protocols during that period.",
+        "description": "This line chart tracks the average mortality rate across all diseases over time. It ranges from {min_value:.2f}% in {min_label} to {max_value:.2f}% in {max_label}.",
+        "insight": "The mortality rate reaches its lowest point in {min_label}, possibly indicating the impact of global health initiatives or improved treatment protocols during that period.",
         "file_html": "mortality_over_years.html",
         "file_png": "mortality_over_years.png",
         "chart_type": "Line Chart",
@@ -489,8 +2199,8 @@ chart_metadata = [
     {
         "id": "urbanization_vs_mortality",
         "title": "Urbanization Rate vs Mortality Rate by Country",
-        "description": "This bubble chart explores the relationship between urbanization rates and mortality rates across different countries. The size of each bubble represents the population affected.",
-        "insight": "There appears to be no strong correlation between urbanization and mortality rates, suggesting that other factors like healthcare quality and disease management may have more significant impacts on mortality outcomes.",
+        "description": "This bubble chart explores the relationship between urbanization rates and mortality rates across different countries. The size of each bubble represents the population affected, and the dashed line is the least-squares trend.",
+        "insight": "Across {n} countries there is {correlation} correlation between urbanization and mortality rates (Pearson r = {pearson:.2f}, {level:.0%} CI {pearson_low:.2f} to {pearson_high:.2f}; Spearman \u03c1 = {spearman:.2f}).",
         "file_html": "urbanization_vs_mortality.html",
         "file_png": "urbanization_vs_mortality.png",
         "chart_type": "Bubble Chart",
@@ -499,8 +2209,8 @@ chart_metadata = [
     {
         "id": "education_vs_prevalence",
         "title": "Education Index vs Prevalence Rate by Country",
-        "description": "This scatter plot examines the relationship between a country's education index and disease prevalence rates. The size of each point indicates the number of diseases recorded in that country.",
-        "insight": "Countries with higher education indices tend to have lower disease prevalence rates, suggesting that education may play a role in disease prevention and health awareness.",
+        "description": "This scatter plot examines the relationship between a country's education index and disease prevalence rates. The size of each point indicates the number of diseases recorded in that country, and the dashed line is the least-squares trend.",
+        "insight": "Across {n} countries there is {correlation} correlation between education index and disease prevalence (Pearson r = {pearson:.2f}, {level:.0%} CI {pearson_low:.2f} to {pearson_high:.2f}; Spearman \u03c1 = {spearman:.2f}).",
         "file_html": "education_vs_prevalence.html",
         "file_png": "education_vs_prevalence.png",
         "chart_type": "Scatter Plot",
@@ -509,7 +2219,7 @@ chart_metadata = [
     {
         "id": "mortality_heatmap",
         "title": "Heatmap of Mortality Rate by Country and Disease",
-        "description": "This heatmap visualizes mortality rates across different countries and diseases, with darker red indicating higher mortality rates.",
+        "description": "This heatmap visualizes mortality rates across different countries and diseases, with darker red indicating higher mortality rates. The highest average rate, {max_value:.2f}%, is for {max_label}.",
         "insight": "The heatmap reveals specific country-disease combinations with exceptionally high mortality rates, highlighting areas where targeted interventions could be most beneficial.",
         "file_html": "mortality_heatmap.html",
         "file_png": "mortality_heatmap.png",
@@ -519,8 +2229,8 @@ chart_metadata = [
     {
         "id": "life_expectancy_over_time",
         "title": "Average Life Expectancy Over Time",
-        "description": "This area chart shows how global average life expectancy has changed over time.",
-        "insight": "Life expectancy has shown a general upward trend over the years, reflecting improvements in healthcare, nutrition, and living conditions worldwide.",
+        "description": "This area chart shows how global average life expectancy has changed over time, from {first_value:.1f} years in {first_label} to {last_value:.1f} years in {last_label}.",
+        "insight": "Average life expectancy {direction} from {first_label} to {last_label}, with a low of {min_value:.1f} years in {min_label} and a high of {max_value:.1f} years in {max_label}.",
         "file_html": "life_expectancy_over_time.html",
         "file_png": "life_expectancy_over_time.png",
         "chart_type": "Area Chart",
@@ -530,7 +2240,7 @@ chart_metadata = [
         "id": "disease_population_treemap",
         "title": "Total Population Affected by Disease Category",
         "description": "This treemap visualizes the total population affected by each disease category, with larger areas representing more affected people.",
-        "insight": "Viral diseases affect the largest population globally, followed by respiratory diseases, highlighting the significant public health burden of these disease categories.",
+        "insight": "{max_label} diseases affect the largest population globally ({max_value:,.0f} people), highlighting the significant public health burden of this disease category.",
         "file_html": "disease_population_treemap.html",
         "file_png": "disease_population_treemap.png",
         "chart_type": "Treemap",
@@ -539,7 +2249,7 @@ chart_metadata = [
     {
         "id": "mortality_choropleth",
         "title": "Average Mortality Rate by Country",
-        "description": "This choropleth map displays average mortality rates across different countries, with darker red indicating higher mortality rates.",
+        "description": "This choropleth map displays average mortality rates across different countries, with darker red indicating higher mortality rates. Rates range from {min_value:.2f}% in {min_label} to {max_value:.2f}% in {max_label}.",
         "insight": "There are significant geographical disparities in mortality rates, with some regions showing consistently higher rates that may be linked to healthcare access, economic factors, or disease burden.",
         "file_html": "mortality_choropleth.html",
         "file_png": "mortality_choropleth.png",
@@ -550,7 +2260,7 @@ chart_metadata = [
         "id": "cholesterol_by_gender",
         "title": "Cholesterol Distribution by Gender",
         "description": "This violin plot shows the distribution of cholesterol levels between males and females in the heart disease dataset.",
-        "insight": "Females show a wider distribution of cholesterol levels with a higher median value compared to males, which could be relevant for gender-specific approaches to cardiovascular health.",
+        "insight": "{max_label}s show a higher median cholesterol level ({max_value:.0f}) than {min_label}s ({min_value:.0f}), which could be relevant for gender-specific approaches to cardiovascular health.",
         "file_html": "cholesterol_by_gender.html",
         "file_png": "cholesterol_by_gender.png",
         "chart_type": "Violin Plot",
@@ -560,7 +2270,7 @@ chart_metadata = [
         "id": "age_by_heart_disease",
         "title": "Age Distribution by Heart Disease Presence",
         "description": "This box plot compares the age distribution between individuals with and without heart disease.",
-        "insight": "Individuals with heart disease tend to be older on average, confirming age as a significant risk factor for cardiovascular conditions.",
+        "insight": "Individuals {max_label} tend to be older, with a median age of {max_value:.0f} years against {min_value:.0f} for those {min_label}.",
         "file_html": "age_by_heart_disease.html",
         "file_png": "age_by_heart_disease.png",
         "chart_type": "Box Plot",
@@ -569,7 +2279,7 @@ chart_metadata = [
     {
         "id": "top_countries_life_expectancy",
         "title": "Top 10 Countries by Average Life Expectancy",
-        "description": "This bar chart shows the top 10 countries with the highest average life expectancy.",
+        "description": "This bar chart shows the top 10 countries with the highest average life expectancy, led by {max_label} at {max_value:.1f} years.",
         "insight": "The top-ranking countries for life expectancy are predominantly developed nations with strong healthcare systems and high standards of living.",
         "file_html": "top_countries_life_expectancy.html",
         "file_png": "top_countries_life_expectancy.png",
@@ -580,7 +2290,7 @@ chart_metadata = [
         "id": "gdp_vs_life_expectancy",
         "title": "GDP vs Life Expectancy",
         "description": "This scatter plot explores the relationship between a country's GDP and life expectancy, with point size representing population.",
-        "insight": "There is a positive correlation between GDP and life expectancy, though the relationship plateaus at higher GDP levels, suggesting diminishing returns on healthcare investment beyond a certain point.",
+        "insight": "There is {correlation} correlation between GDP and life expectancy (Pearson r = {pearson:.2f}, {level:.0%} CI {pearson_low:.2f} to {pearson_high:.2f}; Spearman \u03c1 = {spearman:.2f}). The dashed LOWESS curve shows where the relationship levels off at higher GDP.",
         "file_html": "gdp_vs_life_expectancy.html",
         "file_png": "gdp_vs_life_expectancy.png",
         "chart_type": "Scatter Plot",
@@ -590,15 +2300,281 @@ chart_metadata = [
         "id": "heart_disease_parallel",
         "title": "Heart Disease Feature Comparison",
         "description": "This parallel coordinates plot shows the relationships between multiple features related to heart disease.",
-        "insight": "Patients with heart disease tend to have distinct patterns across multiple health metrics, particularly in maximum heart rate and ST depression during exercise, which could be valuable for early detection.",
+        "insight": "Patients with heart disease tend to have distinct patterns across multiple health metrics. The median maximum heart rate is {max_value:.0f} bpm for patients {max_label} and {min_value:.0f} bpm for those {min_label}, which could be valuable for early detection.",
         "file_html": "heart_disease_parallel.html",
         "file_png": "heart_disease_parallel.png",
         "chart_type": "Parallel Coordinates Plot",
         "data_source": "Heart Disease Dataset"
+    },
+    {
+        "id": "mortality_choropleth_animated",
+        "title": "Average Mortality Rate by Country and Year",
+        "description": "This animated choropleth map steps through average mortality rates by country for each year, with darker red indicating higher mortality rates.",
+        "insight": "The highest country-year average mortality rate is {max_value:.2f}% ({max_label}), and the lowest is {min_value:.2f}% ({min_label}).",
+        "file_html": "mortality_choropleth_animated.html",
+        "file_png": "mortality_choropleth_animated.png",
+        "chart_type": "Animated Choropleth Map",
+        "data_source": "Global Health Dataset"
+    },
+    {
+        "id": "urbanization_vs_mortality_animated",
+        "title": "Urbanization Rate vs Mortality Rate by Country and Year",
+        "description": "This animated bubble chart shows how each country's urbanization and mortality rates move from year to year. The size of each bubble represents the population affected.",
+        "insight": "Country-year mortality rates range from {min_value:.2f}% ({min_label}) to {max_value:.2f}% ({max_label}).",
+        "file_html": "urbanization_vs_mortality_animated.html",
+        "file_png": "urbanization_vs_mortality_animated.png",
+        "chart_type": "Animated Bubble Chart",
+        "data_source": "Global Health Dataset"
+    },
+    {
+        "id": "gdp_vs_life_expectancy_animated",
+        "title": "GDP vs Life Expectancy by Year",
+        "description": "This animated scatter plot shows how each country's GDP and life expectancy change from year to year, with point size representing population.",
+        "insight": "Country-year life expectancy ranges from {min_value:.1f} years ({min_label}) to {max_value:.1f} years ({max_label}).",
+        "file_html": "gdp_vs_life_expectancy_animated.html",
+        "file_png": "gdp_vs_life_expectancy_animated.png",
+        "chart_type": "Animated Scatter Plot",
+        "data_source": "Life Expectancy Dataset"
     }
 ]
 
-with open(f"{IMAGE_DIR}/chart_metadata.json", "w") as f:
-    json.dump(chart_metadata, f, indent=2)
+def load_chart_metadata():
+    path = f"{IMAGE_DIR}/chart_metadata.json"
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+# Chart metadata filled from the aggregates and fits of this run, with the
+# size and hash of every artifact on disk. Charts are listed once their
+# artifacts exist. An entry whose artifacts are unchanged since
+# chart_metadata.json was last written was filled from the same data, so it
+# is kept rather than recomputed. Only charts in `names` (all by default) are
+# ever computed, and force=True recomputes those; other charts keep their
+# existing entry or are left out, so a caller that renders or maintains a
+# subset never loads the data behind the rest.
+def write_chart_metadata(names=None, force=False):
+    previous = load_chart_metadata()
+    existing = {entry["id"]: entry for entry in previous}
+
+    plan = []
+    for entry in CHART_METADATA:
+        name = entry["id"]
+        if not _artifacts_exist(name):
+            continue
+        selected = names is None or name in names
+        artifacts = {
+            kind: info
+            for kind, info in (("html", artifact_info(entry["file_html"])), ("png", artifact_info(entry["file_png"])))
+            if info is not None
+        }
+        kept = existing.get(name)
+        if kept is not None and (not selected or (not force and kept.get("artifacts") == artifacts)):
+            static = {key: value for key, value in entry.items() if key not in ("description", "insight")}
+            plan.append((name, dict(kept, **static), None))
+        elif selected:
+            plan.append((name, entry, artifacts))
+
+    stale = [name for name, _, artifacts in plan if artifacts is not None]
+    relationship_intervals([name for name in stale if name in CHART_RELATIONSHIPS])
+    metadata = []
+    for name, entry, artifacts in plan:
+        if artifacts is None:
+            metadata.append(entry)
+            continue
+        with span("metadata", metadata_for=name):
+            headline = chart_headline(name)
+            statistics = relationship_statistics(name) if name in CHART_RELATIONSHIPS else None
+            fields = _metadata_fields(headline, statistics)
+
+            entry = dict(entry, description=entry["description"].format(**fields), insight=entry["insight"].format(**fields))
+            entry["headline"] = headline
+            if statistics is not None:
+                entry["statistics"] = statistics
+            entry["artifacts"] = artifacts
+            metadata.append(entry)
+
+    if metadata != previous:
+        chart_writer.write_artifact(f"{IMAGE_DIR}/chart_metadata.json", json.dumps(metadata, indent=2))
+    return stale
+
+# Country x Year x Disease Category x Disease Name aggregate cube for the D3
+# front end. Each cell holds sum, count, min and max of every measure, so any
+# filter or drill-down is a roll-up of the cube rather than a scan of the CSV.
+CUBE_DIMENSIONS = {
+    "global_health": ["Country", "Year", "Disease Category", "Disease Name"],
+    "life_expectancy": ["Country", "Year"]
+}
+
+CUBE_MEASURES = {
+    "global_health": ["Mortality Rate (%)", "Prevalence Rate (%)", "Incidence Rate (%)",
+                      "Population Affected", "Urbanization Rate (%)", "Education Index"],
+    "life_expectancy": ["Life_expectancy", "GDP", "Population"]
+}
+
+CUBE_REDUCTIONS = ["sum", "count", "min", "max"]
+
+# How partial cubes from different chunks combine
+CUBE_MERGE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+CUBE_FILE = "aggregate_cube.json"
+
+def _cube_partial(df, dimensions, measures):
+    values = df[measures].astype({column: "float64" for column in measures if df[column].dtype.kind == "f"})
+    return values.groupby([df[dimension] for dimension in dimensions], observed=True).agg(CUBE_REDUCTIONS)
+
+# Build one cube per dataset. With a chunksize the sources are read in chunks
+# and the partial cubes merged, as in stream_aggregates().
+def build_aggregate_cube(chunksize=None):
+    cubes = {}
+    for dataset, dimensions in CUBE_DIMENSIONS.items():
+        with span("cube", dataset=dataset):
+            if not chunksize:
+                df = load_dataset(dataset)
+                measures = [column for column in CUBE_MEASURES[dataset] if column in df.columns]
+                cubes[dataset] = _cube_partial(df, dimensions, measures)
+                continue
+
+            needed = set(dimensions) | set(CUBE_MEASURES[dataset])
+            cube = None
+            chunks = pd.read_csv(
+                f"{DATA_DIR}/{DATASET_SOURCES[dataset]}",
+                chunksize=chunksize,
+                usecols=lambda column: _clean_column(dataset, column) in needed
+            )
+            for chunk in chunks:
+                chunk.columns = [_clean_column(dataset, column) for column in chunk.columns]
+                chunk = apply_filters(chunk, _active_filters)
+                measures = [column for column in CUBE_MEASURES[dataset] if column in chunk.columns]
+                partial = _cube_partial(chunk, dimensions, measures)
+                if cube is not None:
+                    merged = pd.concat([cube, partial]).groupby(level=list(range(len(dimensions))))
+                    partial = merged.agg({column: CUBE_MERGE[column[1]] for column in partial.columns})
+                cube = partial
+            cubes[dataset] = cube
+    return cubes
+
+# Columnar, dictionary-encoded form of the cubes: each dimension is a sorted
+# dictionary plus a typed array of codes, and each measure/reduction is a typed
+# array aligned with those codes (see aggregate_cube.js for the decoder)
+def encode_aggregate_cube(cubes):
+    encoded = {"version": 1, "reductions": CUBE_REDUCTIONS, "cubes": {}}
+    for dataset, cube in cubes.items():
+        dimensions = {}
+        for level, dimension in enumerate(cube.index.names):
+            codes, dictionary = pd.factorize(cube.index.get_level_values(level), sort=True)
+            dimensions[dimension] = {
+                "dictionary": np.asarray(dictionary).tolist(),
+                "codes": _typed_array(codes, min_length=0)
+            }
+            if dimension == "Country":
+                dimensions[dimension]["iso3"] = country_iso3(dictionary).tolist()
+        measures = {}
+        for measure, reduction in cube.columns:
+            measures.setdefault(measure, {})[reduction] = _typed_array(cube[(measure, reduction)].to_numpy(), min_length=0)
+        encoded["cubes"][dataset] = {"rows": len(cube), "dimensions": dimensions, "measures": measures}
+    return encoded
+
+def write_aggregate_cube(chunksize=None):
+    encoded = encode_aggregate_cube(build_aggregate_cube(chunksize))
+    return chart_writer.write_artifact(f"{IMAGE_DIR}/{CUBE_FILE}", json.dumps(encoded, separators=(",", ":")))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the dashboard charts.")
+    parser.add_argument("--only", nargs="+", metavar="CHART", help="render only these charts")
+    parser.add_argument("--skip", nargs="+", metavar="CHART", default=[], help="do not render these charts")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument("--out-dir", default=IMAGE_DIR, help="directory for the HTML/PNG artifacts")
+    parser.add_argument("--workers", type=int, default=None, help="render worker processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="rebuild charts even if the manifest says they are current")
+    parser.add_argument("--point-budget", type=int, default=None, help="most markers a row-level scatter chart may carry")
+    parser.add_argument("--heatmap-top-n", type=int, default=None, help="keep only the N densest heatmap rows and columns")
+    parser.add_argument("--plotlyjs", choices=["cdn", "local"], default=None, help="load plotly.js from the CDN or from one shared local bundle")
+    parser.add_argument("--map-resolution", type=int, choices=[110], default=None, help="bundled world geometry for map charts (1:110m)")
+    parser.add_argument("--json-arrays", action="store_true", help="write trace arrays as plain JSON instead of base64 typed arrays")
+    parser.add_argument("--trace", metavar="FILE", help="append JSON-lines timing spans to FILE and print a summary")
+    parser.add_argument("--profile-dir", help="write a profile of each chart build into this directory")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile", help="profiler used with --profile-dir")
+    parser.add_argument("--animate", action="store_true", help="also render the per-year animated variants")
+    parser.add_argument("--frame-bytes", type=int, default=None, help="approximate payload budget of one animation frame")
+    parser.add_argument("--no-compress", action="store_true", help="do not write .gz/.br copies of the text artifacts")
+    parser.add_argument("--writer-threads", type=int, default=None, help="threads writing artifacts in the background (default 4)")
+    parser.add_argument("--variants", metavar="JSON", help="render one suite per filter variant listed in this file, each into its own subdirectory")
+    parser.add_argument("--variants-by", metavar="COLUMN", help="render one suite per value of this column (e.g. Status)")
+    parser.add_argument("--no-cube", action="store_true", help="do not export the aggregate cube for the D3 front end")
+    parser.add_argument("--chunksize", type=int, default=None, help="stream aggregates from the sources in chunks of this many rows")
+    parser.add_argument("--sample-from", metavar="CSV", help="rebuild the global health sample and its weights from this full extract first")
+    parser.add_argument("--sample-seed", type=int, default=0, help="seed for --sample-from")
+    parser.add_argument("--backend", choices=["pandas", "polars", "duckdb"], default=None, help="engine that computes the grouped aggregates")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in (args.only or []) + args.skip if name not in CHART_GENERATORS]
+    if unknown:
+        parser.error(f"unknown chart(s): {', '.join(unknown)} (choose from {', '.join(CHART_GENERATORS)})")
+    if args.variants and args.variants_by:
+        parser.error("--variants and --variants-by cannot be combined")
+    if (args.variants or args.variants_by) and args.chunksize:
+        parser.error("batch variants are rendered from loaded datasets; drop --chunksize")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure(
+        args.data_dir,
+        args.out_dir,
+        backend=args.backend,
+        point_budget=args.point_budget,
+        heatmap_top_n=args.heatmap_top_n,
+        plotlyjs=args.plotlyjs,
+        map_resolution=args.map_resolution,
+        frame_bytes=args.frame_bytes,
+        binary_arrays=False if args.json_arrays else None
+    )
+
+    configure_tracing(args.trace, args.profile_dir, args.profiler)
+    chart_writer.configure_writer(compress=False if args.no_compress else None, threads=args.writer_threads)
+
+    # Stratified sample of a full extract, written where the loaders read it
+    if args.sample_from:
+        sample, weights = sample_data.write_sample(args.sample_from, DATA_DIR, seed=args.sample_seed)
+        clear_dataset_cache()
+        print(f"Sampled {len(sample)} of {weights['Rows'].sum()} rows from {args.sample_from}")
+
+    selection = args.only or DEFAULT_CHARTS + [name for name in CHART_GENERATORS if args.animate and name in ANIMATED_CHARTS]
+    names = [name for name in selection if name not in args.skip]
+
+    # Batch mode: one suite per variant, sharing the loaded data and the renders
+    if args.variants or args.variants_by:
+        variants = load_variants(args.variants) if args.variants else variants_by(args.variants_by)
+        chart_files = render_variants(variants, names, workers=args.workers, force=args.force, cube=not args.no_cube)
+        print(f"Chart suites saved in: {', '.join(f'{IMAGE_DIR}/{name}/' for name in chart_files)}")
+        if tracing_enabled():
+            print_span_summary(read_spans())
+            print(f"Timing spans saved to: {TRACE_OPTIONS['trace_file']}")
+        return chart_files
+
+    # Generate the selected charts and collect their filenames
+    chart_files = render_charts(names, workers=args.workers, force=args.force, chunksize=args.chunksize)
+
+    # Print success message
+    print(f"Generated {len(chart_files)} chart(s) successfully!")
+    print(f"HTML files saved in: {IMAGE_DIR}/")
+    print(f"PNG files saved in: {IMAGE_DIR}/")
+
+    # Create a JSON file with chart metadata for the webpage
+    write_chart_metadata(names, force=args.force)
+
+    print(f"Chart metadata saved to: {IMAGE_DIR}/chart_metadata.json")
+
+    # Pre-aggregated cube for the D3 front end's filters and drill-downs
+    if not args.no_cube:
+        print(f"Aggregate cube saved to: {write_aggregate_cube(args.chunksize)}")
+
+    # Where time and memory went, from the spans recorded in this run
+    if tracing_enabled():
+        print_span_summary(read_spans())
+        print(f"Timing spans saved to: {TRACE_OPTIONS['trace_file']}")
+    return chart_files
 
-print(f"Chart metadata saved to: {IMAGE_DIR}/chart_metadata.json")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Build sampled_global_health.csv from a full final_data.csv-style extract.
+#
+#   python sample_data.py final_data.csv --data-dir data --per-stratum 50 --seed 0
+#   python generate_charts.py --sample-from final_data.csv
+#
+# The source is read once, in chunks. Every row gets a seeded uniform random
+# key, and each (Country, Disease Category) stratum keeps the rows with the
+# `per_stratum` smallest keys seen so far. That is a uniform sample without
+# replacement per stratum (reservoir sampling), and memory is bounded by the
+# chunk plus strata * per_stratum rows. Keys are drawn from one stream in row
+# order, so the sample depends only on the seed, not on the chunk size.
+#
+# Alongside the sample, the per-stratum weights (source rows / sampled rows)
+# are written to sampled_global_health_weights.csv so sums over the sample can
+# be scaled back up to the full population.
+
+SAMPLE_FILE = "sampled_global_health.csv"
+WEIGHTS_FILE = "sampled_global_health_weights.csv"
+STRATA = ["Country", "Disease Category"]
+
+# Columns of the sample, in order; the extracts spell them with underscores
+SAMPLE_COLUMNS = [
+    "Country", "Year", "Disease Name", "Disease Category", "Prevalence Rate (%)",
+    "Incidence Rate (%)", "Mortality Rate (%)", "Age Group", "Gender",
+    "Population Affected", "Healthcare Access (%)", "Doctors per 1000",
+    "Education Index", "Urbanization Rate (%)", "Per Capita Income (USD)"
+]
+
+DEFAULT_PER_STRATUM = 50
+DEFAULT_CHUNKSIZE = 100000
+
+def _sample_column(column):
+    return column.strip().replace("_", " ")
+
+def stratified_reservoir_sample(path, per_stratum=DEFAULT_PER_STRATUM, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    counts = None
+    offset = 0
+
+    chunks = pd.read_csv(path, chunksize=chunksize, usecols=lambda column: _sample_column(column) in SAMPLE_COLUMNS)
+    for chunk in chunks:
+        chunk.columns = [_sample_column(column) for column in chunk.columns]
+        chunk = chunk.assign(
+            _key=rng.random(len(chunk)),
+            _row=np.arange(offset, offset + len(chunk))
+        )
+        offset += len(chunk)
+
+        size = chunk.groupby(STRATA, dropna=False).size()
+        counts = size if counts is None else counts.add(size, fill_value=0)
+
+        # Keep the rows with the smallest keys in each stratum
+        candidates = chunk if reservoir is None else pd.concat([reservoir, chunk], ignore_index=True)
+        reservoir = candidates.sort_values("_key").groupby(STRATA, dropna=False, sort=False).head(per_stratum)
+
+    if not offset:
+        raise ValueError(f"{path} has no rows")
+
+    sample = reservoir.sort_values("_row", ignore_index=True)
+    weights = counts.astype("int64").rename("Rows").to_frame()
+    weights["Sampled"] = sample.groupby(STRATA, dropna=False).size()
+    weights["Weight"] = weights["Rows"] / weights["Sampled"]
+    return sample[[column for column in SAMPLE_COLUMNS if column in sample.columns]], weights.reset_index()
+
+# Write the sample and its weights into data_dir. Files are written under a
+# temporary name and renamed, so readers never see a partial sample.
+def write_sample(path, data_dir, per_stratum=DEFAULT_PER_STRATUM, seed=0, chunksize=DEFAULT_CHUNKSIZE):
+    os.makedirs(data_dir, exist_ok=True)
+    sample, weights = stratified_reservoir_sample(path, per_stratum, seed, chunksize)
+
+    outputs = {
+        f"{data_dir}/{SAMPLE_FILE}": sample,
+        f"{data_dir}/{WEIGHTS_FILE}": weights
+    }
+    for target, frame in outputs.items():
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        frame.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    return sample, weights
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a stratified sample of a full global health extract.")
+    parser.add_argument("source", help="full extract to sample (e.g. final_data.csv)")
+    parser.add_argument("--data-dir", default="data", help="directory to write the sample and weights into")
+    parser.add_argument("--per-stratum", type=int, default=DEFAULT_PER_STRATUM, help="rows kept per (Country, Disease Category)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed; the same seed gives the same sample")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows read from the source at a time")
+    args = parser.parse_args(argv)
+
+    sample, weights = write_sample(args.source, args.data_dir, args.per_stratum, args.seed, args.chunksize)
+    print(f"Sampled {len(sample)} of {weights['Rows'].sum()} rows across {len(weights)} strata into {args.data_dir}/{SAMPLE_FILE}")
+    print(f"Stratum weights saved to: {args.data_dir}/{WEIGHTS_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_charts
+import generate_charts as charts
+
+FIXTURE_ROWS = 300
+
+# Small synthetic copies of the three sources, with the loaders and writers
+# pointed at them
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = str(tmp_path / "data")
+    benchmark_charts.write_synthetic_datasets(data_dir, FIXTURE_ROWS)
+    charts.configure(data_dir, str(tmp_path / "images"))
+    charts.clear_dataset_cache()
+    yield data_dir
+    charts.clear_dataset_cache()
@@ -0,0 +1,73 @@
+import pytest
+
+import chart_backends
+import generate_charts as charts
+
+FILE_BACKENDS = [
+    pytest.param(backend, marks=pytest.mark.skipif(
+        not chart_backends.backend_available(backend), reason=f"{backend} is not installed"
+    ))
+    for backend in ("polars", "duckdb")
+]
+
+FILTERS = {"Country": ["India", "Brazil"], "Year": (2005, 2015)}
+
+def _append_missing_keys(data_dir):
+    # A row without a Country, which every engine must leave out of the groups
+    path = f"{data_dir}/{charts.DATASET_SOURCES['global_health']}"
+    with open(path, "a") as f:
+        f.write(",2010,Malaria,Parasitic,1.0,1.0,1.0,0-18,Male,100,0.5,50.0\n")
+
+@pytest.mark.parametrize("backend", FILE_BACKENDS)
+def test_file_backend_matches_pandas(data_dir, backend):
+    expected = charts.compute_aggregates("pandas")
+    actual = charts.compute_aggregates(backend)
+    assert set(actual) == set(expected)
+    assert chart_backends.compare_aggregates(expected, actual) == []
+
+@pytest.mark.parametrize("backend", FILE_BACKENDS)
+def test_file_backend_matches_pandas_filtered(data_dir, backend):
+    with charts.dataset_filters(FILTERS):
+        expected = charts.compute_aggregates("pandas")
+        actual = charts.compute_aggregates(backend)
+    assert chart_backends.compare_aggregates(expected, actual) == []
+
+    # The filters really narrowed the rows
+    unfiltered = charts.compute_aggregates("pandas")
+    by_country = ("global_health", ("Country",))
+    assert set(expected[by_country].index) == {"Brazil", "India"}
+    assert len(unfiltered[by_country]) > 2
+
+@pytest.mark.parametrize("backend", FILE_BACKENDS)
+def test_file_backend_drops_missing_keys(data_dir, backend):
+    _append_missing_keys(data_dir)
+    expected = charts.compute_aggregates("pandas")
+    assert chart_backends.compare_aggregates(expected, charts.compute_aggregates(backend)) == []
+
+@pytest.mark.parametrize("backend", FILE_BACKENDS)
+def test_aggregate_file_reductions(data_dir, backend):
+    path = f"{data_dir}/{charts.DATASET_SOURCES['heart']}"
+    groupings = {("sex",): {
+        "mean": ("chol", "mean"), "sum": ("chol", "sum"), "count": ("chol", "count"),
+        "min": ("chol", "min"), "max": ("chol", "max")
+    }}
+    df = charts.load_heart()
+    expected = df.groupby("sex").agg(**groupings[("sex",)])
+    actual = chart_backends.aggregate_file(backend, path, groupings)[("sex",)]
+    assert chart_backends.compare_aggregates(
+        {("heart", ("sex",)): expected}, {("heart", ("sex",)): actual}
+    ) == []
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        chart_backends.check_backend("spark")
+
+def test_compare_aggregates_reports_differences(data_dir):
+    expected = charts.compute_aggregates("pandas")
+    changed = {key: frame.copy() for key, frame in expected.items()}
+    key = next(iter(changed))
+    changed[key].iloc[0, 0] += 1
+    del changed[next(k for k in changed if k != key)]
+    mismatches = chart_backends.compare_aggregates(expected, changed)
+    assert len(mismatches) == 2
+    assert any(message.endswith(": missing") for message in mismatches)
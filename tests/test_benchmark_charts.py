@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+import benchmark_charts
+
+@pytest.mark.skipif(not benchmark_charts.reset_peak_rss(), reason="no resettable peak RSS on this platform")
+def test_peak_rss_resets_between_phases():
+    block = np.ones(64 * 1024 * 1024 // 8)
+    block += 1
+    before = benchmark_charts.peak_rss_kb()
+    del block
+
+    assert benchmark_charts.reset_peak_rss()
+    after = benchmark_charts.peak_rss_kb()
+    assert after < before - 32 * 1024
+    # The process peak survives the reset (the kernel's RSS counters are
+    # approximate, so allow a little slack)
+    assert benchmark_charts.process_peak_rss_kb() >= before - 1024
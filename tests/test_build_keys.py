@@ -0,0 +1,74 @@
+import inspect
+
+import pandas as pd
+
+import generate_charts as charts
+
+HEART_CHARTS = {"cholesterol_by_gender", "age_by_heart_disease", "heart_disease_parallel"}
+PANEL_CHARTS = {"mortality_choropleth_animated", "urbanization_vs_mortality_animated", "gdp_vs_life_expectancy_animated"}
+
+def _build_keys():
+    cache = {}
+    return {name: charts.chart_build_key(name, cache) for name in charts.CHART_GENERATORS}
+
+def _changed(before, after):
+    return {name for name in before if before[name] != after[name]}
+
+# Recompile one function of generate_charts from edited source and swap it
+# in, as if the module had been edited and reloaded
+def _replace_function(monkeypatch, function, edit):
+    source = inspect.getsource(function)
+    edited = edit(source)
+    assert edited != source
+    namespace = dict(vars(charts))
+    exec(compile(edited, charts.__file__, "exec"), namespace)
+    monkeypatch.setattr(charts, function.__name__, namespace[function.__name__])
+    monkeypatch.setattr(charts, "_code_hashes", {})
+
+def test_build_keys_are_stable(data_dir):
+    before = _build_keys()
+    charts.clear_dataset_cache()
+    assert _build_keys() == before
+
+def test_editing_a_heart_column_rebuilds_only_its_charts(data_dir):
+    before = _build_keys()
+
+    path = f"{data_dir}/{charts.DATASET_SOURCES['heart']}"
+    df = pd.read_csv(path)
+    df.loc[0, "chol"] += 1
+    df.to_csv(path, index=False)
+    charts.clear_dataset_cache()
+
+    assert _changed(before, _build_keys()) == {"cholesterol_by_gender", "heart_disease_parallel"}
+
+def test_editing_a_shared_heart_column_rebuilds_every_chart_reading_it(data_dir):
+    before = _build_keys()
+
+    path = f"{data_dir}/{charts.DATASET_SOURCES['heart']}"
+    df = pd.read_csv(path)
+    df.loc[0, "age"] += 1
+    df.to_csv(path, index=False)
+    charts.clear_dataset_cache()
+
+    assert _changed(before, _build_keys()) == {"age_by_heart_disease", "heart_disease_parallel"}
+
+def test_editing_a_helper_rebuilds_only_the_charts_that_call_it(data_dir, monkeypatch):
+    before = _build_keys()
+    _replace_function(monkeypatch, charts.year_country_panel, lambda source: source.replace("max(1,", "max(2,"))
+    assert _changed(before, _build_keys()) == PANEL_CHARTS
+
+    _replace_function(monkeypatch, charts.long_to_matrix, lambda source: source.replace("np.nan", "0.0"))
+    assert _changed(before, _build_keys()) == PANEL_CHARTS | {"mortality_heatmap"}
+
+def test_comments_do_not_change_build_keys(data_dir, monkeypatch):
+    before = _build_keys()
+    _replace_function(
+        monkeypatch, charts.year_country_panel,
+        lambda source: source.replace("    data = ", "    # Only a comment\n\n    data = ", 1)
+    )
+    assert _build_keys() == before
+
+def test_render_options_change_every_key(data_dir, monkeypatch):
+    before = _build_keys()
+    monkeypatch.setitem(charts.RENDER_OPTIONS, "point_budget", charts.RENDER_OPTIONS["point_budget"] + 1)
+    assert _changed(before, _build_keys()) == set(before)
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+import chart_figures
+
+def test_group_rows_follow_first_appearance():
+    groups = chart_figures._group_rows(pd.Series(["b", "a", "b", "c", "a"]))
+    assert [(value, list(rows)) for value, rows in groups] == [("b", [0, 2]), ("a", [1, 4]), ("c", [3])]
+
+def test_group_rows_leave_out_missing_values():
+    groups = chart_figures._group_rows(pd.Series(["b", None, "a", np.nan, "b"]))
+    assert [(value, list(rows)) for value, rows in groups] == [("b", [0, 4]), ("a", [2])]
+    assert chart_figures._group_rows(pd.Series([None, None], dtype=object)) == []
+    assert chart_figures._group_rows(pd.Series([], dtype=object)) == []
+
+def test_grouped_scatter_keeps_each_point_with_its_group():
+    df = pd.DataFrame({
+        "x": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "y": [10.0, 20.0, 30.0, 40.0, 50.0],
+        "group": pd.Categorical(["a", None, "b", "a", None])
+    })
+    fig = chart_figures.grouped_scatter(df, "x", "y", "group")
+    assert [trace.name for trace in fig.data] == ["a", "b"]
+    assert list(fig.data[0].x) == [1.0, 4.0] and list(fig.data[0].y) == [10.0, 40.0]
+    assert list(fig.data[1].x) == [3.0] and list(fig.data[1].hovertext) == ["b"]
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+
+import chart_geo
+import generate_charts as charts
+
+def _feature(iso3, *polygons):
+    return {
+        "type": "Feature",
+        "properties": {"iso_a3": iso3, "name": iso3},
+        "geometry": {"type": "MultiPolygon", "coordinates": [list(polygon) for polygon in polygons]}
+    }
+
+def _square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+# Two neighbours sharing the x=10 border, an island, and an enclave inside
+# the second country
+GEOJSON = {"type": "FeatureCollection", "features": [
+    _feature("AAA", [_square(0, 0, 10, 10)]),
+    _feature("BBB", [_square(10, 0, 20, 10), _square(14, 4, 16, 6)]),
+    _feature("CCC", [_square(30, 0, 35, 5)]),
+    _feature("DDD", [_square(14, 4, 16, 6)])
+]}
+
+def _ring_points(topology, ring):
+    points = []
+    for i, reference in enumerate(ring):
+        arc = topology["arcs"][reference] if reference >= 0 else topology["arcs"][~reference][::-1]
+        points.extend(arc[i > 0:])
+    return np.array(points, dtype=float)
+
+def _rings(topology):
+    return {
+        geometry["id"]: [ring for polygon in geometry["arcs"] for ring in polygon]
+        for geometry in topology["objects"]["countries"]["geometries"]
+    }
+
+def test_borders_are_shared_and_left_out_of_the_coastlines():
+    topology = chart_geo.build_topology(GEOJSON, 0.01)
+    rings = _rings(topology)
+    coastlines = {arc for (arc,) in topology["objects"]["coastlines"]["geometries"][0]["arcs"]}
+
+    # The x=10 border is one arc, walked in opposite directions by AAA and BBB
+    a_arcs = {reference if reference >= 0 else ~reference for reference in rings["AAA"][0]}
+    b_arcs = {reference if reference >= 0 else ~reference for reference in rings["BBB"][0]}
+    border = a_arcs & b_arcs
+    assert len(border) == 1
+    assert sorted(point[0] for point in topology["arcs"][next(iter(border))]) == [10, 10]
+    assert border.isdisjoint(coastlines)
+
+    # The enclave's ring is the hole of BBB; neither is coastline
+    enclave = {reference if reference >= 0 else ~reference for reference in rings["DDD"][0]}
+    assert enclave == {reference if reference >= 0 else ~reference for reference in rings["BBB"][1]}
+    assert enclave.isdisjoint(coastlines)
+
+    # Every other arc is a coast: the island, and AAA's and BBB's outer edges
+    assert coastlines == set(range(len(topology["arcs"]))) - border - enclave
+
+def test_rings_are_closed_and_wound_for_d3():
+    topology = chart_geo.build_topology(GEOJSON, 0.01)
+    for rings in _rings(topology).values():
+        for ring in rings:
+            points = _ring_points(topology, ring)
+            assert (points[0] == points[-1]).all()
+        exterior = _ring_points(topology, rings[0])
+        assert chart_geo._signed_area(exterior) < 0
+    hole = _ring_points(topology, _rings(topology)["BBB"][1])
+    assert chart_geo._signed_area(hole) > 0
+
+def test_bundled_topology_coastlines_skip_land_borders():
+    with open(chart_geo.topology_path(110)) as f:
+        topology = json.load(f)
+    coastlines = topology["objects"]["coastlines"]["geometries"][0]["arcs"]
+    assert 0 < len(coastlines) < len(topology["arcs"])
+
+def test_map_locations_report_missing_geometry(monkeypatch, capsys):
+    monkeypatch.setattr(charts, "_unmapped_reported", set())
+    codes = charts.map_locations(["France", "Singapore", "Atlantis", "Singapore"])
+    assert list(codes) == ["FRA", None, None, None]
+    assert "SGP" in capsys.readouterr().out
+
+    charts.map_locations(["Singapore"])
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,48 @@
+import re
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import chart_server
+import generate_charts as charts
+
+@pytest.fixture
+def server(data_dir, monkeypatch):
+    monkeypatch.setitem(charts.RENDER_OPTIONS, "plotlyjs", "local")
+    server = chart_server.make_server("127.0.0.1", 0, 16 * 1024 * 1024)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/charts"
+    server.shutdown()
+    server.server_close()
+
+# plotly gives every page a random div id
+def _without_div_ids(page):
+    return re.sub(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", "<id>", page)
+
+def _get(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read().decode()
+
+def test_html_pages_match_the_written_pages(server):
+    page = _get(f"{server}/mortality_choropleth.html")
+    assert _without_div_ids(page) == _without_div_ids(charts.chart_html(charts.build_figure("mortality_choropleth")))
+
+    # Local plotly.js and the map topology are referenced, not fetched from the CDN
+    bundle = charts.plotlyjs_bundle_name()
+    assert f'src="{bundle}"' in page and "cdn.plot.ly" not in page
+    assert 'src="world_110m.js"' in page
+    assert '"bdata"' in page
+
+def test_page_assets_are_served(server):
+    assert "PlotlyGeoAssets" in _get(f"{server}/world_110m.js")
+    assert len(_get(f"{server}/{charts.plotlyjs_bundle_name()}")) > 1_000_000
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(f"{server}/unknown.js")
+    assert error.value.code == 404
+
+def test_filtered_json(server):
+    fig = _get(f"{server}/mortality_by_category.json?country=India")
+    assert fig.startswith("{") and '"data"' in fig
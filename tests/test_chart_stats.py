@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_stats
+import generate_charts as charts
+
+@pytest.fixture
+def groups():
+    # Three groups of different sizes and slopes, the last with tied values
+    rng = np.random.default_rng(0)
+    sizes = [50, 200, 30]
+    codes = np.repeat(np.arange(3), sizes)
+    x = rng.normal(size=codes.size)
+    y = np.array([2.0, -0.5, 0.0])[codes] * x + rng.normal(size=codes.size)
+    x[codes == 2] = x[codes == 2].round(0)
+    y[codes == 2] = y[codes == 2].round(0)
+    return x, y, codes
+
+def test_grouped_ols_matches_numpy(groups):
+    x, y, codes = groups
+    fits = chart_stats.grouped_ols(x, y, codes, 3)
+    for group in range(3):
+        mine = codes == group
+        slope, intercept = np.polyfit(x[mine], y[mine], 1)
+        assert fits["n"][group] == mine.sum()
+        assert fits["slope"][group] == pytest.approx(slope)
+        assert fits["intercept"][group] == pytest.approx(intercept)
+        assert fits["pearson"][group] == pytest.approx(np.corrcoef(x[mine], y[mine])[0, 1])
+
+def test_grouped_ols_leaves_unfittable_groups_nan():
+    x = np.array([1.0, 2.0, 3.0, 5.0, 4.0, 4.0])
+    y = np.array([1.0, 2.0, 3.0, 1.0, 2.0, 3.0])
+    codes = np.array([0, 0, 0, 1, 2, 2])
+    fits = chart_stats.grouped_ols(x, y, codes, 4)
+    assert fits["slope"][0] == pytest.approx(1.0)
+    # One point, no x spread, and an empty group
+    assert np.isnan(fits["slope"][1:]).all()
+    assert np.isnan(fits["pearson"][1:]).all()
+    assert list(fits["n"]) == [3, 1, 2, 0]
+
+def test_grouped_ranks_average_ties_within_groups(groups):
+    x, _, codes = groups
+    ranks = chart_stats.grouped_ranks(x, codes)
+    expected = pd.Series(x).groupby(codes).rank(method="average").to_numpy()
+    assert np.array_equal(ranks, expected)
+
+def test_grouped_spearman_matches_ranked_pearson(groups):
+    x, y, codes = groups
+    spearman = chart_stats.grouped_spearman(x, y, codes, 3)
+    for group in range(3):
+        mine = codes == group
+        ranked = pd.DataFrame({"x": x[mine], "y": y[mine]}).rank()
+        assert spearman[group] == pytest.approx(np.corrcoef(ranked["x"], ranked["y"])[0, 1])
+
+def test_bootstrap_intervals_cover_the_estimates(groups):
+    x, y, codes = groups
+    fits = chart_stats.grouped_ols(x, y, codes, 3)
+    intervals = chart_stats.grouped_bootstrap(x, y, codes, 3, n_boot=400, seed=1)
+    for key, estimate in (("slope_ci", fits["slope"]), ("pearson_ci", fits["pearson"])):
+        low, high = intervals[key].T
+        assert (low < estimate).all() and (estimate < high).all()
+
+    # Same seed, same intervals; a larger group gives a narrower slope interval
+    again = chart_stats.grouped_bootstrap(x, y, codes, 3, n_boot=400, seed=1)
+    assert np.array_equal(again["slope_ci"], intervals["slope_ci"])
+    widths = np.diff(intervals["slope_ci"], axis=1)[:, 0]
+    assert widths[1] < widths[0]
+
+def test_capped_bootstrap_matches_the_full_bootstrap():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=20000)
+    y = 0.5 * x + rng.normal(size=20000)
+    codes = np.zeros(20000, dtype=int)
+    full = chart_stats.grouped_bootstrap(x, y, codes, 1, n_boot=300)
+    capped = chart_stats.grouped_bootstrap(x, y, codes, 1, n_boot=300, max_rows=2000)
+    assert np.allclose(capped["slope_ci"], full["slope_ci"], atol=0.005)
+    assert np.allclose(capped["pearson_ci"], full["pearson_ci"], atol=0.005)
+
+def test_bootstrap_of_a_single_point_is_nan():
+    intervals = chart_stats.grouped_bootstrap(np.array([1.0]), np.array([2.0]), np.array([0]), 1, n_boot=50)
+    assert np.isnan(intervals["slope_ci"]).all()
+
+def test_lowess_follows_a_line():
+    x = np.linspace(0, 10, 500)
+    grid, fitted = chart_stats.lowess_curve(x, 3 * x + 1)
+    assert np.allclose(fitted, 3 * grid + 1)
+
+def test_relationships_are_fitted_in_one_batch(data_dir):
+    relationships = charts.compute_relationships()
+    assert set(relationships) == set(charts.CHART_RELATIONSHIPS)
+
+    # The batch gives each chart the statistics of fitting it alone
+    for name, (x, y, by, _) in charts.CHART_RELATIONSHIPS.items():
+        df = charts.relationship_rows(name).dropna(subset=[x, y])
+        statistics = relationships[name]["statistics"]
+        assert statistics["n"] == len(df)
+        assert statistics["pearson"] == pytest.approx(np.corrcoef(df[x], df[y])[0, 1], rel=1e-5)
+        if by is not None:
+            for group, rows in df.groupby(by, observed=True):
+                expected = np.corrcoef(rows[x], rows[y])[0, 1]
+                assert statistics["groups"][str(group)]["pearson"] == pytest.approx(expected, rel=1e-5)
+
+def test_relationship_intervals_stay_off_the_render_path(data_dir):
+    charts.compute_relationships()
+    assert all("slope_ci" not in entry["statistics"] for entry in charts._relationship_cache.values())
+
+    statistics = charts.relationship_statistics("urbanization_vs_mortality")
+    low, high = statistics["slope_ci"]
+    assert low <= statistics["slope"] <= high
+
+def test_relationships_without_rows_have_no_curve(data_dir):
+    with charts.dataset_filters({"Country": ["Atlantis"]}):
+        relationship = charts.compute_relationships(["gdp_vs_life_expectancy"])["gdp_vs_life_expectancy"]
+        assert relationship["curve"] is None
+        assert relationship["statistics"]["n"] == 0
+        assert relationship["statistics"]["slope"] is None
+
+def test_distribution_statistics_of_empty_groups_are_none():
+    for values in ([], [np.nan, np.nan]):
+        assert chart_stats.box_stats(values) is None
+        assert chart_stats.binned_kde(values) is None
+
+    stats = chart_stats.box_stats([3.0, np.nan])
+    assert stats["q1"] == stats["q3"] == stats["lowerfence"] == stats["upperfence"] == 3.0
+    grid, density = chart_stats.binned_kde([3.0])
+    assert np.isfinite(density).all() and grid[np.argmax(density)] == pytest.approx(3.0, abs=0.05)
+
+def test_summary_figures_skip_groups_without_values():
+    df = pd.DataFrame({"group": ["a", "a", "a", "b", "b"], "value": [1.0, 2.0, 3.0, np.nan, np.nan]})
+    box = charts.summary_box_figure(df, "group", "value", order=["a", "b", "c"])
+    assert {trace.name for trace in box.data} == {"a"}
+    assert list(box.layout.xaxis.tickvals) == ["a", "b", "c"]
+
+    violin = charts.summary_violin_figure(df, "group", "value", order=["a", "b", "c"])
+    assert {trace.name for trace in violin.data} == {"a"}
+    assert list(violin.layout.xaxis.ticktext) == ["a", "b", "c"]
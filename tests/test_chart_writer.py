@@ -0,0 +1,57 @@
+import gzip
+import os
+
+import pytest
+
+import chart_writer
+
+def test_write_artifact_writes_compressed_siblings(tmp_path):
+    path = str(tmp_path / "chart.html")
+    chart_writer.write_artifact(path, "<html>one</html>")
+    with open(path) as f:
+        assert f.read() == "<html>one</html>"
+    with open(path + ".gz", "rb") as f:
+        assert gzip.decompress(f.read()) == b"<html>one</html>"
+    assert os.path.exists(path + ".br") == chart_writer.brotli_available()
+
+    # Written again without compression, the stale siblings go
+    chart_writer.write_artifact(path, "<html>two</html>", compress=False)
+    assert sorted(os.listdir(tmp_path)) == ["chart.html"]
+
+def test_the_file_is_renamed_before_its_siblings(tmp_path, monkeypatch):
+    renamed = []
+    replace = os.replace
+
+    def record(source, target):
+        renamed.append(os.path.basename(target))
+        replace(source, target)
+
+    monkeypatch.setattr(chart_writer.os, "replace", record)
+    chart_writer.write_artifact(str(tmp_path / "chart.html"), "<html></html>")
+    assert renamed[0] == "chart.html"
+    assert set(renamed[1:]) == {"chart.html" + suffix for suffix in chart_writer._encodings()}
+
+    renamed.clear()
+    chart_writer.copy_artifact(str(tmp_path / "chart.html"), str(tmp_path / "copy.html"))
+    assert renamed[0] == "copy.html"
+
+def test_a_failed_write_leaves_the_previous_files(tmp_path, monkeypatch):
+    path = str(tmp_path / "chart.html")
+    chart_writer.write_artifact(path, "<html>one</html>")
+    before = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+
+    def broken(data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(chart_writer, "_encodings", lambda: {".gz": broken})
+    with pytest.raises(OSError):
+        chart_writer.write_artifact(path, "<html>two</html>")
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == before
+
+def test_copy_artifact_mirrors_the_siblings(tmp_path):
+    source, target = str(tmp_path / "a.json"), str(tmp_path / "b.json")
+    chart_writer.write_artifact(target, "{}")
+    chart_writer.write_artifact(source, "[]", compress=False)
+    chart_writer.copy_artifact(source, target)
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "b.json"]
+    assert (tmp_path / "b.json").read_text() == "[]"
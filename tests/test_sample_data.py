@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark_charts
+import generate_charts as charts
+import sample_data
+
+SOURCE_ROWS = 3000
+
+# A full extract in the final_data.csv spelling (underscored column names)
+@pytest.fixture
+def extract(tmp_path):
+    df = benchmark_charts.synthesize_global_health(SOURCE_ROWS, np.random.default_rng(1))
+    path = str(tmp_path / "final_data.csv")
+    df.rename(columns=lambda column: column.replace(" ", "_")).to_csv(path, index=False)
+    return path, df
+
+def test_sample_depends_only_on_the_seed(extract):
+    path, _ = extract
+    sample, weights = sample_data.stratified_reservoir_sample(path, per_stratum=5, seed=3, chunksize=SOURCE_ROWS)
+    for chunksize in (97, 250, 999):
+        chunked, chunked_weights = sample_data.stratified_reservoir_sample(path, per_stratum=5, seed=3, chunksize=chunksize)
+        pd.testing.assert_frame_equal(chunked, sample)
+        pd.testing.assert_frame_equal(chunked_weights, weights)
+
+    other, _ = sample_data.stratified_reservoir_sample(path, per_stratum=5, seed=4)
+    assert not other.equals(sample)
+
+def test_sample_caps_each_stratum(extract):
+    path, df = extract
+    sample, weights = sample_data.stratified_reservoir_sample(path, per_stratum=5, seed=0, chunksize=400)
+
+    sizes = df.groupby(sample_data.STRATA).size()
+    sampled = sample.groupby(sample_data.STRATA).size()
+    assert (sampled == np.minimum(sizes, 5)).all()
+    assert list(sample.columns) == [column for column in sample_data.SAMPLE_COLUMNS if column in df.columns]
+
+    # Every sampled row is a source row, kept in source order
+    merged = sample.merge(df.reset_index(), how="left", on=list(sample.columns))
+    assert merged["index"].notna().all()
+    assert merged["index"].is_monotonic_increasing
+
+    weights = weights.set_index(sample_data.STRATA)
+    assert weights["Rows"].sum() == SOURCE_ROWS
+    assert (weights["Rows"] == sizes.reindex(weights.index)).all()
+    assert np.allclose(weights["Weight"] * weights["Sampled"], weights["Rows"])
+
+def test_sample_is_uniform_within_a_stratum(tmp_path):
+    # One stratum of 40 rows sampled 4 at a time: every row should be kept
+    # about a tenth of the time across seeds
+    path = str(tmp_path / "final_data.csv")
+    pd.DataFrame({"Country": "India", "Disease_Category": "Viral", "Year": np.arange(40)}).to_csv(path, index=False)
+    kept = np.zeros(40)
+    for seed in range(200):
+        sample, _ = sample_data.stratified_reservoir_sample(path, per_stratum=4, seed=seed, chunksize=15)
+        kept[sample["Year"].to_numpy()] += 1
+    assert np.abs(kept / 200 - 0.1).max() < 0.07
+
+def test_weights_scale_sample_sums_to_the_source(extract, tmp_path):
+    path, df = extract
+    data_dir = str(tmp_path / "data")
+    sample, _ = sample_data.write_sample(path, data_dir, per_stratum=5, seed=0)
+    charts.configure(data_dir=data_dir)
+
+    reweighted = charts.reweight_strata(sample, "Population Affected")
+    estimate = reweighted["Population Affected"].sum()
+    assert estimate != sample["Population Affected"].sum()
+    assert abs(estimate / df["Population Affected"].sum() - 1) < 0.1
+
+    # With every row sampled the weights are all 1 and the sums are exact
+    sample, _ = sample_data.write_sample(path, data_dir, per_stratum=SOURCE_ROWS, seed=0)
+    reweighted = charts.reweight_strata(sample, "Population Affected")
+    assert reweighted["Population Affected"].sum() == df["Population Affected"].sum()
+
+def test_empty_source_is_rejected(tmp_path):
+    path = str(tmp_path / "final_data.csv")
+    pd.DataFrame(columns=["Country", "Disease_Category", "Year"]).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        sample_data.stratified_reservoir_sample(path)
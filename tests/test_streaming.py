@@ -0,0 +1,48 @@
+import pytest
+
+import chart_backends
+import generate_charts as charts
+
+def _streamed(chunksize):
+    charts.clear_dataset_cache()
+    charts.stream_aggregates(chunksize)
+    return dict(charts._aggregate_cache)
+
+@pytest.mark.parametrize("chunksize", [7, 37, 10_000])
+def test_streamed_aggregates_match_loaded(data_dir, chunksize):
+    expected = charts.compute_aggregates("pandas")
+    actual = _streamed(chunksize)
+    assert set(actual) == set(expected)
+    assert chart_backends.compare_aggregates(expected, actual) == []
+
+def test_streaming_skips_missing_values(data_dir):
+    # One row with a missing group key and one with a missing measure
+    path = f"{data_dir}/{charts.DATASET_SOURCES['global_health']}"
+    with open(path, "a") as f:
+        f.write(",2010,Malaria,Parasitic,1.0,1.0,1.0,0-18,Male,100,0.5,50.0\n")
+        f.write("India,2010,Malaria,Parasitic,1.0,1.0,,0-18,Male,100,0.5,50.0\n")
+    charts.clear_dataset_cache()
+
+    expected = charts.compute_aggregates("pandas")
+    assert chart_backends.compare_aggregates(expected, _streamed(50)) == []
+
+def test_streaming_does_not_load_the_datasets(data_dir):
+    _streamed(50)
+    for name in charts.CHART_AGGREGATIONS:
+        charts.get_aggregate(name)
+    assert "global_health" not in charts._sources
+    assert "life_expectancy" not in charts._sources
+
+def test_streamed_build_keys_match_loaded(data_dir):
+    cache = {}
+    loaded = {name: charts.chart_build_key(name, cache) for name in charts.CHART_GENERATORS}
+    _streamed(50)
+    assert {name: charts.chart_build_key(name) for name in charts.CHART_GENERATORS} == loaded
+
+def test_unmergeable_reductions_are_rejected(data_dir, monkeypatch):
+    monkeypatch.setitem(
+        charts.CHART_AGGREGATIONS, "min_mortality",
+        ("global_health", ("Country",), {"min": ("Mortality Rate (%)", "min")})
+    )
+    with pytest.raises(ValueError):
+        charts.stream_aggregates(50)
@@ -0,0 +1,33 @@
+import generate_charts as charts
+from chart_tracing import configure_tracing, read_spans, summarize_spans, TRACE_OPTIONS
+
+def _record(span, duration, **attrs):
+    return {"span": span, "duration_s": duration, "peak_rss_kb": 1024, **attrs}
+
+def test_only_rendered_charts_are_summarized():
+    records = [
+        _record("load", 0.5, dataset="heart", chart="cholesterol_by_gender"),
+        _record("write_html", 0.2, chart="cholesterol_by_gender"),
+        _record("chart", 1.0, chart="cholesterol_by_gender"),
+        _record("metadata", 0.1, metadata_for="age_by_heart_disease"),
+        _record("load", 0.3, dataset="heart", metadata_for="age_by_heart_disease"),
+        _record("load", 0.4, dataset="heart", chart="mortality_heatmap")
+    ]
+    chart_totals, other = summarize_spans(records)
+    assert set(chart_totals) == {"cholesterol_by_gender"}
+    assert chart_totals["cholesterol_by_gender"]["build"] == 0.8
+    assert set(other) == {"metadata", "load heart"}
+
+def test_metadata_spans_do_not_count_as_renders(data_dir, tmp_path):
+    names = ["mortality_by_category", "cholesterol_by_gender"]
+    charts.render_charts(names)
+
+    saved = dict(TRACE_OPTIONS)
+    configure_tracing(str(tmp_path / "spans.jsonl"))
+    try:
+        charts.write_chart_metadata(names, force=True)
+        chart_totals, other = summarize_spans(read_spans())
+    finally:
+        TRACE_OPTIONS.update(saved)
+    assert chart_totals == {}
+    assert "metadata" in other
@@ -0,0 +1,175 @@
+import io
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+import generate_charts as charts
+
+# Long-running watch mode for append-only feeds.
+#
+#   python watch_charts.py --data-dir data --out-dir images --interval 10
+#
+# The watcher keeps mergeable aggregate state (per-group sums and counts) for
+# every aggregated chart, and the rows of the datasets that row-level charts
+# plot. Each poll reads only the bytes appended to the sources since the last
+# poll, folds them into that state, and re-renders only the charts whose
+# aggregates actually changed (or whose row-level dataset grew). A source that
+# shrinks or is replaced is re-ingested from scratch.
+
+# Bytes parsed at a time, so the initial ingest of a large source stays bounded
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+class AppendWatcher:
+    def __init__(self, names, workers=1, block_bytes=DEFAULT_BLOCK_BYTES):
+        self.names = list(names)
+        self.workers = workers
+        self.block_bytes = block_bytes
+
+        self.groupings = {}
+        for (dataset, keys), reductions in charts.plan_aggregations(self.names).items():
+            self.groupings.setdefault(dataset, {})[keys] = reductions
+
+        # Datasets plotted row by row, which have to stay in memory
+        self.row_level = {
+            dataset
+            for name in self.names if name not in charts.CHART_AGGREGATIONS
+            for dataset in charts.CHART_INPUTS[name]
+        }
+        self.datasets = sorted(set(self.groupings) | self.row_level)
+
+        self.states = {}
+        self.offsets = {}
+        self.headers = {}
+        self.inodes = {}
+
+    def _path(self, dataset):
+        return f"{charts.DATA_DIR}/{charts.DATASET_SOURCES[dataset]}"
+
+    # Forget everything ingested from a source that was truncated or replaced
+    def _reset_if_rewritten(self, dataset):
+        if dataset not in self.offsets:
+            return
+        stat = os.stat(self._path(dataset))
+        if stat.st_size < self.offsets[dataset] or stat.st_ino != self.inodes[dataset]:
+            print(f"{dataset} was rewritten; re-ingesting it from the start")
+            del self.offsets[dataset]
+            for keys in self.groupings.get(dataset, {}):
+                self.states.pop((dataset, keys), None)
+            charts._sources.pop(dataset, None)
+
+    # Yield complete rows appended since the last read, one block at a time.
+    # A trailing partial line is left for the next poll.
+    def _read_appended(self, dataset):
+        path = self._path(dataset)
+        with open(path, "rb") as f:
+            if dataset not in self.offsets:
+                header = f.readline()
+                self.headers[dataset] = [
+                    charts._clean_column(dataset, column)
+                    for column in pd.read_csv(io.BytesIO(header), nrows=0).columns
+                ]
+                self.offsets[dataset] = f.tell()
+                self.inodes[dataset] = os.fstat(f.fileno()).st_ino
+
+            f.seek(self.offsets[dataset])
+            while True:
+                block = f.read(self.block_bytes)
+                end = block.rfind(b"\n")
+                if end < 0:
+                    return
+                block = block[:end + 1]
+                self.offsets[dataset] += len(block)
+                f.seek(self.offsets[dataset])
+                yield pd.read_csv(io.BytesIO(block), header=None, names=self.headers[dataset])
+
+    def _ingest(self, dataset):
+        self._reset_if_rewritten(dataset)
+        rows = 0
+        for delta in self._read_appended(dataset):
+            rows += len(delta)
+            for keys, reductions in self.groupings.get(dataset, {}).items():
+                partial = delta.groupby(list(keys)).agg(**charts.partial_specs(reductions))
+                self.states[(dataset, keys)] = charts.merge_partials(self.states.get((dataset, keys)), partial)
+            if dataset in self.row_level:
+                delta = charts.apply_schema(dataset, delta)
+                if dataset in charts._sources:
+                    charts.append_source_rows(dataset, delta)
+                else:
+                    charts._sources[dataset] = delta
+
+        if rows:
+            for keys, reductions in self.groupings.get(dataset, {}).items():
+                charts._aggregate_cache[(dataset, keys)] = charts.finish_reductions(self.states[(dataset, keys)], reductions)
+        return rows
+
+    # Ingest what was appended and return the charts that need re-rendering
+    def refresh(self):
+        before = {
+            name: charts.get_aggregate(name)
+            for name in self.names
+            if name in charts.CHART_AGGREGATIONS and charts.CHART_AGGREGATIONS[name][:2] in charts._aggregate_cache
+        }
+        grown = {dataset for dataset in self.datasets if self._ingest(dataset)}
+
+        changed = []
+        for name in self.names:
+            if not set(charts.CHART_INPUTS[name]) & grown:
+                continue
+            # Fitted trends over the grown data are redone on next use
+            charts._relationship_cache.pop(name, None)
+            if name in charts.CHART_AGGREGATIONS:
+                dataset, keys, _ = charts.CHART_AGGREGATIONS[name]
+                if (dataset, keys) not in charts._aggregate_cache:
+                    continue
+                if name in before and before[name].equals(charts.get_aggregate(name)):
+                    continue
+            changed.append(name)
+        return grown, changed
+
+    def poll(self):
+        start = time.perf_counter()
+        grown, changed = self.refresh()
+        if not changed:
+            return []
+
+        charts._render_all(changed, self.workers)
+        charts.write_chart_metadata(self.names)
+        print(f"[{time.strftime('%H:%M:%S')}] {', '.join(sorted(grown))} grew; "
+              f"re-rendered {len(changed)} chart(s) in {time.perf_counter() - start:.2f}s: {', '.join(changed)}")
+        return changed
+
+    def run(self, interval):
+        os.makedirs(charts.IMAGE_DIR, exist_ok=True)
+        self.poll()
+        while True:
+            time.sleep(interval)
+            self.poll()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep charts up to date as rows are appended to the sources.")
+    parser.add_argument("--only", nargs="+", metavar="CHART", help="maintain only these charts")
+    parser.add_argument("--skip", nargs="+", metavar="CHART", default=[], help="do not maintain these charts")
+    parser.add_argument("--data-dir", default=charts.DATA_DIR, help="directory holding the source CSVs")
+    parser.add_argument("--out-dir", default=charts.IMAGE_DIR, help="directory for the HTML/PNG artifacts")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between polls")
+    parser.add_argument("--workers", type=int, default=1, help="render worker processes (1 keeps one warm renderer in-process)")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in (args.only or []) + args.skip if name not in charts.CHART_GENERATORS]
+    if unknown:
+        parser.error(f"unknown chart(s): {', '.join(unknown)}")
+    names = [name for name in (args.only or charts.DEFAULT_CHARTS) if name not in args.skip]
+
+    charts.configure(args.data_dir, args.out_dir)
+    print(f"Watching {charts.DATA_DIR}/ every {args.interval:g}s for {len(names)} chart(s)")
+    try:
+        AppendWatcher(names, workers=args.workers).run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())